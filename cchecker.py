@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import argparse
+import io
 import sys
 import warnings
 
@@ -8,7 +9,7 @@ from collections import defaultdict
 from textwrap import dedent
 
 from compliance_checker import __version__
-from compliance_checker.cf.util import download_cf_standard_name_table
+from compliance_checker.profiling import Profile
 from compliance_checker.runner import CheckSuite, ComplianceChecker
 
 
@@ -42,9 +43,7 @@ def parse_options(opts):
 
 
 def main():
-    # Load all available checker classes
     check_suite = CheckSuite()
-    check_suite.load_all_available_checkers()
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -170,6 +169,91 @@ def main():
         ),
     )
 
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes used to check multiple datasets in "
+            "parallel.  Each dataset is checked in its own process and the "
+            "output is reported in the order the datasets were supplied. "
+            "Defaults to 1, which checks datasets serially."
+        ),
+    )
+
+    parser.add_argument(
+        "--check-threads",
+        type=int,
+        default=1,
+        help=(
+            "Number of threads the checks of each checker are run on. "
+            "Results are reported in the same order as when checks are run "
+            "serially.  Defaults to 1, which runs checks one at a time."
+        ),
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=(
+            "Do not use or update the on-disk caches.  By default, results "
+            "for unchanged local datasets are reused from previous runs with "
+            "the same checkers, skip checks and options, and netCDF files "
+            "generated from unchanged CDL files are reused."
+        ),
+    )
+
+    parser.add_argument(
+        "--metadata-only",
+        action="store_true",
+        help=(
+            "Check only the header of netCDF datasets: dimensions, variables, "
+            "data types and attributes.  Checks which read variable data, "
+            "such as comparing actual_range or the ACDD geospatial and time "
+            "extents against the data, are skipped."
+        ),
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help=(
+            "Record the wall time, CPU time and peak memory used by each "
+            "checker setup and check.  A summary table, slowest first, is "
+            "printed to stderr, or the full profile is written as JSON to "
+            "PATH if given.  Cached results are not used while profiling."
+        ),
+    )
+
+    parser.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help=(
+            "Run as a service checking datasets on request over HTTP, with "
+            "the checkers kept loaded between requests.  ADDRESS is "
+            "'host:port', or ':port' for localhost, or the path of a Unix "
+            "domain socket.  Datasets are checked in --workers processes. "
+            "The --test, --criteria and --option given are the defaults for "
+            "requests.  POST a JSON object with the dataset 'location' and "
+            "optionally 'checkers', 'criteria', 'skip_checks' and 'format' "
+            "to /check for JSON results."
+        ),
+    )
+
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=60,
+        metavar="SECONDS",
+        help=(
+            "Maximum number of seconds a request to --serve may take, "
+            "including waiting for a free worker.  Defaults to 60."
+        ),
+    )
+
     parser.add_argument(
         "-V",
         "--version",
@@ -211,12 +295,14 @@ def main():
 
     args = parser.parse_args()
 
-    check_suite.load_generated_checkers(args)
-
     if args.version:
         print("IOOS compliance checker version %s" % __version__)
         sys.exit(0)
 
+    # Load all available checker classes
+    check_suite.load_all_available_checkers()
+    check_suite.load_generated_checkers(args)
+
     options_dict = parse_options(args.option) if args.option else defaultdict(set)
 
     if args.describe_checks:
@@ -251,8 +337,31 @@ def main():
         return 0
 
     if args.download_standard_names:
+        from compliance_checker.cf.util import download_cf_standard_name_table
+
         download_cf_standard_name_table(args.download_standard_names)
 
+    if args.serve:
+        from compliance_checker.server import CheckService, parse_address, serve
+
+        try:
+            address = parse_address(args.serve)
+        except ValueError as e:
+            parser.error(str(e))
+        service = CheckService(
+            checker_names=args.test or ["acdd"],
+            criteria=args.criteria,
+            options=options_dict,
+            workers=args.workers,
+            timeout=args.request_timeout,
+            use_cache=not args.no_cache,
+            metadata_only=args.metadata_only,
+            check_threads=args.check_threads,
+        )
+        print("Serving compliance checks on {}".format(args.serve), file=sys.stderr)
+        serve(service, address)
+        return 0
+
     if len(args.dataset_location) == 0:
         parser.print_help()
         sys.exit(1)
@@ -268,6 +377,10 @@ def main():
         )
         sys.exit(2)
 
+    profile = None if args.profile is None else Profile()
+    # cached results would hide the cost of the checks being profiled
+    use_cache = not args.no_cache and profile is None
+
     # Run the compliance checker
     # 2 modes, concatenated output file or multiple output files
     return_values = []
@@ -289,6 +402,11 @@ def main():
             args.output[0],
             args.format or ["text"],
             options=options_dict,
+            jobs=args.workers,
+            use_cache=use_cache,
+            metadata_only=args.metadata_only,
+            profile=profile,
+            check_threads=args.check_threads,
         )
         return_values.append(return_value)
         had_errors.append(errors)
@@ -310,10 +428,21 @@ def main():
                 output,
                 args.format or ["text"],
                 options=options_dict,
+                use_cache=use_cache,
+                metadata_only=args.metadata_only,
+                profile=profile,
+                check_threads=args.check_threads,
             )
             return_values.append(return_value)
             had_errors.append(errors)
 
+    if profile is not None:
+        if args.profile == "-":
+            print(profile.format_table(), file=sys.stderr)
+        else:
+            with io.open(args.profile, "w", encoding="utf-8") as f:
+                f.write(profile.to_json(indent=2))
+
     if any(had_errors):
         sys.exit(2)
     if all(return_values):
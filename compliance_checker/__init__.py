@@ -1,9 +1,12 @@
+import os
+
 from contextlib import contextmanager
-from functools import lru_cache
 from tempfile import NamedTemporaryFile
 from typing import BinaryIO, Generator
 
-from netCDF4 import Dataset
+import numpy as np
+
+from netCDF4 import CompoundType, Dataset, EnumType, Variable
 
 
 try:
@@ -11,18 +14,358 @@ try:
 except ImportError:
     __version__ = "unknown"
 
+# netCDF4 memoizes get_variables_by_attributes, so its results don't follow
+# variables and attributes added to writable datasets
+_get_variables_by_attributes = getattr(
+    Dataset.get_variables_by_attributes,
+    "__wrapped__",
+    Dataset.get_variables_by_attributes,
+)
+
+
+def _attribute_value_key(value):
+    """
+    Returns a hashable key for an attribute value.  The type is part of the
+    key so that values which compare equal but have different types, e.g.
+    1 and 1.0, are kept apart and predicates see the original value.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        # numpy arrays and other unhashable values
+        try:
+            return (type(value), value.dtype.str, value.shape, value.tobytes())
+        except AttributeError:
+            return (type(value), repr(value))
+    return (type(value), value)
+
+
+class AttributeIndex(object):
+    """
+    Inverted index of the attributes of a dataset's variables, mapping each
+    attribute name to its distinct values and the variables holding them.
+    Queries evaluate equality and predicates once per distinct attribute
+    value rather than once per variable.
+    """
+
+    def __init__(self, variables):
+        """
+        :param dict variables: Mapping of variable name to netCDF4.Variable,
+                               in dataset order
+        """
+        self._variables = variables
+        self._order = {name: i for i, name in enumerate(variables)}
+        # attribute name -> value key -> (value, [variable names])
+        self._index = {}
+        for name, var in variables.items():
+            for attr in var.ncattrs():
+                value = var.getncattr(attr)
+                values = self._index.setdefault(attr, {})
+                key = _attribute_value_key(value)
+                if key in values:
+                    values[key][1].append(name)
+                else:
+                    values[key] = (value, [name])
+
+    def _sorted(self, names):
+        return sorted(names, key=self._order.__getitem__)
+
+    def values(self, attr):
+        """
+        Returns a list of (value, variable names) pairs for each distinct
+        value of an attribute
+
+        :param str attr: Attribute name
+        :rtype: list
+        """
+        return list(self._index.get(attr, {}).values())
+
+    def has_attribute(self, attr):
+        """
+        Returns the names of variables which define an attribute, in dataset
+        order
+
+        :param str attr: Attribute name
+        :rtype: list
+        """
+        names = []
+        for _, var_names in self._index.get(attr, {}).values():
+            names.extend(var_names)
+        return self._sorted(names)
+
+    def equal_to(self, attr, value):
+        """
+        Returns the names of variables whose attribute compares equal to a
+        value, in dataset order
+
+        :param str attr: Attribute name
+        :param value: Value to compare against
+        :rtype: list
+        """
+        names = []
+        for attr_value, var_names in self._index.get(attr, {}).values():
+            if attr_value == value:
+                names.extend(var_names)
+        return self._sorted(names)
+
+    def matching(self, attr, predicate):
+        """
+        Returns a dict of variable name to the result of calling a predicate
+        on the variable's attribute value.  As with
+        `netCDF4.Dataset.get_variables_by_attributes`, variables without the
+        attribute are passed None.
+
+        :param str attr: Attribute name
+        :param function predicate: Function called with each attribute value
+        :rtype: dict
+        """
+        results = {}
+        values = self._index.get(attr, {})
+        for attr_value, var_names in values.values():
+            result = predicate(attr_value)
+            for name in var_names:
+                results[name] = result
+        if len(results) < len(self._variables):
+            result = predicate(None)
+            for name in self._variables:
+                if name not in results:
+                    results[name] = result
+        return results
+
+    def select(self, **kwargs):
+        """
+        Returns the names of variables matching attribute criteria, with the
+        same semantics as `netCDF4.Dataset.get_variables_by_attributes`:
+        callable criteria must return True, other criteria are compared for
+        equality.
+
+        :rtype: list
+        """
+        if len(kwargs) == 1:
+            ((attr, criterion),) = kwargs.items()
+            if not callable(criterion):
+                return self.equal_to(attr, criterion)
+            return self._sorted(
+                name
+                for name, result in self.matching(attr, criterion).items()
+                if result is True
+            )
+
+        flags = []
+        for attr, criterion in kwargs.items():
+            if callable(criterion):
+                flags.append(self.matching(attr, criterion))
+            else:
+                flags.append(dict.fromkeys(self.equal_to(attr, criterion), True))
+
+        names = []
+        for name in self._variables:
+            has_value_flag = False
+            for attr_flags in flags:
+                has_value_flag = attr_flags.get(name, False)
+                if has_value_flag is False:
+                    break
+            if has_value_flag is True:
+                names.append(name)
+        return names
+
+
+def _copy_datatype(datatype, root, types):
+    """
+    Returns the datatype to create a copy of a variable with in the dataset
+    `root`, creating user defined types in the root group the first time
+    they are seen.  `types` maps already copied types by kind and name.
+    """
+    if isinstance(datatype, np.dtype) or datatype is str:
+        return datatype
+    key = (type(datatype).__name__, datatype.name)
+    if key not in types:
+        if isinstance(datatype, EnumType):
+            types[key] = root.createEnumType(
+                datatype.dtype, datatype.name, datatype.enum_dict
+            )
+        elif isinstance(datatype, CompoundType):
+            types[key] = root.createCompoundType(datatype.dtype, datatype.name)
+        else:
+            types[key] = root.createVLType(datatype.dtype, datatype.name)
+    return types[key]
+
+
+def _copy_header(source, target, root, types):
+    """
+    Recursively copies the dimensions, variables and attributes of the group
+    `source` into `target`, without any variable data
+    """
+    for name, dim in source.dimensions.items():
+        target.createDimension(name, None if dim.isunlimited() else len(dim))
+    target.setncatts({name: source.getncattr(name) for name in source.ncattrs()})
+
+    for name, var in source.variables.items():
+        attrs = {attr: var.getncattr(attr) for attr in var.ncattrs()}
+        copy = target.createVariable(
+            name,
+            _copy_datatype(var.datatype, root, types),
+            var.dimensions,
+            fill_value=attrs.pop("_FillValue", None),
+        )
+        copy.setncatts(attrs)
+
+    for name, group in source.groups.items():
+        _copy_header(group, target.createGroup(name), root, types)
+
+    # unlimited dimensions only grow as data is written, so write a single
+    # fill value at the last index of the smallest variable using each one
+    for name, dim in source.dimensions.items():
+        if not dim.isunlimited() or not len(dim):
+            continue
+        using_dim = sorted(
+            (var for var in source.variables.values() if name in var.dimensions),
+            key=lambda var: var.ndim,
+        )
+        for var in using_dim:
+            if 0 in var.shape:
+                continue
+            index = tuple(size - 1 for size in var.shape)
+            copy = target.variables[var.name]
+            try:
+                copy[index] = "" if copy.dtype is str else np.ma.masked
+            except (TypeError, ValueError):
+                continue
+            break
+
 
 class MemoizedDataset(Dataset):
     """
-    A NetCDF dataset which has its get_variables_by_attributes call memoized in
-    order to speed up repeated calls to the function.  This should only really
-    be used against netCDF Datasets opened in 'r' mode, as the attributes should
-    not change upon reading the files.
+    A NetCDF dataset which answers get_variables_by_attributes from an
+    inverted index of variable attributes, built on first use, in order to
+    speed up repeated calls to the function.  The index is only used for
+    datasets opened in 'r' mode, as the attributes of writable datasets may
+    change.
     """
 
-    @lru_cache(128)
+    # whether the dataset can't be written to, so results computed from its
+    # variables can be kept
+    read_only = False
+
+    def __init__(self, filename, mode="r", *args, **kwargs):
+        super(MemoizedDataset, self).__init__(filename, mode, *args, **kwargs)
+        # instance attributes of datasets are written as netCDF attributes
+        self.__dict__["read_only"] = mode == "r"
+
+    @property
+    def attribute_index(self):
+        """
+        Returns the AttributeIndex of this dataset's variables
+
+        :rtype: AttributeIndex
+        """
+        index = self.__dict__.get("_attribute_index")
+        if index is None:
+            index = self.__dict__["_attribute_index"] = AttributeIndex(self.variables)
+        return index
+
     def get_variables_by_attributes(self, **kwargs):
-        return super(MemoizedDataset, self).get_variables_by_attributes(**kwargs)
+        # the variables of writable datasets may change after the index is
+        # built
+        if not self.read_only:
+            return _get_variables_by_attributes(self, **kwargs)
+        # Variable properties such as `name` or `dimensions` are not netCDF
+        # attributes and are not indexed
+        if any(hasattr(Variable, attr) for attr in kwargs):
+            return super(MemoizedDataset, self).get_variables_by_attributes(**kwargs)
+        return [self.variables[name] for name in self.attribute_index.select(**kwargs)]
+
+    # netCDF4 clears its own lru_cache of this method when the dataset is
+    # deallocated; the attribute index is freed along with the dataset
+    get_variables_by_attributes.cache_clear = lambda: None
+
+    @classmethod
+    def header_snapshot(cls, source):
+        """
+        Returns an in-memory copy of the header of a dataset: its groups,
+        dimensions, variables and attributes, but none of its variable data.
+        Unlimited dimensions keep their length.  The snapshot always uses the
+        netCDF-4 data model so it can hold groups and string or user defined
+        types whatever the format of the source.
+
+        :param netCDF4.Dataset source: An open dataset
+        :rtype: MemoizedDataset
+        """
+        try:
+            name = source.filepath()
+        except ValueError:
+            name = "header_snapshot.nc"
+        snapshot = cls(name, mode="w", memory=1024, format="NETCDF4")
+        _copy_header(source, snapshot, snapshot, {})
+        snapshot.__dict__["header_only"] = True
+        # the snapshot is complete once copied, and only read from then on
+        snapshot.__dict__["read_only"] = True
+        return snapshot
+
+    @classmethod
+    def from_cdl(cls, cdl_path, format=None, data=True):
+        """
+        Returns an in-memory dataset built from a CDL file, without writing
+        a netCDF file or calling ncgen.  The dataset's file path is the CDL
+        file's.
+
+        :param str cdl_path: Path of the CDL file
+        :param str format: netCDF format of the dataset, by default
+                           netCDF-3 classic unless the CDL uses netCDF-4
+                           data types
+        :param bool data: If False, only the header of the dataset is built,
+                          as with `header_snapshot`
+        :raises ValueError: If the CDL can't be parsed
+        :rtype: MemoizedDataset
+        """
+        from compliance_checker.protocols import cdl
+
+        doc = cdl.read_cdl(cdl_path)
+        # unlike diskless datasets, in-memory ones don't lock the file name,
+        # so the same CDL can be open more than once
+        ds = cls(cdl_path, mode="w", memory=1024, format=cdl.netcdf_format(doc, format))
+        try:
+            cdl.write_dataset(doc, ds, data=data)
+        except Exception:
+            ds.close()
+            raise
+        ds.__dict__["header_only"] = not data
+        # the dataset is complete once built, and only read from then on
+        ds.__dict__["read_only"] = True
+        return ds
+
+    @classmethod
+    def temporary(cls, path):
+        """
+        Opens a temporary file, such as a downloaded remote dataset, which is
+        removed when the dataset is closed, or straight away if it can't be
+        opened
+
+        :param str path: Path of the file
+        :rtype: MemoizedDataset
+        """
+        try:
+            ds = cls(path)
+        except Exception:
+            os.remove(path)
+            raise
+        # instance attributes of datasets are written as netCDF attributes
+        ds.__dict__["_temporary_path"] = path
+        return ds
+
+    def close(self):
+        """
+        Closes the dataset and frees the classifications derived from it
+        """
+        from compliance_checker.cfutil import release_dataset_analysis
+
+        release_dataset_analysis(self)
+        try:
+            return super(MemoizedDataset, self).close()
+        finally:
+            path = self.__dict__.pop("_temporary_path", None)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
 
 
 @contextmanager
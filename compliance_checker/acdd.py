@@ -20,9 +20,10 @@ from compliance_checker.base import (
     BaseNCCheck,
     Result,
     check_has,
+    data_dependent,
     ratable_result,
 )
-from compliance_checker.cf.util import _possiblexunits, _possibleyunits
+from compliance_checker.cfutil import _possiblexunits, _possibleyunits
 from compliance_checker.util import dateparse, datetime_is_iso, kvp_convert
 
 
@@ -32,6 +33,8 @@ class ACDDBaseCheck(BaseCheck):
     _cc_description = "Attribute Conventions for Dataset Discovery (ACDD)"
     _cc_url = "http://wiki.esipfed.org/index.php?title=Category:Attribute_Conventions_Dataset_Discovery"
     _cc_display_headers = {3: "Highly Recommended", 2: "Recommended", 1: "Suggested"}
+    # reset forgets the applicable variables of a dataset
+    _cc_reusable = True
 
     def __init__(self):
 
@@ -84,6 +87,14 @@ class ACDDBaseCheck(BaseCheck):
         # to be used to format variable Result groups headers
         self._var_header = 'variable "{}" missing the following attributes:'
 
+    def reset(self):
+        """
+        Forgets the applicable variables of the previously checked dataset
+        """
+        super(ACDDBaseCheck, self).reset()
+        self._applicable_variables = None
+        self.applicable_variables = None
+
     # set up attributes according to version
     @check_has(BaseCheck.HIGH, gname="Global Attributes")
     def check_high(self, ds):
@@ -121,7 +132,7 @@ class ACDDBaseCheck(BaseCheck):
         :param netCDF4.Dataset ds: An open netCDF dataset
         """
         if self._applicable_variables is None:
-            self.applicable_variables = cfutil.get_geophysical_variables(ds)
+            self.applicable_variables = list(cfutil.get_geophysical_variables(ds))
             varname = cfutil.get_time_variable(ds)
             # avoid duplicates by checking if already present
             if varname and (varname not in self.applicable_variables):
@@ -224,6 +235,7 @@ class ACDDBaseCheck(BaseCheck):
         # name="Global Attributes" so gets grouped with Global Attributes
         return Result(BaseCheck.MEDIUM, check, "Global Attributes", msgs=messages)
 
+    @data_dependent
     def check_lat_extents(self, ds):
         """
         Check that the values of geospatial_lat_min/geospatial_lat_max
@@ -292,12 +304,12 @@ class ACDDBaseCheck(BaseCheck):
         # sort by criteria passed
         final_lats = sorted(lat_vars, key=lambda x: lat_vars[x], reverse=True)
 
-        obs_mins = {
-            var._name: np.nanmin(var) for var in final_lats if not np.isnan(var).all()
-        }
-        obs_maxs = {
-            var._name: np.nanmax(var) for var in final_lats if not np.isnan(var).all()
-        }
+        # variables without any valid, non-NaN data are left out
+        stats = [
+            (var._name, cfutil.get_variable_stats(ds, var._name)) for var in final_lats
+        ]
+        obs_mins = {name: s.min for name, s in stats if s.min is not None}
+        obs_maxs = {name: s.max for name, s in stats if s.max is not None}
 
         min_pass = any((np.isclose(lat_min, min_val) for min_val in obs_mins.values()))
         max_pass = any((np.isclose(lat_max, max_val) for max_val in obs_maxs.values()))
@@ -320,6 +332,7 @@ class ACDDBaseCheck(BaseCheck):
             BaseCheck.MEDIUM, (allpass, 2), "geospatial_lat_extents_match", msgs
         )
 
+    @data_dependent
     def check_lon_extents(self, ds):
         """
         Check that the values of geospatial_lon_min/geospatial_lon_max
@@ -390,12 +403,12 @@ class ACDDBaseCheck(BaseCheck):
         # sort by criteria passed
         final_lons = sorted(lon_vars, key=lambda x: lon_vars[x], reverse=True)
 
-        obs_mins = {
-            var._name: np.nanmin(var) for var in final_lons if not np.isnan(var).all()
-        }
-        obs_maxs = {
-            var._name: np.nanmax(var) for var in final_lons if not np.isnan(var).all()
-        }
+        # variables without any valid, non-NaN data are left out
+        stats = [
+            (var._name, cfutil.get_variable_stats(ds, var._name)) for var in final_lons
+        ]
+        obs_mins = {name: s.min for name, s in stats if s.min is not None}
+        obs_maxs = {name: s.max for name, s in stats if s.max is not None}
 
         min_pass = any((np.isclose(lon_min, min_val) for min_val in obs_mins.values()))
         max_pass = any((np.isclose(lon_max, max_val) for max_val in obs_maxs.values()))
@@ -473,13 +486,11 @@ class ACDDBaseCheck(BaseCheck):
                 BaseCheck.MEDIUM, (0, total), "geospatial_vertical_extents_match", msgs
             )
 
-        zvalue = ds.variables[z_variable][:]
-        # If the array has fill values, which is allowed in the case of point
-        # features
-        if hasattr(zvalue, "mask"):
-            zvalue = zvalue[~zvalue.mask]
+        # Fill values, which are allowed in the case of point features, are
+        # excluded
+        stats = cfutil.get_variable_stats(ds, z_variable)
 
-        if zvalue.size == 0:
+        if stats.min is None and not stats.nan_count:
             msgs.append(
                 "Cannot compare geospatial vertical extents "
                 "against min/max of data, as non-masked data "
@@ -489,8 +500,10 @@ class ACDDBaseCheck(BaseCheck):
                 BaseCheck.MEDIUM, (0, total), "geospatial_vertical_extents_match", msgs
             )
         else:
-            zmin = zvalue.min()
-            zmax = zvalue.max()
+            if stats.nan_count:
+                zmin = zmax = np.nan
+            else:
+                zmin, zmax = stats.min, stats.max
             if not np.isclose(vert_min, zmin):
                 msgs.append(
                     "geospatial_vertical_min != min(%s) values, %s != %s"
@@ -542,6 +555,7 @@ class ACDDBaseCheck(BaseCheck):
             msgs,
         )
 
+    @data_dependent
     def check_vertical_extents(self, ds):
         """
         Check that the values of geospatial_vertical_min/geospatial_vertical_max approximately match the data.
@@ -569,6 +583,7 @@ class ACDDBaseCheck(BaseCheck):
 
         return self._check_total_z_extents(ds, z_variable)
 
+    @data_dependent
     def check_time_extents(self, ds):
         """
         Check that the values of time_coverage_start/time_coverage_end approximately match the data.
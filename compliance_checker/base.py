@@ -4,6 +4,7 @@
 Compliance Checker
 """
 import csv
+import importlib
 import itertools
 import pprint
 import re
@@ -14,15 +15,9 @@ from collections import defaultdict
 from functools import wraps
 from io import StringIO
 
-import validators
+import numpy as np
 
-from lxml import etree
 from netCDF4 import Dataset
-from owslib.namespaces import Namespaces
-from owslib.swe.observation.sos100 import SensorObservationService_1_0_0
-from owslib.swe.sensor.sml import SensorML
-
-import compliance_checker.cfutil as cfutil
 
 from compliance_checker import MemoizedDataset, __version__
 from compliance_checker.util import kvp_convert
@@ -38,6 +33,8 @@ except ImportError:
 
 
 def get_namespaces():
+    from owslib.namespaces import Namespaces
+
     n = Namespaces()
     ns = n.get_namespaces(["ogc", "sml", "gml", "sos", "swe", "xlink"])
     ns["ows"] = n.get_namespace("ows110")
@@ -110,6 +107,8 @@ class EmailValidator(ValidationObject):
     expected_type = str
 
     def validator_func(self, input_value):
+        import validators
+
         return validators.email(input_value)
 
 
@@ -127,6 +126,8 @@ class UrlValidator(ValidationObject):
     expected_type = str
 
     def validator_func(self, input_value):
+        import validators
+
         return bool(validators.url(input_value))
 
 
@@ -152,6 +153,10 @@ class BaseCheck(object):
     _cc_display_headers = {3: "High Priority", 2: "Medium Priority", 1: "Low Priority"}
 
     supported_ds = []
+    # whether a CheckSuite may reuse an instance of the checker for other
+    # datasets once it has been torn down.  Only set this on checkers whose
+    # `reset` forgets all the state they keep from checking a dataset.
+    _cc_reusable = False
 
     def setup(self, ds):
         """
@@ -161,6 +166,29 @@ class BaseCheck(object):
         """
         pass
 
+    def teardown(self, ds):
+        """
+        Common teardown method for a Checker.
+
+        Automatically run when running a CheckSuite, once the dataset has
+        been checked and scored, even if a check failed.  Calls `reset` so
+        that the checker can be reused for another dataset.
+        """
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the state kept from checking a dataset.
+
+        Called by `teardown`.  Checker classes which extend this method to
+        forget all of their per-dataset state may set `_cc_reusable` to True,
+        so that a suite reuses their instances rather than creating one for
+        every dataset.
+        """
+        defined_results = getattr(self, "_defined_results", None)
+        if defined_results is not None:
+            defined_results.clear()
+
     def __init__(self, options=None):
         self._defined_results = defaultdict(lambda: defaultdict(dict))
         if options is None:
@@ -189,16 +217,6 @@ class BaseCheck(object):
             )
         return self._defined_results[name][variable][severity]
 
-    def __del__(self):
-        """
-        Finalizer. Ensure any caches shared by multiple checkers
-        are cleared before the next checker uses it. Some caches were
-        inadvertently mutated by other functions.
-        """
-
-        cfutil.get_geophysical_variables.cache_clear()
-        cfutil.get_time_variables.cache_clear()
-
 
 class BaseNCCheck(object):
     """
@@ -226,12 +244,37 @@ class BaseNCCheck(object):
         return name in dataset.ncattrs()
 
 
+class _LazyTypes(object):
+    """
+    Class attribute listing types which are imported on first use, such as
+    the owslib types of SOS documents, as owslib is slow to import
+    """
+
+    def __init__(self, *paths):
+        """
+        :param str paths: Dotted paths of the types, e.g. "package.module.Type"
+        """
+        self.paths = paths
+        self.types = None
+
+    def __get__(self, instance, owner):
+        if self.types is None:
+            types = []
+            for path in self.paths:
+                module_name, _, name = path.rpartition(".")
+                types.append(getattr(importlib.import_module(module_name), name))
+            self.types = types
+        return self.types
+
+
 class BaseSOSGCCheck(object):
     """
     Base class for SOS-GetCapabilities supporting Check Suites.
     """
 
-    supported_ds = [SensorObservationService_1_0_0]
+    supported_ds = _LazyTypes(
+        "owslib.swe.observation.sos100.SensorObservationService_1_0_0"
+    )
 
 
 class BaseSOSDSCheck(object):
@@ -239,7 +282,87 @@ class BaseSOSDSCheck(object):
     Base class for SOS-DescribeSensor supporting Check Suites.
     """
 
-    supported_ds = [SensorML]
+    supported_ds = _LazyTypes("owslib.swe.sensor.sml.SensorML")
+
+
+# argument types which can't change between creating a message and
+# formatting it
+_IMMUTABLE_ARGS = (str, bytes, int, float, complex, type(None), np.generic)
+
+
+def _is_immutable(arg):
+    """
+    Returns True if a message argument can't change before it's formatted
+    """
+    if isinstance(arg, _IMMUTABLE_ARGS):
+        return True
+    if isinstance(arg, (tuple, frozenset)):
+        return all(_is_immutable(item) for item in arg)
+    if isinstance(arg, Deferred):
+        return _is_immutable(arg.args)
+    return False
+
+
+class Deferred(object):
+    """
+    A message argument which is only computed, by calling func with args,
+    when the message is formatted.  func should be a module level function
+    and args immutable, so that the message can still be pickled and doesn't
+    depend on the dataset once the checks have run.
+    """
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __format__(self, format_spec):
+        return format(self.func(*self.args), format_spec)
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+class Message(object):
+    """
+    A message template and the arguments it is formatted with, which is only
+    formatted when it's read.  Checks which would otherwise format messages
+    for every variable or attribute they test, most of which pass, only pay
+    for the formatting of the messages which are reported.
+    """
+
+    __slots__ = ("template", "args")
+
+    def __init__(self, template, args):
+        self.template = template
+        self.args = args
+
+    @classmethod
+    def create(cls, template, *args):
+        """
+        Returns a Message, or the formatted string if any of the arguments
+        is mutable and so could change before the message is read
+
+        :param str template: Message template, in str.format syntax
+        """
+        if not args:
+            return template
+        if all(_is_immutable(arg) for arg in args):
+            return cls(template, args)
+        return template.format(*args)
+
+    def __str__(self):
+        return self.template.format(*self.args)
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
 
 
 class Result(object):
@@ -250,9 +373,24 @@ class Result(object):
     weight of the check, any granular messages, or a hierarchy of results. If given value is not a tuple, it
     is cast as a boolean using the bool() function.
 
-    Stores the checker instance and the check method that produced this result.
+    Stores the checker instance and the check method that produced this result,
+    until the results are scored.
+
+    Messages may be given as strings or as unformatted Messages, which are
+    formatted the first time `msgs` is read.
     """
 
+    __slots__ = (
+        "weight",
+        "value",
+        "name",
+        "_msgs",
+        "children",
+        "checker",
+        "check_method",
+        "variable_name",
+    )
+
     def __init__(
         self,
         weight=BaseCheck.MEDIUM,
@@ -275,7 +413,7 @@ class Result(object):
         else:
             self.value = bool(value)
         self.name = name
-        self.msgs = msgs or []
+        self._msgs = msgs or []
 
         self.children = children or []
 
@@ -283,14 +421,37 @@ class Result(object):
         self.check_method = check_method
         self.variable_name = variable_name
 
+    @property
+    def msgs(self):
+        """
+        List of message strings, formatting any Messages in place
+        """
+        msgs = self._msgs
+        for i, msg in enumerate(msgs):
+            if isinstance(msg, Message):
+                msgs[i] = str(msg)
+        return msgs
+
+    @msgs.setter
+    def msgs(self, msgs):
+        self._msgs = msgs
+
+    @property
+    def raw_msgs(self):
+        """
+        List of messages, without formatting Messages.  Used to carry
+        messages over to other results unformatted.
+        """
+        return self._msgs
+
     def __repr__(self):
         ret = "{} (*{}): {}".format(self.name, self.weight, self.value)
 
-        if len(self.msgs):
-            if len(self.msgs) == 1:
-                ret += " ({})".format(self.msgs[0])
+        if len(self._msgs):
+            if len(self._msgs) == 1:
+                ret += " ({})".format(self._msgs[0])
             else:
-                ret += " ({!s} msgs)".format(len(self.msgs))
+                ret += " ({!s} msgs)".format(len(self._msgs))
 
         if len(self.children):
             ret += " ({!s} children)".format(len(self.children))
@@ -319,6 +480,8 @@ class TestCtx(object):
     Simple struct object that holds score values and messages to compile into a result
     """
 
+    __slots__ = ("category", "out_of", "score", "messages", "description", "variable")
+
     def __init__(
         self,
         category=None,
@@ -344,9 +507,11 @@ class TestCtx(object):
             variable_name=self.variable,
         )
 
-    def assert_true(self, test, message):
+    def assert_true(self, test, message, *args):
         """
-        Increments score if test is true otherwise appends a message
+        Increments score if test is true otherwise appends a message.  If
+        arguments are given the message is a template formatted with them,
+        only once the message is read.
         :rtype: bool
         :return: Boolean indicating whether test condition passed or not
         """
@@ -355,7 +520,7 @@ class TestCtx(object):
         if test:
             self.score += 1
         else:
-            self.messages.append(message)
+            self.messages.append(Message.create(message, *args))
 
         return test
 
@@ -485,8 +650,9 @@ def attr_check(kvp, ds, priority, ret_val, gname=None, var_name=None):
                 variable_name=var_name,
             )
         )
-    # if we have an XPath expression, call it on the document
-    elif type(other) is etree.XPath:
+    # if we have an XPath expression, call it on the document; there can't be
+    # one unless lxml has been imported
+    elif "lxml.etree" in sys.modules and type(other) is sys.modules["lxml.etree"].XPath:
         # TODO: store tree instead of creating it each time?
         # no execution path for variable
         res = xpath_check(ds._root, other)
@@ -586,6 +752,28 @@ def check_has(priority=BaseCheck.HIGH, gname=None):
     return _inner
 
 
+def data_dependent(func):
+    """
+    Decorator which marks a check as reading variable data rather than only
+    the header of a dataset.  Data dependent checks are skipped when a
+    dataset is checked in metadata only mode.
+
+    :param function func: check method to mark
+    """
+    func.data_dependent = True
+    return func
+
+
+def is_data_dependent(check_method):
+    """
+    Returns True if a check method is marked as reading variable data
+
+    :param check_method: A check method or function
+    :rtype: bool
+    """
+    return getattr(check_method, "data_dependent", False)
+
+
 def fix_return_value(v, method_name, method=None, checker=None):
     """
     Transforms scalar return values into Result.
@@ -638,7 +826,7 @@ def score_group(group_name=None):
 
                 cur_grouping.insert(0, group_name)
 
-                return Result(r.weight, r.value, tuple(cur_grouping), r.msgs)
+                return Result(r.weight, r.value, tuple(cur_grouping), r.raw_msgs)
 
             ret_val = [fix_return_value(x, func.__name__, func, s) for x in ret_val]
             ret_val = list(map(dogroup, ret_val))
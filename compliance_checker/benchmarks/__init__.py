@@ -0,0 +1,12 @@
+"""
+Offline benchmarks of the compliance checker
+
+Synthetic datasets with controllable numbers of variables, attributes,
+dimension sizes and feature types are generated by `datasets`, and the
+harness in `harness` times checker runs, standard name table loading,
+scoring and output against them.  Run the benchmarks with::
+
+    python -m compliance_checker.benchmarks --variables 10 100 1000 -o results.json
+
+and compare a later commit against them with ``--compare results.json``.
+"""
@@ -0,0 +1,6 @@
+import sys
+
+from compliance_checker.benchmarks.harness import main
+
+
+sys.exit(main())
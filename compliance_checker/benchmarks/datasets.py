@@ -0,0 +1,251 @@
+"""
+Synthetic CF/ACDD/IOOS datasets for benchmarking
+
+`generate_dataset` writes a netCDF file with a controllable number of data
+variables, attributes per variable and dimension sizes, laid out as one of
+the CF discrete sampling geometry feature types or as a grid.  Files are
+generated offline and deterministically, so timings of the same parameters
+can be compared across commits.
+"""
+
+import numpy as np
+
+from netCDF4 import Dataset
+
+
+# feature type -> (sampling dimensions, data variable dimensions), where the
+# sampling dimensions are created with length `dim_size`
+FEATURE_TYPES = {
+    "point": (("obs",), ("obs",)),
+    "timeSeries": (("time",), ("time",)),
+    "profile": (("z",), ("z",)),
+    "trajectory": (("time",), ("time",)),
+    "grid": (("lat", "lon"), ("time", "lat", "lon")),
+}
+
+# (standard name, units, valid range) cycled through by the data variables
+DATA_VARIABLES = (
+    ("sea_water_temperature", "degree_C", (-5.0, 40.0)),
+    ("sea_water_practical_salinity", "1", (0.0, 42.0)),
+    ("air_temperature", "K", (180.0, 330.0)),
+    ("air_pressure", "Pa", (85000.0, 108000.0)),
+    ("eastward_sea_water_velocity", "m s-1", (-5.0, 5.0)),
+    ("northward_sea_water_velocity", "m s-1", (-5.0, 5.0)),
+    ("wind_speed", "m s-1", (0.0, 80.0)),
+    ("mass_concentration_of_chlorophyll_a_in_sea_water", "kg m-3", (0.0, 1e-4)),
+)
+
+GLOBAL_ATTRIBUTES = {
+    "Conventions": "CF-1.7, ACDD-1.3, IOOS-1.2",
+    "title": "Synthetic benchmark dataset",
+    "summary": "Synthetic data generated to benchmark the compliance checker",
+    "keywords": "benchmark, synthetic",
+    "keywords_vocabulary": "GCMD Science Keywords",
+    "license": "Freely Distributed",
+    "institution": "Compliance checker benchmarks",
+    "source": "compliance_checker.benchmarks",
+    "history": "generated",
+    "id": "benchmark",
+    "naming_authority": "org.ioos",
+    "standard_name_vocabulary": "CF Standard Name Table v72",
+    "creator_name": "Compliance Checker",
+    "creator_email": "benchmark@example.com",
+    "creator_url": "https://github.com/ioos/compliance-checker",
+    "creator_type": "institution",
+    "creator_institution": "Compliance checker benchmarks",
+    "creator_country": "USA",
+    "creator_sector": "academic",
+    "publisher_name": "Compliance Checker",
+    "publisher_email": "benchmark@example.com",
+    "publisher_url": "https://github.com/ioos/compliance-checker",
+    "publisher_type": "institution",
+    "publisher_institution": "Compliance checker benchmarks",
+    "publisher_country": "USA",
+    "contributor_name": "Compliance Checker",
+    "contributor_role": "author",
+    "contributor_email": "benchmark@example.com",
+    "contributor_url": "https://github.com/ioos/compliance-checker",
+    "infoUrl": "https://github.com/ioos/compliance-checker",
+    "platform": "fixed",
+    "platform_vocabulary": "https://mmisw.org/ont/ioos/platform",
+    "platform_name": "Benchmark platform",
+    "platform_id": "benchmark01",
+    "wmo_platform_code": "12345",
+    "processing_level": "none",
+    "date_created": "2020-01-01T00:00:00Z",
+    "date_modified": "2020-01-01T00:00:00Z",
+    "date_issued": "2020-01-01T00:00:00Z",
+    "geospatial_lat_units": "degrees_north",
+    "geospatial_lon_units": "degrees_east",
+    "geospatial_vertical_units": "m",
+    "geospatial_vertical_positive": "down",
+    "time_coverage_duration": "P1D",
+    "time_coverage_resolution": "PT1M",
+}
+
+
+COORDINATES = {
+    "time": {
+        "standard_name": "time",
+        "long_name": "Time",
+        "units": "seconds since 2020-01-01 00:00:00",
+        "calendar": "gregorian",
+        "axis": "T",
+    },
+    "lat": {
+        "standard_name": "latitude",
+        "long_name": "Latitude",
+        "units": "degrees_north",
+        "axis": "Y",
+    },
+    "lon": {
+        "standard_name": "longitude",
+        "long_name": "Longitude",
+        "units": "degrees_east",
+        "axis": "X",
+    },
+    "z": {
+        "standard_name": "depth",
+        "long_name": "Depth",
+        "units": "m",
+        "positive": "down",
+        "axis": "Z",
+    },
+}
+
+
+def _coordinate_values(name, size):
+    """
+    Returns monotonic values of a coordinate variable
+    """
+    if name == "time":
+        return np.linspace(0.0, 86400.0, size)
+    elif name == "lat":
+        return np.linspace(-60.0, 60.0, size)
+    elif name == "lon":
+        return np.linspace(-170.0, 170.0, size)
+    return np.linspace(0.0, 1000.0, size)
+
+
+def generate_dataset(
+    path, n_variables=10, n_attributes=5, dim_size=100, feature_type="timeSeries"
+):
+    """
+    Writes a synthetic dataset to a netCDF-4 file
+
+    :param str path: Path of the file to write, overwritten if it exists
+    :param int n_variables: Number of data variables
+    :param int n_attributes: Number of extra attributes added to each data
+                             variable and to the global attributes
+    :param int dim_size: Length of the sampling dimensions
+    :param str feature_type: One of the keys of FEATURE_TYPES
+    :raises ValueError: If the feature type is unknown
+    :rtype: str
+    :returns: The path written
+    """
+    if feature_type not in FEATURE_TYPES:
+        raise ValueError(
+            "Unknown feature type {}, expected one of {}".format(
+                feature_type, ", ".join(sorted(FEATURE_TYPES))
+            )
+        )
+    sampling_dims, data_dims = FEATURE_TYPES[feature_type]
+
+    with Dataset(path, "w", format="NETCDF4") as ds:
+        for dim in sampling_dims:
+            ds.createDimension(dim, dim_size)
+        if feature_type == "grid":
+            ds.createDimension("time", None)
+
+        # coordinates sampled along the feature; the others are scalars
+        for name, attrs in COORDINATES.items():
+            if name in data_dims:
+                dims = (name,)
+            elif feature_type in ("point", "trajectory"):
+                dims = sampling_dims
+            else:
+                dims = ()
+            var = ds.createVariable(name, "f8", dims)
+            var.setncatts(attrs)
+            if not dims:
+                var.assignValue(_coordinate_values(name, 1)[0])
+            elif ds.dimensions[dims[0]].isunlimited():
+                # grids have a single time step
+                var[0] = _coordinate_values(name, 1)[0]
+            else:
+                var[:] = _coordinate_values(name, dim_size)
+
+        if feature_type in ("timeSeries", "profile", "trajectory"):
+            station = ds.createVariable("station", "i4", ())
+            station.setncatts(
+                {
+                    "cf_role": "{}_id".format(feature_type.lower()),
+                    "long_name": "Station identifier",
+                }
+            )
+            station.assignValue(1)
+
+        crs = ds.createVariable("crs", "i4", ())
+        crs.setncatts(
+            {
+                "grid_mapping_name": "latitude_longitude",
+                "epsg_code": "EPSG:4326",
+                "semi_major_axis": 6378137.0,
+                "inverse_flattening": 298.257223563,
+            }
+        )
+
+        shape = tuple(len(ds.dimensions[d]) or 1 for d in data_dims)
+        coordinates = " ".join(name for name in COORDINATES if name not in data_dims)
+        for i in range(n_variables):
+            standard_name, units, (low, high) = DATA_VARIABLES[i % len(DATA_VARIABLES)]
+            name = "{}_{}".format(standard_name, i)
+            var = ds.createVariable(
+                name, "f4", data_dims, fill_value=np.float32(-9999.0)
+            )
+            attrs = {
+                "standard_name": standard_name,
+                "long_name": standard_name.replace("_", " ").capitalize(),
+                "units": units,
+                "coordinates": coordinates,
+                "grid_mapping": "crs",
+                "coverage_content_type": "physicalMeasurement",
+                "valid_min": np.float32(low),
+                "valid_max": np.float32(high),
+                "actual_range": np.array([low, high], dtype="f4"),
+            }
+            for j in range(n_attributes):
+                attrs["comment_{}".format(j)] = "Attribute {} of {}".format(j, name)
+            var.setncatts(attrs)
+            var[:] = np.linspace(low, high, int(np.prod(shape)), dtype="f4").reshape(
+                shape
+            )
+
+        global_attrs = dict(GLOBAL_ATTRIBUTES)
+        global_attrs.update(
+            {
+                "featureType": feature_type,
+                "cdm_data_type": {
+                    "point": "Point",
+                    "timeSeries": "Station",
+                    "profile": "Profile",
+                    "trajectory": "Trajectory",
+                    "grid": "Grid",
+                }[feature_type],
+                "geospatial_lat_min": float(ds.variables["lat"][:].min()),
+                "geospatial_lat_max": float(ds.variables["lat"][:].max()),
+                "geospatial_lon_min": float(ds.variables["lon"][:].min()),
+                "geospatial_lon_max": float(ds.variables["lon"][:].max()),
+                "geospatial_vertical_min": float(ds.variables["z"][:].min()),
+                "geospatial_vertical_max": float(ds.variables["z"][:].max()),
+                "time_coverage_start": "2020-01-01T00:00:00Z",
+                "time_coverage_end": "2020-01-02T00:00:00Z",
+            }
+        )
+        if feature_type == "grid":
+            del global_attrs["featureType"]
+        for j in range(n_attributes):
+            global_attrs["attribute_{}".format(j)] = "Global attribute {}".format(j)
+        ds.setncatts(global_attrs)
+
+    return path
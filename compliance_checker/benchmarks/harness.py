@@ -0,0 +1,656 @@
+"""
+Benchmark harness
+
+Times checker runs over synthetic datasets, loading the CF standard name
+table, grouping raw results into scores, rendering each output format and
+starting the command line tool.
+Results are recorded along with the revision and environment they were
+measured in, so that runs from different commits can be compared with
+`compare`.
+"""
+
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from compliance_checker import __version__
+from compliance_checker.benchmarks.datasets import generate_dataset
+from compliance_checker.benchmarks.scoring import (
+    recursive_group_raw,
+    synthetic_results,
+)
+from compliance_checker.cf import util as cf_util
+from compliance_checker.runner import ComplianceChecker, stdout_redirector
+from compliance_checker.suite import CheckSuite
+
+
+# name: benchmark name, e.g. "run/cf:1.7"
+# params: dict of the benchmark parameters, e.g. the variable count
+# times: wall clock time of each repetition in seconds
+BenchmarkResult = namedtuple("BenchmarkResult", ["name", "params", "times"])
+
+OUTPUT_FORMATS = ("text", "html", "json", "json_new")
+
+
+def time_call(func, repeat=3, setup=None):
+    """
+    Times repeated calls of a function
+
+    :param callable func: Function to time, called with the value returned
+                          by `setup` if given, otherwise with no arguments
+    :param int repeat: Number of times to call the function
+    :param callable setup: Optional untimed function called before each
+                           repetition
+    :rtype: list
+    :returns: Wall clock time of each call in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmark_checkers(path, checker_names=None, repeat=3, params=None):
+    """
+    Times `CheckSuite.run` against a dataset for each checker.  The dataset
+    is loaded again before each repetition, so that no analysis cached on
+    the dataset is reused, but loading is not timed.
+
+    :param str path: Path of the dataset
+    :param list checker_names: Checker names, defaults to every versioned
+                               checker which supports the dataset
+    :param int repeat: Number of repetitions
+    :param dict params: Parameters recorded with the results
+    :rtype: list
+    :returns: List of BenchmarkResults
+    """
+    cs = CheckSuite()
+    if checker_names is None:
+        checker_names = sorted(
+            name for name in cs.checkers if ":" in name and not name.endswith(":latest")
+        )
+
+    results = []
+    datasets = []
+
+    def load():
+        ds = cs.load_dataset(path)
+        datasets.append(ds)
+        return ds
+
+    try:
+        for checker_name in checker_names:
+            if cs._get_valid_checkers(load(), [checker_name]):
+                times = time_call(
+                    lambda ds: cs.run(ds, [], checker_name), repeat=repeat, setup=load
+                )
+                results.append(
+                    BenchmarkResult(
+                        "run/{}".format(checker_name), dict(params or {}), times
+                    )
+                )
+            while datasets:
+                datasets.pop().close()
+    finally:
+        for ds in datasets:
+            ds.close()
+    return results
+
+
+def benchmark_standard_name_table(repeat=3):
+    """
+    Times loading the packaged CF standard name table: parsing the XML, from
+    the binary cache file, and from the in-process cache
+
+    :param int repeat: Number of repetitions
+    :rtype: list
+    :returns: List of BenchmarkResults
+    """
+    path = cf_util._standard_name_table_path()
+    with io.open(path, "rb") as fp:
+        resource_text = fp.read()
+
+    def from_cache_file():
+        cf_util._STANDARD_NAME_INDEXES.clear()
+        cf_util.StandardNameTable()
+
+    results = [
+        BenchmarkResult(
+            "standard_name_table/parse",
+            {},
+            time_call(
+                lambda: cf_util._parse_standard_name_table(resource_text), repeat
+            ),
+        )
+    ]
+    # make sure the cache file exists before timing loads from it
+    cf_util.StandardNameTable()
+    results.append(
+        BenchmarkResult(
+            "standard_name_table/cache_file", {}, time_call(from_cache_file, repeat)
+        )
+    )
+    results.append(
+        BenchmarkResult(
+            "standard_name_table/in_process",
+            {},
+            time_call(cf_util.StandardNameTable, repeat),
+        )
+    )
+    return results
+
+
+class _RecordingSuite(CheckSuite):
+    """
+    CheckSuite which keeps the raw results each checker's scores are
+    grouped from
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(_RecordingSuite, self).__init__(*args, **kwargs)
+        self.raw_results = []
+
+    def scores(self, raw_scores):
+        self.raw_results.append(list(raw_scores))
+        return super(_RecordingSuite, self).scores(raw_scores)
+
+
+def _score_dict(path, checker_names):
+    """
+    Runs checkers against a dataset, returning the suite, the score groups
+    as passed to the output routines and the raw results of each checker
+    """
+    cs = _RecordingSuite()
+    ds = cs.load_dataset(path)
+    try:
+        score_groups = cs.run(ds, [], *checker_names)
+    finally:
+        ds.close()
+    # checkers are scored in the order they are run
+    raw_results = OrderedDict(zip(score_groups, cs.raw_results))
+    return cs, OrderedDict([(path, score_groups)]), raw_results
+
+
+def benchmark_scoring(path, checker_names, repeat=3, params=None):
+    """
+    Times grouping each checker's raw results into scores, and the same
+    with the recursive grouping it replaced as "scores_recursive/..."
+
+    :param str path: Path of the dataset the raw results are taken from
+    :param list checker_names: Checker names
+    :param int repeat: Number of repetitions
+    :param dict params: Parameters recorded with the results
+    :rtype: list
+    :returns: List of BenchmarkResults
+    """
+    _, _, raw_results = _score_dict(path, checker_names)
+    cs = CheckSuite()
+    results = []
+    for checker_name, vals in raw_results.items():
+        result_params = dict(params or {}, results=len(vals))
+        results.append(
+            BenchmarkResult(
+                "scores/{}".format(checker_name),
+                result_params,
+                time_call(lambda: cs.scores(vals), repeat),
+            )
+        )
+        results.append(
+            BenchmarkResult(
+                "scores_recursive/{}".format(checker_name),
+                result_params,
+                time_call(lambda: recursive_group_raw(vals), repeat),
+            )
+        )
+    return results
+
+
+def benchmark_grouping(result_counts=(1000, 10000, 100000), repeat=3):
+    """
+    Times grouping synthetic raw results of each size into scores, against
+    the recursive grouping it replaced
+
+    :param result_counts: Numbers of raw results to group
+    :param int repeat: Number of repetitions
+    :rtype: list
+    :returns: List of BenchmarkResults
+    """
+    cs = CheckSuite()
+    results = []
+    for n_results in result_counts:
+        vals = synthetic_results(n_results)
+        params = {"results": n_results}
+        results.append(
+            BenchmarkResult(
+                "scores/synthetic", params, time_call(lambda: cs.scores(vals), repeat)
+            )
+        )
+        results.append(
+            BenchmarkResult(
+                "scores_recursive/synthetic",
+                params,
+                time_call(lambda: recursive_group_raw(vals), repeat),
+            )
+        )
+    return results
+
+
+def benchmark_outputs(path, checker_names, repeat=3, params=None):
+    """
+    Times rendering the results of a run in each output format
+
+    :param str path: Path of the dataset
+    :param list checker_names: Checker names
+    :param int repeat: Number of repetitions
+    :param dict params: Parameters recorded with the results
+    :rtype: list
+    :returns: List of BenchmarkResults
+    """
+    cs, score_dict, _ = _score_dict(path, checker_names)
+    output_dir = tempfile.mkdtemp()
+    output_path = os.path.join(output_dir, "output")
+    limit = 2
+
+    def text():
+        with io.open(output_path, "w", encoding="utf-8") as f:
+            with stdout_redirector(f):
+                ComplianceChecker.stdout_output(cs, score_dict, 0, limit)
+
+    def html():
+        ComplianceChecker.html_output(cs, score_dict, output_path, [path], limit)
+
+    def json_output(output_type):
+        return lambda: ComplianceChecker.json_output(
+            cs, score_dict, output_path, [path], limit, output_type
+        )
+
+    renderers = {
+        "text": text,
+        "html": html,
+        "json": json_output("json"),
+        "json_new": json_output("json_new"),
+    }
+    try:
+        return [
+            BenchmarkResult(
+                "output/{}".format(fmt),
+                dict(params or {}),
+                time_call(renderers[fmt], repeat),
+            )
+            for fmt in OUTPUT_FORMATS
+        ]
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_benchmarks(
+    variable_counts=(10, 100, 1000),
+    feature_types=("timeSeries",),
+    n_attributes=5,
+    dim_size=100,
+    checker_names=None,
+    repeat=3,
+    output_checkers=("cf:1.7", "acdd:1.3"),
+    work_dir=None,
+    log=None,
+    result_counts=(1000, 10000, 100000),
+    startup=True,
+):
+    """
+    Runs every benchmark over synthetic datasets of each variable count and
+    feature type
+
+    :param variable_counts: Numbers of data variables to generate datasets
+                            with
+    :param feature_types: Feature types to generate datasets for
+    :param int n_attributes: Extra attributes per variable and globally
+    :param int dim_size: Length of the sampling dimensions
+    :param list checker_names: Checkers to time runs of, defaults to every
+                               versioned checker
+    :param int repeat: Number of repetitions of each benchmark
+    :param output_checkers: Checkers whose results are scored and rendered
+    :param str work_dir: Directory for the generated datasets, defaults to a
+                         temporary directory which is removed afterwards
+    :param log: Optional file to report progress to
+    :param result_counts: Numbers of synthetic raw results to time grouping
+                          into scores with
+    :param bool startup: Whether to time starting the command line tool
+    :rtype: list
+    :returns: List of BenchmarkResults
+    """
+    if not CheckSuite.checkers:
+        CheckSuite.load_all_available_checkers()
+
+    remove_dir = work_dir is None
+    if work_dir is None:
+        work_dir = tempfile.mkdtemp(prefix="cc-benchmarks-")
+
+    def report(message):
+        if log is not None:
+            print(message, file=log)
+
+    results = []
+    try:
+        if startup:
+            from compliance_checker.benchmarks.startup import benchmark_startup
+
+            report("start up")
+            results.extend(benchmark_startup(repeat))
+        report("standard name table")
+        results.extend(benchmark_standard_name_table(repeat))
+        report("grouping results")
+        results.extend(benchmark_grouping(result_counts, repeat))
+        for feature_type in feature_types:
+            for n_variables in variable_counts:
+                params = OrderedDict(
+                    [
+                        ("feature_type", feature_type),
+                        ("variables", n_variables),
+                        ("attributes", n_attributes),
+                        ("dim_size", dim_size),
+                    ]
+                )
+                path = os.path.join(
+                    work_dir,
+                    "{}-{}v-{}a-{}d.nc".format(
+                        feature_type, n_variables, n_attributes, dim_size
+                    ),
+                )
+                report("generating {}".format(os.path.basename(path)))
+                generate_dataset(
+                    path, n_variables, n_attributes, dim_size, feature_type
+                )
+                report("checkers")
+                results.extend(benchmark_checkers(path, checker_names, repeat, params))
+                report("scoring and output")
+                results.extend(
+                    benchmark_scoring(path, list(output_checkers), repeat, params)
+                )
+                results.extend(
+                    benchmark_outputs(path, list(output_checkers), repeat, params)
+                )
+    finally:
+        if remove_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _git_revision():
+    """
+    Returns the git commit of the source tree, or None if it isn't a git
+    checkout
+    """
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode("ascii")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """
+    Returns a description of the code and environment benchmarks are run in
+
+    :rtype: dict
+    """
+    return OrderedDict(
+        [
+            ("version", __version__),
+            ("revision", _git_revision()),
+            ("python", platform.python_version()),
+            ("platform", platform.platform()),
+            ("machine", platform.machine()),
+            ("numpy", np.__version__),
+            ("timestamp", datetime.now(timezone.utc).isoformat()),
+        ]
+    )
+
+
+def _result_key(result):
+    return (result["name"], json.dumps(result["params"], sort_keys=True))
+
+
+def results_to_dict(results, env=None):
+    """
+    Returns benchmark results and their environment as a dict suitable for
+    serializing to JSON
+
+    :param list results: List of BenchmarkResults
+    :param dict env: Environment description, defaults to `environment()`
+    :rtype: dict
+    """
+    return OrderedDict(
+        [
+            ("environment", env if env is not None else environment()),
+            (
+                "results",
+                [
+                    OrderedDict(
+                        [
+                            ("name", r.name),
+                            ("params", r.params),
+                            ("times", r.times),
+                            ("min", min(r.times)),
+                            ("median", float(np.median(r.times))),
+                        ]
+                    )
+                    for r in results
+                ],
+            ),
+        ]
+    )
+
+
+def format_results(results):
+    """
+    Returns benchmark results as a text table
+
+    :param dict results: Results as returned by `results_to_dict`
+    :rtype: str
+    """
+    lines = ["{:>10} {:>10}  {}".format("min (s)", "median (s)", "benchmark")]
+    for result in results["results"]:
+        params = ", ".join("{}={}".format(k, v) for k, v in result["params"].items())
+        lines.append(
+            "{:>10.4f} {:>10.4f}  {}{}".format(
+                result["min"],
+                result["median"],
+                result["name"],
+                " ({})".format(params) if params else "",
+            )
+        )
+    return "\n".join(lines)
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Compares the minimum times of two sets of results, matched by name and
+    parameters
+
+    :param dict baseline: Results as returned by `results_to_dict`
+    :param dict current: Results as returned by `results_to_dict`
+    :param float threshold: Relative change below which a benchmark is
+                            reported as unchanged
+    :rtype: list
+    :returns: List of (name, params, baseline min, current min, ratio,
+              status) tuples, where status is "faster", "slower" or
+              "unchanged"
+    """
+    baseline_times = {_result_key(r): r["min"] for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = baseline_times.get(_result_key(result))
+        if before is None:
+            continue
+        after = result["min"]
+        ratio = after / before if before else float("inf")
+        if ratio < 1 - threshold:
+            status = "faster"
+        elif ratio > 1 + threshold:
+            status = "slower"
+        else:
+            status = "unchanged"
+        rows.append((result["name"], result["params"], before, after, ratio, status))
+    return rows
+
+
+def format_comparison(rows):
+    """
+    Returns the result of `compare` as a text table
+
+    :param list rows: Rows returned by `compare`
+    :rtype: str
+    """
+    lines = [
+        "{:>10} {:>10} {:>7}  {:<9}  {}".format(
+            "before (s)", "after (s)", "ratio", "change", "benchmark"
+        )
+    ]
+    for name, params, before, after, ratio, status in rows:
+        params = ", ".join("{}={}".format(k, v) for k, v in params.items())
+        lines.append(
+            "{:>10.4f} {:>10.4f} {:>7.2f}  {:<9}  {}{}".format(
+                before,
+                after,
+                ratio,
+                status,
+                name,
+                " ({})".format(params) if params else "",
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+    Command line entry point, see `python -m compliance_checker.benchmarks
+    --help`
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m compliance_checker.benchmarks",
+        description=(
+            "Benchmark the compliance checker against synthetic datasets. "
+            "Results are printed as a table and can be written to JSON to "
+            "compare against other commits."
+        ),
+    )
+    parser.add_argument(
+        "--variables",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Numbers of data variables to benchmark, e.g. 10 100 1000 10000",
+    )
+    parser.add_argument(
+        "--attributes",
+        type=int,
+        default=5,
+        help="Extra attributes per data variable and globally",
+    )
+    parser.add_argument(
+        "--dim-size", type=int, default=100, help="Length of sampling dimensions"
+    )
+    parser.add_argument(
+        "--feature-types",
+        nargs="+",
+        default=["timeSeries"],
+        help="Feature types of the generated datasets: point, timeSeries, "
+        "profile, trajectory or grid",
+    )
+    parser.add_argument(
+        "-t",
+        "--test",
+        action="append",
+        help="Checker to benchmark, may be repeated.  Defaults to every "
+        "versioned checker",
+    )
+    parser.add_argument(
+        "--results",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of synthetic raw results to benchmark grouping into "
+        "scores with",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Repetitions of each benchmark"
+    )
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        help="Compare against results previously written with --output",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change reported as faster or slower when comparing",
+    )
+    parser.add_argument(
+        "--work-dir", help="Keep the generated datasets in this directory"
+    )
+    parser.add_argument(
+        "--check-budgets",
+        action="store_true",
+        help="Exit with status 1 if starting the command line tool takes "
+        "longer than its budget or imports modules it should defer",
+    )
+    args = parser.parse_args(argv)
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+    benchmark_results = run_benchmarks(
+        variable_counts=args.variables,
+        feature_types=args.feature_types,
+        n_attributes=args.attributes,
+        dim_size=args.dim_size,
+        checker_names=args.test,
+        repeat=args.repeat,
+        work_dir=args.work_dir,
+        log=sys.stderr,
+        result_counts=args.results,
+    )
+    results = results_to_dict(benchmark_results)
+    print(format_results(results))
+
+    if args.output:
+        with io.open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with io.open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        print(format_comparison(compare(baseline, results, args.threshold)))
+    if args.check_budgets:
+        from compliance_checker.benchmarks.startup import check_budgets
+
+        over_budget = check_budgets(benchmark_results)
+        if over_budget:
+            print()
+            print("\n".join(over_budget))
+            return 1
+    return 0
@@ -0,0 +1,121 @@
+"""
+Synthetic raw results for benchmarking scoring
+
+`synthetic_results` builds raw results shaped like those of the CF and IOOS
+checkers, many of them under a few section names with per-variable
+subgroups and messages, so grouping can be timed at sizes far beyond what
+the synthetic datasets produce.  `recursive_group_raw` is the recursive
+grouping `CheckSuite._group_raw` replaced, kept to compare both against.
+"""
+
+import itertools
+
+from compliance_checker.base import BaseCheck, Result
+
+
+SECTIONS = (
+    u"§2.2 Data Types",
+    u"§2.3 Naming Conventions",
+    u"§2.6 Attributes",
+    u"§3.1 Units",
+    u"§3.3 Standard Name",
+    u"§5 Coordinate Systems",
+)
+
+WEIGHTS = (BaseCheck.LOW, BaseCheck.MEDIUM, BaseCheck.HIGH)
+
+
+def synthetic_results(n_results, n_variables=100, fail_every=3):
+    """
+    Returns raw results spread over a few sections, some of them nested
+    per variable
+
+    :param int n_results: Number of results
+    :param int n_variables: Number of distinct variable subgroups
+    :param int fail_every: Every this many results fails with a message
+    :rtype: list
+    """
+    results = []
+    for i in range(n_results):
+        section = SECTIONS[i % len(SECTIONS)]
+        weight = WEIGHTS[i % len(WEIGHTS)]
+        variable = "variable_{}".format(i % n_variables)
+        passed = i % fail_every != 0
+        msgs = [] if passed else ["{} fails check {}".format(variable, i)]
+        if i % 2:
+            name = section
+            value = passed
+        else:
+            name = (section, variable)
+            value = (int(passed), 1)
+        results.append(Result(weight, value, name, msgs))
+    return results
+
+
+def _translate_value(val):
+    if val is True:
+        return (1, 1)
+    elif val is False:
+        return (0, 1)
+    elif val is None:
+        return (0, 0)
+    return val
+
+
+def recursive_group_raw(raw_scores):
+    """
+    Groups raw results into scores as CheckSuite._group_raw did before it
+    built the groups in a single pass: sorting and grouping again at every
+    level of the names, copying the results for each level and
+    concatenating their messages with sum()
+
+    :param list raw_scores: list of raw scores (Result objects)
+    :rtype: list
+    """
+
+    def trim_groups(r):
+        if isinstance(r.name, tuple) or isinstance(r.name, list):
+            new_name = r.name[1:]
+        else:
+            new_name = []
+
+        return Result(r.weight, r.value, new_name, r.raw_msgs)
+
+    terminal = [len(x.name) for x in raw_scores]
+    if terminal == [0] * len(raw_scores):
+        return []
+
+    def group_func(r):
+        if isinstance(r.name, tuple) or isinstance(r.name, list):
+            if len(r.name) == 0:
+                retval = ""
+            else:
+                retval = r.name[0:1][0]
+        else:
+            retval = r.name
+        return retval, r.weight
+
+    grouped = itertools.groupby(sorted(raw_scores, key=group_func), key=group_func)
+
+    ret_val = []
+    for k, v in grouped:
+        k = k[0]
+        v = list(v)
+
+        cv = recursive_group_raw(list(map(trim_groups, v)))
+        if len(cv):
+            max_weight = max([x.weight for x in cv])
+            sum_scores = tuple(map(sum, list(zip(*([x.value for x in cv])))))
+            msgs = []
+        else:
+            max_weight = max([x.weight for x in v])
+            sum_scores = tuple(
+                map(sum, list(zip(*([_translate_value(x.value) for x in v]))))
+            )
+            msgs = sum([x.raw_msgs for x in v], [])
+
+        ret_val.append(
+            Result(name=k, weight=max_weight, value=sum_scores, children=cv, msgs=msgs)
+        )
+
+    return ret_val
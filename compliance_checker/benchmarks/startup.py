@@ -0,0 +1,177 @@
+"""
+Start up time of the command line tool
+
+Times invocations of `cchecker.py` in fresh interpreters, and checks them
+against budgets: a time budget for each invocation, and modules which
+invocations checking nothing, such as --version, must not import, so that
+a slow dependency imported at start up again is caught even on machines
+fast enough to stay within the time budget.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from collections import OrderedDict
+
+from compliance_checker.benchmarks.harness import BenchmarkResult, time_call
+
+
+# name -> command line arguments of the invocations timed
+STARTUP_COMMANDS = OrderedDict(
+    [("version", ["--version"]), ("help", ["--help"]), ("list", ["-l"])]
+)
+
+# name -> seconds each invocation may take at best, leaving room for slower
+# machines than the ones they were measured on
+STARTUP_BUDGETS = {"version": 1.0, "help": 1.0, "list": 1.0}
+
+# modules, and their submodules, which invocations that check nothing must
+# not import
+DEFERRED_MODULES = (
+    "cf_units",
+    "compliance_checker.acdd",
+    "compliance_checker.cf.cf",
+    "compliance_checker.cf.util",
+    "compliance_checker.cfutil",
+    "compliance_checker.ioos",
+    "compliance_checker.server",
+    "distutils",
+    "jinja2",
+    "lxml",
+    "owslib",
+    "pendulum",
+    "pkg_resources",
+    "pyproj",
+    "requests",
+    "validators",
+)
+
+# names of the invocations DEFERRED_MODULES applies to, listing the checkers
+# once a snapshot of them has been taken
+DEFERRED_COMMANDS = ("version", "help", "list")
+
+# runs a script, then writes the names of the imported modules to a file
+_LIST_MODULES = """
+import atexit, json, runpy, sys
+
+def dump(path):
+    with open(path, "w") as f:
+        json.dump(sorted(sys.modules), f)
+
+atexit.register(dump, sys.argv[1])
+sys.argv = sys.argv[2:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def cchecker_path():
+    """
+    Returns the path of the cchecker.py script, next to the package in a
+    source checkout or otherwise on the PATH
+
+    :raises RuntimeError: If the script can't be found
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.path.join(os.path.dirname(package_dir), "cchecker.py")
+    if os.path.isfile(path):
+        return path
+    path = shutil.which("cchecker.py")
+    if path is None:
+        raise RuntimeError("cchecker.py could not be found")
+    return path
+
+
+def _run(command):
+    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def benchmark_startup(repeat=3, commands=None):
+    """
+    Times invocations of the command line tool, each in a new interpreter
+
+    :param int repeat: Number of repetitions
+    :param dict commands: Name -> arguments of the invocations, defaults to
+                          STARTUP_COMMANDS
+    :rtype: list
+    :returns: List of BenchmarkResults named "startup/<name>"
+    """
+    script = cchecker_path()
+    results = []
+    for name, args in (commands or STARTUP_COMMANDS).items():
+        command = [sys.executable, script] + list(args)
+        times = time_call(lambda: _run(command), repeat)
+        results.append(BenchmarkResult("startup/{}".format(name), {}, times))
+    return results
+
+
+def imported_modules(args):
+    """
+    Returns the names of the modules imported by an invocation of the
+    command line tool
+
+    :param list args: Command line arguments
+    :rtype: list
+    """
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        _run([sys.executable, "-c", _LIST_MODULES, path, cchecker_path()] + args)
+        with open(path) as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+def deferred_imports(args):
+    """
+    Returns the modules of DEFERRED_MODULES imported by an invocation of the
+    command line tool
+
+    :param list args: Command line arguments
+    :rtype: list
+    """
+    return [
+        module
+        for module in imported_modules(args)
+        if any(
+            module == deferred or module.startswith(deferred + ".")
+            for deferred in DEFERRED_MODULES
+        )
+    ]
+
+
+def check_budgets(results, budgets=None):
+    """
+    Compares startup benchmark results against their time budgets, and
+    checks that invocations which check nothing don't import any of
+    DEFERRED_MODULES
+
+    :param list results: BenchmarkResults, of which only startup ones are
+                         compared
+    :param dict budgets: Name -> seconds, defaults to STARTUP_BUDGETS
+    :rtype: list
+    :returns: Messages describing each budget exceeded
+    """
+    budgets = STARTUP_BUDGETS if budgets is None else budgets
+    messages = []
+    for result in results:
+        prefix, _, name = result.name.partition("/")
+        if prefix != "startup" or name not in budgets:
+            continue
+        if min(result.times) > budgets[name]:
+            messages.append(
+                "{} took {:.3f} s, over its budget of {:.3f} s".format(
+                    result.name, min(result.times), budgets[name]
+                )
+            )
+        if name in DEFERRED_COMMANDS:
+            imported = deferred_imports(STARTUP_COMMANDS[name])
+            if imported:
+                messages.append(
+                    "{} imported {}".format(result.name, ", ".join(imported))
+                )
+    return messages
@@ -0,0 +1,409 @@
+"""
+On-disk caches of checker results and of netCDF files generated from CDL
+
+Scored result trees are stored in a SQLite database keyed on a digest of
+the dataset contents, the checker name and version, the compliance checker
+version, and any skip checks or options which affect how the checker runs.  Re-checking an unchanged
+dataset can then be answered without running any of the checks.
+
+netCDF files generated from CDL are stored in a directory keyed on a digest
+of the CDL contents, so unchanged CDL templates are not generated again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from compliance_checker import __version__
+from compliance_checker.base import Result
+from compliance_checker.protocols import cdl
+
+
+# default limits used to evict entries from the caches
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # bytes
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60  # seconds
+DEFAULT_NETCDF_MAX_SIZE = 1024 * 1024 * 1024  # bytes
+
+
+def create_cached_data_dir():
+    """
+    Returns the path to the data directory to download CF standard names.
+    Use $XDG_DATA_HOME.
+    """
+    writable_directory = os.path.join(os.path.expanduser("~"), ".local", "share")
+    data_directory = os.path.join(
+        os.environ.get("XDG_DATA_HOME", writable_directory), "compliance-checker"
+    )
+    if not os.path.isdir(data_directory):
+        os.makedirs(data_directory)
+
+    return data_directory
+
+
+def file_digest(path, block_size=2 ** 20):
+    """
+    Returns the hex SHA-256 digest of a file's contents
+
+    :param str path: Path to the file
+    :param int block_size: Number of bytes to read at a time
+    :rtype: str
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def dataset_digest(ds):
+    """
+    Returns a digest identifying the contents of a dataset, or None if the
+    dataset is not backed by a local file and cannot be cached.
+
+    :param ds: A loaded dataset
+    :rtype: str or None
+    """
+    try:
+        path = ds.filepath()
+    except (AttributeError, ValueError):
+        return None
+    if not os.path.isfile(path):
+        return None
+    return file_digest(path)
+
+
+def _json_default(obj):
+    """
+    Converts numpy scalars, which can appear in result values, to builtins
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def dumps_results(groups):
+    """
+    Serializes a list of grouped Result objects to a JSON string
+
+    :param list groups: Grouped results, as returned by CheckSuite.scores
+    :rtype: str
+    """
+    return json.dumps([r.serialize() for r in groups], default=_json_default)
+
+
+def _result_from_dict(d):
+    return Result(
+        weight=d["weight"],
+        value=tuple(d["value"]) if isinstance(d["value"], list) else d["value"],
+        name=d["name"],
+        msgs=d["msgs"],
+        children=[_result_from_dict(c) for c in d["children"]],
+    )
+
+
+def loads_results(payload):
+    """
+    Deserializes a JSON string produced by `dumps_results` back into a list
+    of Result objects
+
+    :param str payload: Serialized results
+    :rtype: list
+    """
+    return [_result_from_dict(d) for d in json.loads(payload)]
+
+
+class ResultCache(object):
+    """
+    SQLite backed cache of grouped checker results.
+
+    Entries older than `max_age` seconds are removed, and the least recently
+    used entries are removed once the stored results exceed `max_size`
+    bytes.  The connection is opened lazily and reopened after a fork, so an
+    instance may be handed to worker processes.
+    """
+
+    def __init__(self, path=None, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE):
+        """
+        :param str path: Path to the SQLite database.  Defaults to
+                         `results.sqlite` in the compliance checker data
+                         directory.
+        :param int max_size: Maximum total size of stored results in bytes
+        :param float max_age: Maximum age of an entry in seconds
+        """
+        if path is None:
+            path = os.path.join(create_cached_data_dir(), "results.sqlite")
+        self.path = path
+        self.max_size = max_size
+        self.max_age = max_age
+        self._conn = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_pid"] = None
+        return state
+
+    @property
+    def conn(self):
+        """
+        Returns the SQLite connection for the current process, creating the
+        results table and evicting stale entries when first opened
+        """
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._pid = os.getpid()
+            with self._conn:
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS results (
+                           key TEXT PRIMARY KEY,
+                           checker TEXT NOT NULL,
+                           created REAL NOT NULL,
+                           accessed REAL NOT NULL,
+                           size INTEGER NOT NULL,
+                           payload TEXT NOT NULL)"""
+                )
+            self.evict()
+        return self._conn
+
+    def close(self):
+        """
+        Closes the underlying connection, if open
+        """
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+    @classmethod
+    def make_key(cls, digest, checker_name, checker_class, skip_checks, options):
+        """
+        Builds a cache key for a checker run against a dataset.
+
+        :param str digest: Digest of the dataset contents
+        :param str checker_name: Checker key, e.g. "cf:1.7"
+        :param type checker_class: The checker class
+        :param skip_checks: Skip check specifications passed to the suite
+        :param options: Options passed to the checker
+        :rtype: str
+        """
+        key_parts = [
+            digest,
+            checker_name,
+            "{}.{}".format(checker_class.__module__, checker_class.__name__),
+            str(getattr(checker_class, "_cc_checker_version", "")),
+            __version__,
+            sorted(skip_checks or []),
+            sorted(str(o) for o in options or []),
+        ]
+        return hashlib.sha256(json.dumps(key_parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached grouped results for a key, or None if there is
+        no entry
+
+        :param str key: Cache key from `make_key`
+        :rtype: list or None
+        """
+        row = self.conn.execute(
+            "SELECT payload, created FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        payload, created = row
+        now = time.time()
+        if self.max_age is not None and now - created > self.max_age:
+            with self.conn:
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return loads_results(payload)
+
+    def put(self, key, checker_name, groups):
+        """
+        Stores grouped results under a key
+
+        :param str key: Cache key from `make_key`
+        :param str checker_name: Checker key, stored for inspection
+        :param list groups: Grouped results, as returned by CheckSuite.scores
+        """
+        payload = dumps_results(groups)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, checker_name, now, now, len(payload), payload),
+            )
+        self._evict_size()
+
+    def evict(self):
+        """
+        Removes entries older than `max_age` and, if the stored results
+        exceed `max_size`, the least recently used entries
+        """
+        if self.max_age is not None:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM results WHERE created < ?",
+                    (time.time() - self.max_age,),
+                )
+        self._evict_size()
+
+    def _evict_size(self):
+        if self.max_size is None:
+            return
+        total = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+        excess = total - self.max_size
+        removed = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM results ORDER BY accessed ASC"
+        ).fetchall():
+            if excess <= 0:
+                break
+            removed.append((key,))
+            excess -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM results WHERE key = ?", removed)
+
+    def clear(self):
+        """
+        Removes all entries from the cache
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM results")
+
+
+class NetCDFCache(object):
+    """
+    Directory of netCDF files generated from CDL files.
+
+    Each entry is a subdirectory named after a digest of the CDL contents,
+    the netCDF format and the parser version, holding the generated file
+    under the CDL file's name.  Using an entry updates its modification
+    time, and the least recently used entries are removed once the stored
+    files exceed `max_size` bytes.  Entries are generated in a temporary
+    directory and renamed into place, so several processes may share the
+    cache.
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_NETCDF_MAX_SIZE):
+        """
+        :param str directory: Path to the cache directory.  Defaults to
+                              `netcdf` in the compliance checker data
+                              directory.
+        :param int max_size: Maximum total size of stored files in bytes
+        """
+        if directory is None:
+            directory = os.path.join(create_cached_data_dir(), "netcdf")
+        self.directory = directory
+        self.max_size = max_size
+
+    @classmethod
+    def make_key(cls, cdl_path, format=None):
+        """
+        Builds a cache key for the netCDF file generated from a CDL file
+
+        :param str cdl_path: Path to the CDL file
+        :param str format: netCDF format, as passed to cdl.generate_netcdf
+        :rtype: str
+        """
+        key_parts = [file_digest(cdl_path), format, cdl.PARSER_VERSION]
+        return hashlib.sha256(json.dumps(key_parts).encode("utf-8")).hexdigest()
+
+    def get(self, cdl_path, format=None):
+        """
+        Returns the path to the netCDF file generated from a CDL file,
+        generating it only if the cache has no entry for the CDL contents
+
+        :param str cdl_path: Path to the CDL file
+        :param str format: netCDF format, as passed to cdl.generate_netcdf
+        :raises ValueError: If the CDL can't be parsed
+        :rtype: str
+        """
+        key = self.make_key(cdl_path, format)
+        entry = os.path.join(self.directory, key)
+        filename = os.path.splitext(os.path.basename(cdl_path))[0] + ".nc"
+        path = os.path.join(entry, filename)
+        if os.path.isfile(path):
+            try:
+                os.utime(entry)
+            except OSError:
+                pass
+            return path
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        try:
+            cdl.generate_netcdf(cdl_path, os.path.join(tmp_dir, filename), format)
+            try:
+                os.rename(tmp_dir, entry)
+            except OSError:
+                # another process stored the same entry first
+                if not os.path.isfile(path):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep=key)
+        return path
+
+    def _entries(self):
+        """
+        Returns (modification time, size, key) of every entry
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            entry = os.path.join(self.directory, key)
+            if key.startswith(".") or not os.path.isdir(entry):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(entry, name))
+                    for name in os.listdir(entry)
+                )
+                entries.append((os.path.getmtime(entry), size, key))
+            except OSError:
+                # removed by another process
+                continue
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries while the stored files
+        exceed `max_size`
+
+        :param str keep: Key of an entry which is never removed
+        """
+        if self.max_size is None or not os.path.isdir(self.directory):
+            return
+        entries = sorted(self._entries())
+        excess = sum(size for _, size, _ in entries) - self.max_size
+        for _, size, key in entries:
+            if excess <= 0:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            excess -= size
+
+    def clear(self):
+        """
+        Removes all entries from the cache
+        """
+        if os.path.isdir(self.directory):
+            for _, _, key in self._entries():
+                shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
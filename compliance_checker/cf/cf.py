@@ -5,7 +5,7 @@ import os
 import sqlite3
 import sys
 
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict, defaultdict, namedtuple
 from functools import wraps
 from warnings import warn
 
@@ -13,10 +13,15 @@ import numpy as np
 import pyproj
 import regex
 
-from cf_units import Unit
-
 from compliance_checker import cfutil
-from compliance_checker.base import BaseCheck, BaseNCCheck, Result, TestCtx
+from compliance_checker.base import (
+    BaseCheck,
+    BaseNCCheck,
+    Deferred,
+    Result,
+    TestCtx,
+    data_dependent,
+)
 from compliance_checker.cf import util
 from compliance_checker.cf.appendix_d import (
     dimless_vertical_coordinates_1_6,
@@ -33,6 +38,7 @@ from compliance_checker.cf.appendix_f import (
     horizontal_datum_names17,
     prime_meridian_names17,
 )
+from compliance_checker.units import parse_unit
 
 
 logger = logging.getLogger(__name__)
@@ -64,11 +70,57 @@ def is_likely_dsg(func):
     return _dec
 
 
+def _pretty_dimension_order_with_type(dimensions, dim_types, unlimited_dims):
+    """
+    Returns a comma separated string of dimensions of format
+    "DIMENSIONS_NAME (DIMENSION_TYPE[, unlimited])"
+
+    :param tuple dimensions: The names of a variable's dimensions
+    :param tuple dim_types: The types of the dimensions, as returned by
+                            CFBaseCheck._get_dimension_order
+    :param frozenset unlimited_dims: The names of the unlimited dimensions
+    :rtype: str
+    """
+    dim_names = []
+    for dim, dim_type in zip(dimensions, dim_types):
+        dim_name = "{} ({}".format(dim, dim_type)
+        if dim in unlimited_dims:
+            dim_name += ", unlimited)"
+        else:
+            dim_name += ")"
+        dim_names.append(dim_name)
+    return ", ".join(dim_names)
+
+
+# Products of CFBaseCheck.setup, which don't depend on the CF version.  They
+# are found once per dataset and shared by every CF based checker run against
+# it: lists of variable names are stored as tuples, coord_data_vars as a
+# frozenset and standard_name_table is the path of the standard name table
+# named by the dataset, or None for the packaged table.
+CFSetup = namedtuple(
+    "CFSetup",
+    [
+        "coord_vars",
+        "aux_coord_vars",
+        "ancillary_vars",
+        "clim_vars",
+        "boundary_vars",
+        "metadata_vars",
+        "geophysical_vars",
+        "coord_data_vars",
+        "standard_name_table",
+    ],
+)
+
+
 class CFBaseCheck(BaseCheck):
     """
     CF Convention Checker Base
     """
 
+    # reset forgets the variable types and standard name table of a dataset
+    _cc_reusable = True
+
     def __init__(self, options=None):
         # The compliance checker can be run on multiple datasets in a single
         # instantiation, so caching values has be done by the unique identifier
@@ -86,6 +138,7 @@ class CFBaseCheck(BaseCheck):
         self._aux_coords = defaultdict(list)
 
         self._std_names = util.StandardNameTable()
+        self._packaged_std_names_path = self._std_names._path
 
         self.section_titles = {  # dict of section headers shared by grouped checks
             "2.2": "§2.2 Data Types",
@@ -132,21 +185,70 @@ class CFBaseCheck(BaseCheck):
     # Helper Methods - var classifications, etc
     ################################################################################
 
+    def reset(self):
+        """
+        Forgets the variable types of previously checked datasets and goes
+        back to the packaged standard name table, keeping any names added to
+        it
+        """
+        super(CFBaseCheck, self).reset()
+        for cache in (
+            self._coord_vars,
+            self._ancillary_vars,
+            self._clim_vars,
+            self._metadata_vars,
+            self._boundary_vars,
+            self._geophysical_vars,
+            self._aux_coords,
+        ):
+            cache.clear()
+        if self._std_names._path != self._packaged_std_names_path:
+            self._use_standard_name_table(self._packaged_std_names_path)
+
     def setup(self, ds):
         """
         Initialize various special variable types within the class.
-        Mutates a number of instance variables.
+        Mutates a number of instance variables.  The variable types and the
+        standard name table are found once per dataset and shared with other
+        CF based checkers, so checking several CF versions doesn't repeat
+        them.
 
         :param netCDF4.Dataset ds: An open netCDF dataset
         """
-        self.coord_vars = self._find_coord_vars(ds)
-        self._find_aux_coord_vars(ds)
-        self._find_ancillary_vars(ds)
-        self._find_clim_vars(ds)
-        self._find_boundary_vars(ds)
-        self._find_metadata_vars(ds)
-        self._find_cf_standard_name_table(ds)
-        self._find_geophysical_vars(ds)
+        products = cfutil.shared_analysis(
+            ds, ("CFBaseCheck.setup",), lambda: self._find_setup_products(ds)
+        )
+        self._coord_vars[ds] = list(products.coord_vars)
+        self._aux_coords[ds] = list(products.aux_coord_vars)
+        self._ancillary_vars[ds] = list(products.ancillary_vars)
+        self._clim_vars[ds] = list(products.clim_vars)
+        self._boundary_vars[ds] = list(products.boundary_vars)
+        self._metadata_vars[ds] = list(products.metadata_vars)
+        self._geophysical_vars[ds] = list(products.geophysical_vars)
+        if products.standard_name_table is not None:
+            self._use_standard_name_table(products.standard_name_table)
+        self.coord_vars = self._coord_vars[ds]
+        self.coord_data_vars = set(products.coord_data_vars)
+
+    def _find_setup_products(self, ds):
+        """
+        Finds the special variable types of a dataset and its standard name
+        table
+
+        :param netCDF4.Dataset ds: An open netCDF dataset
+        :rtype: CFSetup
+        """
+        coord_vars = self._find_coord_vars(ds)
+        aux_coord_vars = self._find_aux_coord_vars(ds)
+        ancillary_vars = self._find_ancillary_vars(ds)
+        clim_vars = self._find_clim_vars(ds)
+        boundary_vars = self._find_boundary_vars(ds)
+        metadata_vars = self._find_metadata_vars(ds)
+        if self._find_cf_standard_name_table(ds):
+            standard_name_table = self._std_names._path
+        else:
+            standard_name_table = None
+        geophysical_vars = self._find_geophysical_vars(ds)
         coord_containing_vars = ds.get_variables_by_attributes(
             coordinates=lambda val: isinstance(val, str)
         )
@@ -164,14 +266,26 @@ class CFBaseCheck(BaseCheck):
 
         # first read in variables referred to in coordinates which exist
         # in the dataset
-        self.coord_data_vars = set()
+        coord_data_vars = set()
         for var in coord_containing_vars:
             for coord_var_name in var.coordinates.strip().split(" "):
                 if coord_var_name in ds.variables:
-                    self.coord_data_vars.add(coord_var_name)
+                    coord_data_vars.add(coord_var_name)
         # then add in the NUG coordinate variables -- single dimension with
         # dimension name the same as coordinates
-        self.coord_data_vars.update(self.coord_vars)
+        coord_data_vars.update(coord_vars)
+
+        return CFSetup(
+            tuple(coord_vars),
+            tuple(aux_coord_vars),
+            tuple(ancillary_vars),
+            tuple(clim_vars),
+            tuple(boundary_vars),
+            tuple(metadata_vars),
+            tuple(geophysical_vars),
+            frozenset(coord_data_vars),
+            standard_name_table,
+        )
 
     def check_grid_mapping(self, ds):
         """
@@ -248,25 +362,23 @@ class CFBaseCheck(BaseCheck):
                         for grid_var_name, coord_var_str in re_all:
                             defines_grid_mapping.assert_true(
                                 grid_var_name in ds.variables,
-                                "grid mapping variable {} must exist in this dataset".format(
-                                    grid_var_name
-                                ),
+                                "grid mapping variable {} must exist in this dataset",
+                                grid_var_name,
                             )
                             for ref_var in coord_var_str.split():
                                 defines_grid_mapping.assert_true(
                                     ref_var in ds.variables,
-                                    "Coordinate-related variable {} referenced by grid_mapping variable {} must exist in this dataset".format(
-                                        ref_var, grid_var_name
-                                    ),
+                                    "Coordinate-related variable {} referenced by grid_mapping variable {} must exist in this dataset",
+                                    ref_var,
+                                    grid_var_name,
                                 )
 
                 else:
                     for grid_var_name in grid_mapping.split():
                         defines_grid_mapping.assert_true(
                             grid_var_name in ds.variables,
-                            "grid mapping variable {} must exist in this dataset".format(
-                                grid_var_name
-                            ),
+                            "grid mapping variable {} must exist in this dataset",
+                            grid_var_name,
                         )
             ret_val[variable.name] = defines_grid_mapping.to_result()
 
@@ -303,9 +415,9 @@ class CFBaseCheck(BaseCheck):
             for req in required_attrs:
                 valid_grid_mapping.assert_true(
                     hasattr(grid_var, req),
-                    "{} is a required attribute for grid mapping {}".format(
-                        req, grid_mapping_name
-                    ),
+                    "{} is a required attribute for grid mapping {}",
+                    req,
+                    grid_mapping_name,
                 )
 
             # Make sure that exactly one of the exclusive attributes exist
@@ -422,8 +534,8 @@ class CFBaseCheck(BaseCheck):
 
         valid_formula_terms.assert_true(
             isinstance(formula_terms, str) and formula_terms,
-            "§4.3.2: {}'s formula_terms is a required attribute and must be a non-empty string"
-            "".format(coord),
+            "§4.3.2: {}'s formula_terms is a required attribute and must be a non-empty string",
+            coord,
         )
         # We can't check any more
         if not formula_terms:
@@ -455,16 +567,18 @@ class CFBaseCheck(BaseCheck):
 
         valid_formula_terms.assert_true(
             standard_name in dimless_coords_dict,
-            "unknown standard_name '{}' for dimensionless vertical coordinate {}"
-            "".format(standard_name, coord),
+            "unknown standard_name '{}' for dimensionless vertical coordinate {}",
+            standard_name,
+            coord,
         )
         if standard_name not in dimless_coords_dict:
             return valid_formula_terms.to_result()
 
         valid_formula_terms.assert_true(
             no_missing_terms(standard_name, terms, dimless_coords_dict),
-            "{}'s formula_terms are invalid for {}, please see appendix D of CF 1.6"
-            "".format(coord, standard_name),
+            "{}'s formula_terms are invalid for {}, please see appendix D of CF 1.6",
+            coord,
+            standard_name,
         )
 
         return valid_formula_terms.to_result()
@@ -515,9 +629,11 @@ class CFBaseCheck(BaseCheck):
         ctx.assert_true(
             type_match,
             "Attribute '{}' (type: {}) and parent variable '{}' (type: {}) "
-            "must have equivalent datatypes".format(
-                attr_name, val_type, var.name, var.dtype.type
-            ),
+            "must have equivalent datatypes",
+            attr_name,
+            val_type,
+            var.name,
+            var.dtype.type,
         )
 
     def _find_aux_coord_vars(self, ds, refresh=False):
@@ -538,7 +654,7 @@ class CFBaseCheck(BaseCheck):
         if self._aux_coords.get(ds, None) and refresh is False:
             return self._aux_coords[ds]
 
-        self._aux_coords[ds] = cfutil.get_auxiliary_coordinate_variables(ds)
+        self._aux_coords[ds] = list(cfutil.get_auxiliary_coordinate_variables(ds))
         return self._aux_coords[ds]
 
     def _find_boundary_vars(self, ds, refresh=False):
@@ -555,7 +671,7 @@ class CFBaseCheck(BaseCheck):
         if self._boundary_vars.get(ds, None) and refresh is False:
             return self._boundary_vars[ds]
 
-        self._boundary_vars[ds] = cfutil.get_cell_boundary_variables(ds)
+        self._boundary_vars[ds] = list(cfutil.get_cell_boundary_variables(ds))
 
         return self._boundary_vars[ds]
 
@@ -707,7 +823,7 @@ class CFBaseCheck(BaseCheck):
                     file=sys.stderr,
                 )
 
-            self._std_names = util.StandardNameTable(location)
+            self._use_standard_name_table(location)
             return True
         except Exception as e:
             # There was an error downloading the CF table. That's ok, we'll just use the packaged version
@@ -717,6 +833,17 @@ class CFBaseCheck(BaseCheck):
             )
             return False
 
+    def _use_standard_name_table(self, location):
+        """
+        Replaces the standard name table with the one at `location`, keeping
+        any names added to the current table with `StandardNameTable.extend`
+
+        :param str location: Path of the standard name table
+        """
+        table = util.StandardNameTable(location)
+        table.extend(self._std_names._extra_names)
+        self._std_names = table
+
     def _find_coord_vars(self, ds, refresh=False):
         """
         Returns a list of variable names that identify as coordinate variables.
@@ -734,7 +861,7 @@ class CFBaseCheck(BaseCheck):
         if ds in self._coord_vars and refresh is False:
             return self._coord_vars[ds]
 
-        self._coord_vars[ds] = cfutil.get_coordinate_variables(ds)
+        self._coord_vars[ds] = list(cfutil.get_coordinate_variables(ds))
 
         return self._coord_vars[ds]
 
@@ -753,7 +880,7 @@ class CFBaseCheck(BaseCheck):
         if self._geophysical_vars.get(ds, None) and refresh is False:
             return self._geophysical_vars[ds]
 
-        self._geophysical_vars[ds] = cfutil.get_geophysical_variables(ds)
+        self._geophysical_vars[ds] = list(cfutil.get_geophysical_variables(ds))
 
         return self._geophysical_vars[ds]
 
@@ -965,15 +1092,14 @@ class CFBaseCheck(BaseCheck):
         :rtype: str
         :return: A comma separated string of the variable's dimensions
         """
-        dim_names = []
-        for dim, dim_type in zip(ds.variables[name].dimensions, dim_types):
-            dim_name = "{} ({}".format(dim, dim_type)
-            if ds.dimensions[dim].isunlimited():
-                dim_name += ", unlimited)"
-            else:
-                dim_name += ")"
-            dim_names.append(dim_name)
-        return ", ".join(dim_names)
+        unlimited_dims = frozenset(
+            dim
+            for dim in ds.variables[name].dimensions
+            if ds.dimensions[dim].isunlimited()
+        )
+        return _pretty_dimension_order_with_type(
+            ds.variables[name].dimensions, dim_types, unlimited_dims
+        )
 
     def _is_station_var(self, var):
         """
@@ -1494,7 +1620,8 @@ class CF1_6Check(CFNCCheck):
             variable_naming.assert_true(
                 rname.match(name) is not None,
                 "variable {} should begin with a letter and be composed of "
-                "letters, digits, and underscores".format(name),
+                "letters, digits, and underscores",
+                name,
             )
 
             # Keep track of all the attributes, we'll need to check them
@@ -1510,7 +1637,9 @@ class CF1_6Check(CFNCCheck):
                 attribute_naming.assert_true(
                     rname.match(attr) is not None,
                     "attribute {}:{} should begin with a letter and be composed of "
-                    "letters, digits, and underscores".format(name, attr),
+                    "letters, digits, and underscores",
+                    name,
+                    attr,
                 )
 
         ret_val.append(variable_naming.to_result())
@@ -1519,7 +1648,8 @@ class CF1_6Check(CFNCCheck):
             dimension_naming.assert_true(
                 rname.match(dimension) is not None,
                 "dimension {} should begin with a latter and be composed of "
-                "letters, digits, and underscores".format(dimension),
+                "letters, digits, and underscores",
+                dimension,
             )
         ret_val.append(dimension_naming.to_result())
 
@@ -1532,7 +1662,8 @@ class CF1_6Check(CFNCCheck):
             attribute_naming.assert_true(
                 rname.match(global_attr) is not None,
                 "global attribute {} should begin with a letter and be composed of "
-                "letters, digits, and underscores".format(global_attr),
+                "letters, digits, and underscores",
+                global_attr,
             )
         ret_val.append(attribute_naming.to_result())
 
@@ -1622,6 +1753,10 @@ class CF1_6Check(CFNCCheck):
         # bounds variables
         any_clim = cfutil.get_climatology_variable(ds)
         any_bounds = cfutil.get_cell_boundary_variables(ds)
+        # the failure messages are only formatted if they're reported
+        unlimited_dims = frozenset(
+            dim_name for dim_name, dim in ds.dimensions.items() if dim.isunlimited()
+        )
         for name, variable in ds.variables.items():
             # Skip bounds/climatology variables, as they should implicitly
             # have the same order except for the bounds specific dimension.
@@ -1643,11 +1778,13 @@ class CF1_6Check(CFNCCheck):
                     "recommended order T, Z, Y, X and/or further dimensions "
                     "are not located left of T, Z, Y, X. The dimensions (and "
                     "their guessed types) are {} (with U: other/unknown; L: "
-                    "unlimited).".format(
-                        name,
-                        self._get_pretty_dimension_order_with_type(
-                            ds, name, dimension_order
-                        ),
+                    "unlimited).",
+                    name,
+                    Deferred(
+                        _pretty_dimension_order_with_type,
+                        variable.dimensions,
+                        tuple(dimension_order),
+                        unlimited_dims,
                     ),
                 )
         return valid_dimension_order.to_result()
@@ -1681,9 +1818,9 @@ class CF1_6Check(CFNCCheck):
                     m = "§2.5.1 Fill Values should be outside the range specified by valid_range"  # subsection message
                     valid_fill_range.assert_true(
                         False,
-                        "{};\n\t{}:valid_range must be a numeric type not a string".format(
-                            m, name
-                        ),
+                        "{};\n\t{}:valid_range must be a numeric type not a string",
+                        m,
+                        name,
                     )
                     continue
                 rmin, rmax = variable.valid_range
@@ -1692,13 +1829,11 @@ class CF1_6Check(CFNCCheck):
             elif "valid_min" in attrs and "valid_max" in attrs:
                 if isinstance(variable.valid_min, str):
                     valid_fill_range.assert_true(
-                        False,
-                        "{}:valid_min must be a numeric type not a string".format(name),
+                        False, "{}:valid_min must be a numeric type not a string", name,
                     )
                 if isinstance(variable.valid_max, str):
                     valid_fill_range.assert_true(
-                        False,
-                        "{}:valid_max must be a numeric type not a string".format(name),
+                        False, "{}:valid_max must be a numeric type not a string", name,
                     )
                 if isinstance(variable.valid_min, str) or isinstance(
                     variable.valid_max, str
@@ -1717,8 +1852,12 @@ class CF1_6Check(CFNCCheck):
 
             valid_fill_range.assert_true(
                 valid,
-                "{}:_FillValue ({}) should be outside the range specified by {} ({}, {})"
-                "".format(name, fill_value, spec_by, rmin, rmax),
+                "{}:_FillValue ({}) should be outside the range specified by {} ({}, {})",
+                name,
+                fill_value,
+                spec_by,
+                rmin,
+                rmax,
             )
 
         return valid_fill_range.to_result()
@@ -1743,8 +1882,8 @@ class CF1_6Check(CFNCCheck):
             is_string = isinstance(dataset_attr, str)
             valid_globals.assert_true(
                 is_string and len(dataset_attr),
-                "§2.6.2 global attribute {} should exist and be a non-empty string"  # subsection message
-                "".format(attr),
+                "§2.6.2 global attribute {} should exist and be a non-empty string",
+                attr,
             )
         return valid_globals.to_result()
 
@@ -1777,8 +1916,9 @@ class CF1_6Check(CFNCCheck):
                     is_string = isinstance(varattr, str)
                     valid_attributes.assert_true(
                         is_string and len(varattr) > 0,
-                        "§2.6.2 {}:{} should be a non-empty string"
-                        "".format(name, attribute),
+                        "§2.6.2 {}:{} should be a non-empty string",
+                        name,
+                        attribute,
                     )
                     attr_bin.add(attribute)
 
@@ -1789,8 +1929,8 @@ class CF1_6Check(CFNCCheck):
                 is_string = isinstance(dsattr, str)
                 valid_attributes.assert_true(
                     is_string and len(dsattr) > 0,
-                    "§2.6.2 {} global attribute should be a non-empty string"
-                    "".format(attribute),
+                    "§2.6.2 {} global attribute should be a non-empty string",
+                    attribute,
                 )
                 attr_bin.add(attribute)
         return valid_attributes.to_result()
@@ -1867,9 +2007,9 @@ class CF1_6Check(CFNCCheck):
             # side effects, but better than teasing out the individual result
             if units_attr_is_string.assert_true(
                 isinstance(units, str),
-                "units ({}) attribute of '{}' must be a string compatible with UDUNITS".format(
-                    units, variable.name
-                ),
+                "units ({}) attribute of '{}' must be a string compatible with UDUNITS",
+                units,
+                variable.name,
             ):
                 valid_udunits = self._check_valid_udunits(ds, name)
                 ret_val.append(valid_udunits)
@@ -1902,7 +2042,7 @@ class CF1_6Check(CFNCCheck):
             standard_name_full
         )
         std_name_units_dimensionless = cfutil.is_dimensionless_standard_name(
-            self._std_names._root, standard_name
+            self._std_names, standard_name
         )
         # Is this even in the database? also, if there is no standard_name,
         # there's no way to know if it is dimensionless.
@@ -1917,9 +2057,8 @@ class CF1_6Check(CFNCCheck):
         valid_units = TestCtx(BaseCheck.HIGH, self.section_titles["3.1"])
         valid_units.assert_true(
             should_be_dimensionless or units is not None,
-            "units attribute is required for {} when variable is not a dimensionless quantity".format(
-                variable_name
-            ),
+            "units attribute is required for {} when variable is not a dimensionless quantity",
+            variable_name,
         )
 
         # Don't bother checking the rest
@@ -1928,13 +2067,16 @@ class CF1_6Check(CFNCCheck):
         # 2) units attribute must be a string
         valid_units.assert_true(
             should_be_dimensionless or isinstance(units, str),
-            "units attribute for {} needs to be a string".format(variable_name),
+            "units attribute for {} needs to be a string",
+            variable_name,
         )
 
         # 3) units are not deprecated
         valid_units.assert_true(
             units not in deprecated,
-            'units for {}, "{}" are deprecated by CF 1.6'.format(variable_name, units),
+            'units for {}, "{}" are deprecated by CF 1.6',
+            variable_name,
+            units,
         )
 
         return valid_units.to_result()
@@ -1952,7 +2094,7 @@ class CF1_6Check(CFNCCheck):
         standard_name = getattr(variable, "standard_name", None)
         standard_name, standard_name_modifier = self._split_standard_name(standard_name)
         std_name_units_dimensionless = cfutil.is_dimensionless_standard_name(
-            self._std_names._root, standard_name
+            self._std_names, standard_name
         )
 
         # If the variable is supposed to be dimensionless, it automatically passes
@@ -1966,9 +2108,9 @@ class CF1_6Check(CFNCCheck):
         are_udunits = units is not None and util.units_known(units)
         valid_udunits.assert_true(
             should_be_dimensionless or are_udunits,
-            'units for {}, "{}" are not recognized by UDUNITS'.format(
-                variable_name, units
-            ),
+            'units for {}, "{}" are not recognized by UDUNITS',
+            variable_name,
+            units,
         )
         return valid_udunits.to_result()
 
@@ -1989,7 +2131,7 @@ class CF1_6Check(CFNCCheck):
 
         # If the variable is supposed to be dimensionless, it automatically passes
         std_name_units_dimensionless = cfutil.is_dimensionless_standard_name(
-            self._std_names._root, standard_name
+            self._std_names, standard_name
         )
 
         standard_name, standard_name_modifier = self._split_standard_name(standard_name)
@@ -2015,8 +2157,8 @@ class CF1_6Check(CFNCCheck):
         if standard_name == "time":
             valid_standard_units.assert_true(
                 util.units_convertible(units, "seconds since 1970-01-01"),
-                "time must be in a valid units format <unit> since <epoch> "
-                "not {}".format(units),
+                "time must be in a valid units format <unit> since <epoch> not {}",
+                units,
             )
 
         # UDunits can't tell the difference between east and north facing coordinates
@@ -2027,7 +2169,9 @@ class CF1_6Check(CFNCCheck):
                 units.lower() in allowed_units,
                 'variables defining latitude ("{}") must use degrees_north '
                 "or degrees if defining a transformed grid. Currently "
-                "{}".format(variable_name, units),
+                "{}",
+                variable_name,
+                units,
             )
         # UDunits can't tell the difference between east and north facing coordinates
         elif standard_name == "longitude":
@@ -2037,7 +2181,9 @@ class CF1_6Check(CFNCCheck):
                 units.lower() in allowed_units,
                 'variables defining longitude ("{}") must use degrees_east '
                 "or degrees if defining a transformed grid. Currently "
-                "{}".format(variable_name, units),
+                "{}",
+                variable_name,
+                units,
             )
         # Standard Name table agrees the unit should be dimensionless
         elif std_name_units_dimensionless:
@@ -2047,8 +2193,10 @@ class CF1_6Check(CFNCCheck):
             valid_standard_units.assert_true(
                 util.units_convertible(canonical_units, units),
                 "units for variable {} must be convertible to {} "
-                "currently they are {}".format(variable_name, canonical_units,
-                                               units),
+                "currently they are {}",
+                variable_name,
+                canonical_units,
+                units,
             )
 
         return valid_standard_units.to_result()
@@ -2107,7 +2255,8 @@ class CF1_6Check(CFNCCheck):
                 long_name_present = True
                 long_or_std_name.assert_true(
                     isinstance(long_name, str),
-                    "Attribute long_name for variable {} must be a string".format(name),
+                    "Attribute long_name for variable {} must be a string",
+                    name,
                 )
             else:
                 long_name_present = False
@@ -2123,16 +2272,15 @@ class CF1_6Check(CFNCCheck):
                 valid_std_name = TestCtx(BaseCheck.HIGH, self.section_titles["3.3"])
                 valid_std_name.assert_true(
                     isinstance(standard_name, str),
-                    "Attribute standard_name for variable {} must be a string".format(
-                        name
-                    ),
+                    "Attribute standard_name for variable {} must be a string",
+                    name,
                 )
                 if isinstance(standard_name, str):
                     valid_std_name.assert_true(
                         standard_name in self._std_names,
-                        "standard_name {} is not defined in Standard Name Table v{}".format(
-                            standard_name or "undefined", self._std_names._version
-                        ),
+                        "standard_name {} is not defined in Standard Name Table v{}",
+                        standard_name or "undefined",
+                        self._std_names._version,
                     )
 
                 ret_val.append(valid_std_name.to_result())
@@ -2149,7 +2297,9 @@ class CF1_6Check(CFNCCheck):
                     valid_modifier.assert_true(
                         standard_name_modifier in allowed,
                         "standard_name modifier {} for variable {} is not a valid modifier "
-                        "according to appendix C".format(standard_name_modifier, name),
+                        "according to appendix C",
+                        standard_name_modifier,
+                        name,
                     )
 
                     ret_val.append(valid_modifier.to_result())
@@ -2158,9 +2308,8 @@ class CF1_6Check(CFNCCheck):
 
             long_or_std_name.assert_true(
                 long_name_present or standard_name_present,
-                "Attribute long_name or/and standard_name is highly recommended for variable {}".format(
-                    name
-                ),
+                "Attribute long_name or/and standard_name is highly recommended for variable {}",
+                name,
             )
             ret_val.append(long_or_std_name.to_result())
         return ret_val
@@ -2193,8 +2342,8 @@ class CF1_6Check(CFNCCheck):
 
             valid_ancillary.assert_true(
                 isinstance(ancillary_variables, str),
-                "ancillary_variables attribute defined by {} "
-                "should be string".format(name),
+                "ancillary_variables attribute defined by {} " "should be string",
+                name,
             )
 
             # Can't perform the second check if it's not a string
@@ -2205,7 +2354,8 @@ class CF1_6Check(CFNCCheck):
             for ancillary_variable in ancillary_variables.split():
                 valid_ancillary.assert_true(
                     ancillary_variable in ds.variables,
-                    "{} is not a variable in this dataset".format(ancillary_variable),
+                    "{} is not a variable in this dataset",
+                    ancillary_variable,
                 )
 
             ret_val.append(valid_ancillary.to_result())
@@ -2256,7 +2406,8 @@ class CF1_6Check(CFNCCheck):
             # Check that the variable defines mask or values
             valid_flags_var.assert_true(
                 flag_values is not None or flag_masks is not None,
-                "{} does not define either flag_masks or flag_values".format(name),
+                "{} does not define either flag_masks or flag_values",
+                name,
             )
             ret_val.append(valid_flags_var.to_result())
 
@@ -2312,9 +2463,9 @@ class CF1_6Check(CFNCCheck):
         # flag_values must be a list of values, not a string or anything else
         valid_values.assert_true(
             isinstance(flag_values, np.ndarray),
-            "{}'s flag_values must be an array of values not {}".format(
-                name, type(flag_values)
-            ),
+            "{}'s flag_values must be an array of values not {}",
+            name,
+            type(flag_values),
         )
 
         # We can't perform any more checks
@@ -2325,14 +2476,17 @@ class CF1_6Check(CFNCCheck):
         flag_set = set(flag_values)
         valid_values.assert_true(
             len(flag_set) == len(flag_values),
-            "{}'s flag_values must be independent and can not be repeated".format(name),
+            "{}'s flag_values must be independent and can not be repeated",
+            name,
         )
 
         # the data type for flag_values should be the same as the variable
         valid_values.assert_true(
             variable.dtype.type == flag_values.dtype.type,
-            "flag_values ({}) must be the same data type as {} ({})"
-            "".format(flag_values.dtype.type, name, variable.dtype.type),
+            "flag_values ({}) must be the same data type as {} ({})",
+            flag_values.dtype.type,
+            name,
+            variable.dtype.type,
         )
 
         if isinstance(flag_meanings, str):
@@ -2369,9 +2523,9 @@ class CF1_6Check(CFNCCheck):
 
         valid_masks.assert_true(
             isinstance(flag_masks, np.ndarray),
-            "{}'s flag_masks must be an array of values not {}".format(
-                name, type(flag_masks).__name__
-            ),
+            "{}'s flag_masks must be an array of values not {}",
+            name,
+            type(flag_masks).__name__,
         )
 
         if not isinstance(flag_masks, np.ndarray):
@@ -2379,8 +2533,10 @@ class CF1_6Check(CFNCCheck):
 
         valid_masks.assert_true(
             variable.dtype.type == flag_masks.dtype.type,
-            "flag_masks ({}) mustbe the same data type as {} ({})"
-            "".format(flag_masks.dtype.type, name, variable.dtype.type),
+            "flag_masks ({}) mustbe the same data type as {} ({})",
+            flag_masks.dtype.type,
+            name,
+            variable.dtype.type,
         )
 
         type_ok = (
@@ -2390,8 +2546,7 @@ class CF1_6Check(CFNCCheck):
         )
 
         valid_masks.assert_true(
-            type_ok,
-            "{}'s data type must be capable of bit-field expression".format(name),
+            type_ok, "{}'s data type must be capable of bit-field expression", name,
         )
 
         if isinstance(flag_meanings, str):
@@ -2424,12 +2579,14 @@ class CF1_6Check(CFNCCheck):
 
         valid_meanings.assert_true(
             flag_meanings is not None,
-            "{}'s flag_meanings attribute is required for flag variables".format(name),
+            "{}'s flag_meanings attribute is required for flag variables",
+            name,
         )
 
         valid_meanings.assert_true(
             isinstance(flag_meanings, str),
-            "{}'s flag_meanings attribute must be a string".format(name),
+            "{}'s flag_meanings attribute must be a string",
+            name,
         )
 
         # We can't perform any additional checks if it's not a string
@@ -2437,7 +2594,7 @@ class CF1_6Check(CFNCCheck):
             return valid_meanings.to_result()
 
         valid_meanings.assert_true(
-            len(flag_meanings) > 0, "{}'s flag_meanings can't be empty".format(name)
+            len(flag_meanings) > 0, "{}'s flag_meanings can't be empty", name
         )
 
         flag_regx = regex.compile(r"^[0-9A-Za-z_\-.+@]+$")
@@ -2519,7 +2676,8 @@ class CF1_6Check(CFNCCheck):
         axis_is_string = (isinstance(axis, str),)
         valid_axis.assert_true(
             axis_is_string and len(axis) > 0,
-            "{}'s axis attribute must be a non-empty string".format(name),
+            "{}'s axis attribute must be a non-empty string",
+            name,
         )
 
         # If axis isn't a string we can't continue any checks
@@ -2588,8 +2746,7 @@ class CF1_6Check(CFNCCheck):
             # Check that latitude defines units
             valid_latitude = TestCtx(BaseCheck.HIGH, self.section_titles["4.1"])
             valid_latitude.assert_true(
-                units is not None,
-                "latitude variable '{}' must define units".format(latitude),
+                units is not None, "latitude variable '{}' must define units", latitude,
             )
             ret_val.append(valid_latitude.to_result())
 
@@ -2600,15 +2757,18 @@ class CF1_6Check(CFNCCheck):
                 # check that the units aren't in east and north degrees units,
                 # but are convertible to angular units
                 allowed_units.assert_true(
-                    units not in e_n_units and Unit(units) == Unit("degree"),
+                    units not in e_n_units
+                    and parse_unit(units) == parse_unit("degree"),
                     "Grid latitude variable '{}' should use degree equivalent units without east or north components. "
-                    "Current units are {}".format(latitude, units),
+                    "Current units are {}",
+                    latitude,
+                    units,
                 )
             else:
                 allowed_units.assert_true(
                     units_is_string and units.lower() in allowed_lat_units,
-                    "latitude variable '{}' should define valid units for latitude"
-                    "".format(latitude),
+                    "latitude variable '{}' should define valid units for latitude",
+                    latitude,
                 )
             ret_val.append(allowed_units.to_result())
 
@@ -2630,8 +2790,8 @@ class CF1_6Check(CFNCCheck):
             definition = TestCtx(BaseCheck.MEDIUM, self.section_titles["4.1"])
             definition.assert_true(
                 standard_name == "latitude" or axis == "Y" or y_variables != [],
-                "latitude variable '{}' should define standard_name='latitude' or axis='Y'"
-                "".format(latitude),
+                "latitude variable '{}' should define standard_name='latitude' or axis='Y'",
+                latitude,
             )
             ret_val.append(definition.to_result())
 
@@ -2695,7 +2855,8 @@ class CF1_6Check(CFNCCheck):
             valid_longitude = TestCtx(BaseCheck.HIGH, self.section_titles["4.2"])
             valid_longitude.assert_true(
                 units is not None,
-                "longitude variable '{}' must define units".format(longitude),
+                "longitude variable '{}' must define units",
+                longitude,
             )
             ret_val.append(valid_longitude.to_result())
 
@@ -2706,15 +2867,18 @@ class CF1_6Check(CFNCCheck):
                 # check that the units aren't in east and north degrees units,
                 # but are convertible to angular units
                 allowed_units.assert_true(
-                    units not in e_n_units and Unit(units) == Unit("degree"),
+                    units not in e_n_units
+                    and parse_unit(units) == parse_unit("degree"),
                     "Grid longitude variable '{}' should use degree equivalent units without east or north components. "
-                    "Current units are {}".format(longitude, units),
+                    "Current units are {}",
+                    longitude,
+                    units,
                 )
             else:
                 allowed_units.assert_true(
                     units_is_string and units.lower() in allowed_lon_units,
-                    "longitude variable '{}' should define valid units for longitude"
-                    "".format(longitude),
+                    "longitude variable '{}' should define valid units for longitude",
+                    longitude,
                 )
             ret_val.append(allowed_units.to_result())
 
@@ -2736,8 +2900,8 @@ class CF1_6Check(CFNCCheck):
             definition = TestCtx(BaseCheck.MEDIUM, self.section_titles["4.2"])
             definition.assert_true(
                 standard_name == "longitude" or axis == "X" or x_variables != [],
-                "longitude variable '{}' should define standard_name='longitude' or axis='X'"
-                "".format(longitude),
+                "longitude variable '{}' should define standard_name='longitude' or axis='X'",
+                longitude,
             )
             ret_val.append(definition.to_result())
 
@@ -2790,14 +2954,16 @@ class CF1_6Check(CFNCCheck):
             valid_vertical_coord.assert_true(
                 isinstance(units, str) and units,
                 "§4.3.1 {}'s units must be defined for vertical coordinates, "
-                "there is no default".format(name),
+                "there is no default",
+                name,
             )
 
             if not util.units_convertible("bar", units):
                 valid_vertical_coord.assert_true(
                     positive in ("up", "down"),
                     "{}: vertical coordinates not defining pressure must include "
-                    "a positive attribute that is either 'up' or 'down'".format(name),
+                    "a positive attribute that is either 'up' or 'down'",
+                    name,
                 )
 
             # _check_valid_standard_units, part of the Chapter 3 checks,
@@ -2831,8 +2997,9 @@ class CF1_6Check(CFNCCheck):
 
         is_not_deprecated.assert_true(
             units not in deprecated_units,
-            "§4.3.2: units are deprecated by CF in variable {}: {}"
-            "".format(vname, units),
+            "§4.3.2: units are deprecated by CF in variable {}: {}",
+            vname,
+            units,
         )
 
         # check the vertical coordinates
@@ -3056,8 +3223,9 @@ class CF1_6Check(CFNCCheck):
                 valid_aux_coords.assert_true(
                     aux_coord in ds.variables,
                     "{}'s auxiliary coordinate specified by the coordinates attribute, {}, "
-                    "is not a variable in this dataset"
-                    "".format(name, aux_coord),
+                    "is not a variable in this dataset",
+                    name,
+                    aux_coord,
                 )
                 if aux_coord not in ds.variables:
                     continue
@@ -3075,10 +3243,11 @@ class CF1_6Check(CFNCCheck):
                 valid_aux_coords.assert_true(
                     aux_coord_dims.issubset(dim_set),
                     "dimensions for auxiliary coordinate variable {} ({}) "
-                    "are not a subset of dimensions for variable {} ({})"
-                    "".format(
-                        aux_coord, ", ".join(aux_coord_dims), name, ", ".join(dim_set)
-                    ),
+                    "are not a subset of dimensions for variable {} ({})",
+                    aux_coord,
+                    ", ".join(aux_coord_dims),
+                    name,
+                    ", ".join(dim_set),
                 )
             ret_val.append(valid_aux_coords.to_result())
         return ret_val
@@ -3119,9 +3288,10 @@ class CF1_6Check(CFNCCheck):
                 coords = [c for c in coords if hasattr(ds.variables[c], "axis")]
                 no_duplicates.assert_true(
                     len(coords) <= 1,
-                    "'{}' has duplicate axis {} defined by [{}]".format(
-                        name, axis, ", ".join(sorted(coords))
-                    ),
+                    "'{}' has duplicate axis {} defined by [{}]",
+                    name,
+                    axis,
+                    ", ".join(sorted(coords)),
                 )
 
             ret_val.append(no_duplicates.to_result())
@@ -3153,7 +3323,8 @@ class CF1_6Check(CFNCCheck):
 
             not_matching.assert_true(
                 coord not in variable.dimensions,
-                "{} shares the same name as one of its dimensions" "".format(coord),
+                "{} shares the same name as one of its dimensions",
+                coord,
             )
             ret_val.append(not_matching.to_result())
 
@@ -3198,9 +3369,9 @@ class CF1_6Check(CFNCCheck):
                 continue
             has_coords = TestCtx(BaseCheck.HIGH, self.section_titles["5.6"])
 
-            # axis_map is a defaultdict(list) mapping the axis to a list of
-            # coordinate names. For example:
-            # {'X': ['lon'], 'Y':['lat'], 'Z':['lev']}
+            # axis_map maps the axis to a tuple of coordinate names, and axes
+            # without coordinates to an empty tuple. For example:
+            # {'X': ('lon',), 'Y': ('lat',), 'Z': ('lev',)}
             # The mapping comes from the dimensions of the variable and the
             # contents of the `coordinates` attribute only.
             axis_map = cfutil.get_axis_map(ds, variable)
@@ -3279,8 +3450,8 @@ class CF1_6Check(CFNCCheck):
             # Make sure reduced grid features define coordinates
             valid_rgrid.assert_true(
                 isinstance(coords, str) and coords,
-                "reduced grid feature {} must define coordinates attribute"
-                "".format(name),
+                "reduced grid feature {} must define coordinates attribute",
+                name,
             )
             # We can't check anything else if there are no defined coordinates
             if not isinstance(coords, str) and coords:
@@ -3291,16 +3462,20 @@ class CF1_6Check(CFNCCheck):
             # Make sure it's associated with valid lat and valid lon
             valid_rgrid.assert_true(
                 len(coord_set.intersection(lons)) > 0,
-                "{} must be associated with a valid longitude coordinate".format(name),
+                "{} must be associated with a valid longitude coordinate",
+                name,
             )
             valid_rgrid.assert_true(
                 len(coord_set.intersection(lats)) > 0,
-                "{} must be associated with a valid latitude coordinate".format(name),
+                "{} must be associated with a valid latitude coordinate",
+                name,
             )
             valid_rgrid.assert_true(
                 len(axis_map["C"]) == 1,
                 "{} can not be associated with more than one compressed coordinates: "
-                "({})".format(name, ", ".join(axis_map["C"])),
+                "({})",
+                name,
+                ", ".join(axis_map["C"]),
             )
 
             for compressed_coord in axis_map["C"]:
@@ -3308,16 +3483,17 @@ class CF1_6Check(CFNCCheck):
                 compress = getattr(coord, "compress", None)
                 valid_rgrid.assert_true(
                     isinstance(compress, str) and compress,
-                    "compress attribute for compression coordinate {} must be a non-empty string"
-                    "".format(compressed_coord),
+                    "compress attribute for compression coordinate {} must be a non-empty string",
+                    compressed_coord,
                 )
                 if not isinstance(compress, str):
                     continue
                 for dim in compress.split():
                     valid_rgrid.assert_true(
                         dim in ds.dimensions,
-                        "dimension {} referenced by {}:compress must exist"
-                        "".format(dim, compressed_coord),
+                        "dimension {} referenced by {}:compress must exist",
+                        dim,
+                        compressed_coord,
                     )
             ret_val.append(valid_rgrid.to_result())
 
@@ -3480,6 +3656,7 @@ class CF1_6Check(CFNCCheck):
     # Chapter 6: Labels and Alternative Coordinates
     ###############################################################################
 
+    @data_dependent
     def check_geographic_region(self, ds):
         """
         6.1.1 When data is representative of geographic regions which can be identified by names but which have complex
@@ -3573,9 +3750,9 @@ class CF1_6Check(CFNCCheck):
                 region = region.data
             valid_region.assert_true(
                 "".join(region.astype(str)).lower() in region_list,
-                "6.1.1 '{}' specified by '{}' is not a valid region".format(
-                    "".join(region.astype(str)), var.name
-                ),
+                "6.1.1 '{}' specified by '{}' is not a valid region",
+                "".join(region.astype(str)),
+                var.name,
             )
             ret_val.append(valid_region.to_result())
         return ret_val
@@ -3815,8 +3992,9 @@ class CF1_6Check(CFNCCheck):
             )  # changed from 7.1 to 7.3
             valid_attribute.assert_true(
                 regex.match(psep, method) is not None,
-                '"{}" is not a valid format for cell_methods attribute of "{}"'
-                "".format(method, var.name),
+                '"{}" is not a valid format for cell_methods attribute of "{}"' "",
+                method,
+                var.name,
             )
             ret_val.append(valid_attribute.to_result())
 
@@ -3842,7 +4020,9 @@ class CF1_6Check(CFNCCheck):
                     valid_cell_names.assert_true(
                         valid,
                         "{}'s cell_methods name component {} does not match a dimension, "
-                        "area or auxiliary coordinate".format(var.name, var_str),
+                        "area or auxiliary coordinate",
+                        var.name,
+                        var_str,
                     )
 
             ret_val.append(valid_cell_names.to_result())
@@ -3854,8 +4034,9 @@ class CF1_6Check(CFNCCheck):
                 # CF section 7.3 - "Case is not significant in the method name."
                 valid_cell_methods.assert_true(
                     match.group("method").lower() in self.cell_methods,
-                    "{}:cell_methods contains an invalid method: {}"
-                    "".format(var.name, match.group("method")),
+                    "{}:cell_methods contains an invalid method: {}",
+                    var.name,
+                    match.group("method"),
                 )
 
             ret_val.append(valid_cell_methods.to_result())
@@ -3920,7 +4101,7 @@ class CF1_6Check(CFNCCheck):
 
                     # then the units
                     try:
-                        Unit(interval_matches.group("interval_units"))
+                        parse_unit(interval_matches.group("interval_units"))
                     except ValueError:
                         valid_info.messages.append(
                             '§7.3.3 {}:cell_methods interval units "{}" is not parsable by UDUNITS.'.format(
@@ -3964,9 +4145,9 @@ class CF1_6Check(CFNCCheck):
         # original string.  If they're not, there's likely a formatting error
         valid_info.assert_true(
             "".join(m.group(0) for m in pmatches) == paren_contents,
-            "§7.3.3 Parenthetical content inside {}:cell_methods is not well formed: {}".format(
-                var.name, paren_contents
-            ),
+            "§7.3.3 Parenthetical content inside {}:cell_methods is not well formed: {}",
+            var.name,
+            paren_contents,
         )
 
         return valid_info
@@ -4355,7 +4536,7 @@ class CF1_6Check(CFNCCheck):
                 feature_types_found[feature].append(name)
                 found = True
             all_the_same.assert_true(
-                found, "Unidentifiable feature for variable {}" "".format(name)
+                found, "Unidentifiable feature for variable {}" "", name
             )
         feature_description = ", ".join(
             [
@@ -4366,8 +4547,8 @@ class CF1_6Check(CFNCCheck):
 
         all_the_same.assert_true(
             len(feature_types_found) < 2,
-            "Different feature types discovered in this dataset: {}"
-            "".format(feature_description),
+            "Different feature types discovered in this dataset: {}",
+            feature_description,
         )
 
         return all_the_same.to_result()
@@ -4401,8 +4582,9 @@ class CF1_6Check(CFNCCheck):
         )
         valid_feature_type.assert_true(
             feature_type is None or feature_type.lower() in feature_list,
-            "{} is not a valid CF featureType. It must be one of {}"
-            "".format(feature_type, ", ".join(feature_list)),
+            "{} is not a valid CF featureType. It must be one of {}",
+            feature_type,
+            ", ".join(feature_list),
         )
         return valid_feature_type.to_result()
 
@@ -4425,8 +4607,9 @@ class CF1_6Check(CFNCCheck):
             cf_role = variable.cf_role
             valid_cf_role.assert_true(
                 cf_role in valid_roles,
-                "{} is not a valid cf_role value. It must be one of {}"
-                "".format(name, ", ".join(valid_roles)),
+                "{} is not a valid cf_role value. It must be one of {}",
+                name,
+                ", ".join(valid_roles),
             )
         if variable_count > 0:
             m = (
@@ -4488,8 +4671,10 @@ class CF1_6Check(CFNCCheck):
             matching_feature = TestCtx(BaseCheck.MEDIUM, self.section_titles["9.1"])
             matching_feature.assert_true(
                 variable_feature in feature_type_map[feature_type],
-                "{} is not a {}, it is detected as a {}"
-                "".format(name, feature_type, variable_feature),
+                "{} is not a {}, it is detected as a {}",
+                name,
+                feature_type,
+                variable_feature,
             )
             ret_val.append(matching_feature.to_result())
 
@@ -4574,6 +4759,7 @@ class CF1_7Check(CF1_6Check):
         self.grid_mapping_dict = grid_mapping_dict17
         self.grid_mapping_attr_types = grid_mapping_attr_types17
 
+    @data_dependent
     def check_actual_range(self, ds):
         """Check the actual_range attribute of variables. As stated in
         section 2.5.1 of version 1.7, this convention defines a two-element
@@ -4602,9 +4788,6 @@ class CF1_7Check(CF1_6Check):
                 continue  # having this attr is only suggested, no Result needed
             else:
 
-                if variable.mask:  # remove mask
-                    variable.set_auto_mask(False)
-
                 out_of += 1
                 try:
                     if (
@@ -4637,10 +4820,14 @@ class CF1_7Check(CF1_6Check):
                     continue
 
                 # check equality to existing min/max values
-                # NOTE this is a data check
+                # NOTE this is a data check.  Fill values are not masked, and
+                # any NaN in the data makes the range inconsistent.
                 out_of += 1
-                if (variable.actual_range[0] != variable[:].min()) or (
-                    variable.actual_range[1] != variable[:].max()
+                stats = cfutil.get_variable_stats(ds, name, False)
+                if (
+                    stats.nan_count
+                    or (variable.actual_range[0] != stats.min)
+                    or (variable.actual_range[1] != stats.max)
                 ):
                     msgs.append(
                         "actual_range elements of '{}' inconsistent with its min/max values".format(
@@ -5317,9 +5504,9 @@ class CF1_7Check(CF1_6Check):
         _comp_std_name = dim_vert_coords_dict[standard_name][1]
         correct_computed_std_name_ctx.assert_true(
             getattr(variable, "computed_standard_name", None) in _comp_std_name,
-            "§4.3.3 The standard_name of `{}` must map to the correct computed_standard_name, `{}`".format(
-                vname, sorted(_comp_std_name)
-            ),
+            "§4.3.3 The standard_name of `{}` must map to the correct computed_standard_name, `{}`",
+            vname,
+            sorted(_comp_std_name),
         )
         ret_val.append(correct_computed_std_name_ctx.to_result())
 
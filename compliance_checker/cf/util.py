@@ -1,21 +1,34 @@
+import hashlib
 import io
 import itertools
+import json
 import os
 import sys
+import tempfile
 
 from collections import defaultdict
 from copy import deepcopy
-from pkgutil import get_data
 from urllib.parse import urljoin
 
 import lxml.html
-import requests
 
-from cf_units import Unit
 from lxml import etree
 from netCDF4 import Dimension, Variable
-from pkg_resources import resource_filename
 
+from compliance_checker import units as cached_units
+from compliance_checker.cache import create_cached_data_dir  # noqa: F401
+from compliance_checker.cfutil import (  # noqa: F401
+    _possibleaxisunits,
+    _possibletunits,
+    _possiblexunits,
+    _possibleyunits,
+)
+from compliance_checker.protocols import remote
+
+
+_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"
+)
 
 # copied from paegan
 # paegan may depend on these later
@@ -125,50 +138,6 @@ _possibley = {
 _possibleaxis = _possiblet | _possiblez | _possiblex | _possibley
 
 
-_possiblexunits = {
-    "degrees_east",
-    "degree_east",
-    "degrees_E",
-    "degree_E",
-    "degreesE",
-    "degreeE",
-}
-
-_possibleyunits = {
-    "degrees_north",
-    "degree_north",
-    "degrees_N",
-    "degree_N",
-    "degreesN",
-    "degreeN",
-}
-
-_possibletunits = {
-    "day",
-    "days",
-    "d",
-    "hour",
-    "hours",
-    "hr",
-    "hrs",
-    "h",
-    "year",
-    "years",
-    "minute",
-    "minutes",
-    "m",
-    "min",
-    "mins",
-    "second",
-    "seconds",
-    "s",
-    "sec",
-    "secs",
-}
-
-_possibleaxisunits = _possiblexunits | _possibleyunits | _possibletunits
-
-
 class DotDict(dict):
     """
     Subclass of dict that will recursively look up attributes with dot notation.
@@ -322,72 +291,208 @@ class NCGraph(object):
         return getattr(self.obj, key)
 
 
-class StandardNameTable(object):
-    class NameEntry(object):
-        def __init__(self, entrynode):
-            self.canonical_units = self._get(entrynode, "canonical_units", True)
-            self.grib = self._get(entrynode, "grib")
-            self.amip = self._get(entrynode, "amip")
-            self.description = self._get(entrynode, "description")
+# parsed standard name tables shared by every StandardNameTable instance,
+# keyed on the source file's path, modification time and size
+_STANDARD_NAME_INDEXES = {}
+
+# bumped whenever the layout of the cached standard name indexes changes
+_STANDARD_NAME_INDEX_FORMAT = 1
+
+
+def _standard_name_table_path(cached_location=None):
+    """
+    Returns the path of the standard name table XML to load: an explicit
+    location, the `CF_STANDARD_NAME_TABLE` environment variable, or the
+    packaged table.
+    """
+    if cached_location:
+        return cached_location
+    elif os.environ.get("CF_STANDARD_NAME_TABLE") and os.path.exists(
+        os.environ["CF_STANDARD_NAME_TABLE"]
+    ):
+        return os.environ["CF_STANDARD_NAME_TABLE"]
+    return os.path.join(_DATA_DIR, "cf-standard-name-table.xml")
 
-        def _get(self, entrynode, attrname, required=False):
-            vals = entrynode.xpath(attrname)
-            if len(vals) > 1:
-                raise Exception("Multiple attrs (%s) found" % attrname)
-            elif required and len(vals) == 0:
-                raise Exception("Required attr (%s) not found" % attrname)
 
-            return vals[0].text
+def _parse_standard_name_table(resource_text):
+    """
+    Parses standard name table XML into a (version, entries, aliases) tuple.
+    `entries` maps each standard name to a tuple of its canonical units,
+    GRIB code, AMIP code and description, and `aliases` maps each alias to
+    the standard name it refers to, or None if the alias is inconsistent.
+    """
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.fromstring(resource_text, parser)
+
+    entries = {}
+    for node in root.iter("entry"):
+        entries[node.get("id")] = tuple(
+            node.findtext(field)
+            for field in ("canonical_units", "grib", "amip", "description")
+        )
+
+    aliases = {}
+    for node in root.iter("alias"):
+        entry_ids = node.findall("entry_id")
+        aliases[node.get("id")] = entry_ids[0].text if len(entry_ids) == 1 else None
+
+    version = root.xpath("version_number")[0].text
+    return version, entries, aliases
+
+
+def _read_standard_name_index(cache_path, digest):
+    """
+    Reads a cached (version, entries, aliases) index of a standard name
+    table, checking that it is of the current format, for the table with
+    the given digest and made of strings only.
+
+    :raises OSError: If the file can't be read
+    :raises ValueError: If the file isn't a valid index of the table
+    """
+    with io.open(cache_path, "r", encoding="utf-8") as fp:
+        data = json.load(fp)
+    if (
+        not isinstance(data, dict)
+        or data.get("format") != _STANDARD_NAME_INDEX_FORMAT
+        or data.get("digest") != digest
+    ):
+        raise ValueError("Not an index of this standard name table")
+
+    def is_text(value):
+        return value is None or isinstance(value, str)
+
+    version, entries, aliases = data["version"], data["entries"], data["aliases"]
+    if not (
+        is_text(version)
+        and isinstance(entries, dict)
+        and all(
+            isinstance(fields, list) and len(fields) == 4 and all(map(is_text, fields))
+            for fields in entries.values()
+        )
+        and isinstance(aliases, dict)
+        and all(map(is_text, aliases.values()))
+    ):
+        raise ValueError("Malformed standard name table index")
+    entries = {name: tuple(fields) for name, fields in entries.items()}
+    return version, entries, aliases
+
+
+def _load_standard_name_index(path):
+    """
+    Returns the parsed (version, entries, aliases) for a standard name table
+    file.  Parsed tables are shared within the process and stored as JSON in
+    the compliance checker data directory, keyed on a digest of the table's
+    contents, so each table version is only parsed once.  Cached indexes of
+    another format or table are ignored.
+    """
+    stat = os.stat(path)
+    stat_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    index = _STANDARD_NAME_INDEXES.get(stat_key)
+    if index is not None:
+        return index
+
+    with io.open(path, "rb") as fp:
+        resource_text = fp.read()
+    digest = hashlib.sha256(resource_text).hexdigest()
+
+    cache_path = None
+    try:
+        cache_path = os.path.join(
+            create_cached_data_dir(), "cf-standard-name-table-{}.json".format(digest)
+        )
+        index = _read_standard_name_index(cache_path, digest)
+    except (OSError, ValueError, KeyError):
+        index = None
+
+    if index is None:
+        index = _parse_standard_name_table(resource_text)
+        if cache_path is not None:
+            # write atomically so concurrent checkers never read a partial
+            # file.  The cache is an optimization, so failures are ignored.
+            try:
+                version, entries, aliases = index
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+                with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                    json.dump(
+                        {
+                            "format": _STANDARD_NAME_INDEX_FORMAT,
+                            "digest": digest,
+                            "version": version,
+                            "entries": entries,
+                            "aliases": aliases,
+                        },
+                        fp,
+                    )
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass
+
+    _STANDARD_NAME_INDEXES[stat_key] = index
+    return index
+
+
+class StandardNameTable(object):
+    """
+    The CF standard name table, indexed by standard name.  The parsed table
+    is shared between instances, so constructing a table is cheap and
+    lookups are dictionary lookups.
+    """
+
+    class NameEntry(object):
+        def __init__(self, canonical_units, grib=None, amip=None, description=None):
+            self.canonical_units = canonical_units
+            self.grib = grib
+            self.amip = amip
+            self.description = description
 
     def __init__(self, cached_location=None):
-        if cached_location:
-            with io.open(cached_location, "r", encoding="utf-8") as fp:
-                resource_text = fp.read()
-        elif os.environ.get("CF_STANDARD_NAME_TABLE") and os.path.exists(
-            os.environ["CF_STANDARD_NAME_TABLE"]
-        ):
-            with io.open(
-                os.environ["CF_STANDARD_NAME_TABLE"], "r", encoding="utf-8"
-            ) as fp:
-                resource_text = fp.read()
-        else:
-            resource_text = get_data(
-                "compliance_checker", "data/cf-standard-name-table.xml"
-            )
+        self._path = _standard_name_table_path(cached_location)
+        self._version, self._entries, self._alias_map = _load_standard_name_index(
+            self._path
+        )
+        # names accepted by this instance only, see `extend`
+        self._extra_names = set()
+        self._xml_root = None
 
-        parser = etree.XMLParser(remove_blank_text=True)
-        self._root = etree.fromstring(resource_text, parser)
+    @property
+    def _root(self):
+        """
+        The parsed XML document of the table, parsed on first access
+        """
+        if self._xml_root is None:
+            with io.open(self._path, "rb") as fp:
+                parser = etree.XMLParser(remove_blank_text=True)
+                self._xml_root = etree.fromstring(fp.read(), parser)
+        return self._xml_root
+
+    def extend(self, names):
+        """
+        Adds names which are recognized as members of this table instance
+        only.  They have no table entry.
 
-        # generate and save a list of all standard names in file
-        self._names = [node.get("id") for node in self._root.iter("entry")]
-        self._aliases = [node.get("id") for node in self._root.iter("alias")]
-        self._version = self._root.xpath("version_number")[0].text
+        :param iterable names: Names to add
+        """
+        self._extra_names.update(names)
 
     def __len__(self):
-        return len(self._names) + len(self._aliases)
+        return len(self._entries) + len(self._alias_map) + len(self._extra_names)
 
     def __getitem__(self, key):
-        if not (key in self._names or key in self._aliases):
-            raise KeyError("%s not found in standard name table" % key)
-
-        if key in self._aliases:
-            idx = self._aliases.index(key)
-            entryids = self._root.xpath("alias")[idx].xpath("entry_id")
+        if not isinstance(key, str):
+            raise KeyError("%s not found in standard name table" % (key,))
 
-            if len(entryids) != 1:
+        if key in self._alias_map:
+            entry_id = self._alias_map[key]
+            if entry_id is None:
                 raise Exception(
                     "Inconsistency in standard name table, could not lookup alias for %s"
                     % key
                 )
+            key = entry_id
 
-            key = entryids[0].text
-
-        if key not in self._names:
+        if key not in self._entries:
             raise KeyError("%s not found in standard name table" % key)
-
-        idx = self._names.index(key)
-        entry = self.NameEntry(self._root.xpath("entry")[idx])
-        return entry
+        return self.NameEntry(*self._entries[key])
 
     def get(self, key, default=None):
         """
@@ -399,10 +504,20 @@ class StandardNameTable(object):
             return default
 
     def __contains__(self, key):
-        return key in self._names or key in self._aliases
+        try:
+            return (
+                key in self._entries
+                or key in self._alias_map
+                or key in self._extra_names
+            )
+        except TypeError:
+            # unhashable keys can't be standard names
+            return False
 
     def __iter__(self):
-        return iter(itertools.chain(self._names, self._aliases))
+        return iter(
+            itertools.chain(self._entries, self._alias_map, sorted(self._extra_names))
+        )
 
 
 def download_cf_standard_name_table(version, location=None):
@@ -416,9 +531,7 @@ def download_cf_standard_name_table(version, location=None):
     if (
         location is None
     ):  # This case occurs when updating the packaged version from command line
-        location = resource_filename(
-            "compliance_checker", "data/cf-standard-name-table.xml"
-        )
+        location = os.path.join(_DATA_DIR, "cf-standard-name-table.xml")
 
     if version == "latest":
         tables_tree = lxml.html.parse("http://cfconventions.org/documents.html")
@@ -436,7 +549,7 @@ def download_cf_standard_name_table(version, location=None):
             version
         )
 
-    r = requests.get(url, allow_redirects=True)
+    r = remote.get_session().get(url, allow_redirects=True)
     r.raise_for_status()
 
     print(
@@ -449,46 +562,18 @@ def download_cf_standard_name_table(version, location=None):
         f.write(r.content)
 
 
-def create_cached_data_dir():
-    """
-    Returns the path to the data directory to download CF standard names.
-    Use $XDG_DATA_HOME.
-    """
-    writable_directory = os.path.join(os.path.expanduser("~"), ".local", "share")
-    data_directory = os.path.join(
-        os.environ.get("XDG_DATA_HOME", writable_directory), "compliance-checker"
-    )
-    if not os.path.isdir(data_directory):
-        os.makedirs(data_directory)
-
-    return data_directory
-
-
 def units_known(units):
-    try:
-        Unit(units)
-    except ValueError:
-        return False
-    return True
+    return cached_units.units_known(units)
 
 
 def units_convertible(units1, units2, reftimeistime=True):
     """Return True if a Unit representing the string units1 can be converted
     to a Unit representing the string units2, else False."""
-    try:
-        u1 = Unit(units1)
-        u2 = Unit(units2)
-    except ValueError:
-        return False
-    return u1.is_convertible(u2)
+    return cached_units.units_convertible(units1, units2)
 
 
 def units_temporal(units):
-    try:
-        u = Unit(units)
-    except ValueError:
-        return False
-    return u.is_time_reference()
+    return cached_units.units_temporal(units)
 
 
 def map_axes(dim_vars, reverse_map=False):
@@ -4,19 +4,24 @@
 compliance_checker/cfutil.py
 """
 import csv
+import os
 import re
 import warnings
+import weakref
 
 from collections import defaultdict
-from functools import lru_cache, partial
+from functools import partial, wraps
+from types import MappingProxyType
 
-from cf_units import Unit
-from pkg_resources import resource_filename
+from compliance_checker import units as cached_units
+from compliance_checker.stats import variable_stats
 
 
 _UNITLESS_DB = None
 _SEA_NAMES = None
 
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
 VALID_LAT_UNITS = {
     "degrees_north",
     "degree_north",
@@ -35,6 +40,52 @@ VALID_LON_UNITS = {
 }
 
 
+# units of the axes of coordinate variables, also used by the ACDD checker,
+# which mustn't import the CF checker with compliance_checker.cf.util
+_possiblexunits = {
+    "degrees_east",
+    "degree_east",
+    "degrees_E",
+    "degree_E",
+    "degreesE",
+    "degreeE",
+}
+
+_possibleyunits = {
+    "degrees_north",
+    "degree_north",
+    "degrees_N",
+    "degree_N",
+    "degreesN",
+    "degreeN",
+}
+
+_possibletunits = {
+    "day",
+    "days",
+    "d",
+    "hour",
+    "hours",
+    "hr",
+    "hrs",
+    "h",
+    "year",
+    "years",
+    "minute",
+    "minutes",
+    "m",
+    "min",
+    "mins",
+    "second",
+    "seconds",
+    "s",
+    "sec",
+    "secs",
+}
+
+_possibleaxisunits = _possiblexunits | _possibleyunits | _possibletunits
+
+
 # We can't import appendix d without getting circular imports
 DIMENSIONLESS_VERTICAL_COORDINATES = {
     "ocean_s_coordinate",
@@ -51,6 +102,159 @@ DIMENSIONLESS_VERTICAL_COORDINATES = {
 }
 
 
+class _EmptyDefaultDict(dict):
+    """
+    Dict holding an empty tuple for missing keys, without adding them, which
+    the defaultdicts of classifications are frozen into
+    """
+
+    def __missing__(self, key):
+        return ()
+
+
+def _freeze(value):
+    """
+    Returns a classification as a value which can't be modified, so that it
+    can be shared by every caller: lists become tuples, sets frozensets and
+    dicts read only mappings
+    """
+    if type(value) in (list, tuple):
+        return tuple(_freeze(v) for v in value)
+    if type(value) in (set, frozenset):
+        return frozenset(value)
+    if isinstance(value, dict):
+        frozen = _EmptyDefaultDict() if isinstance(value, defaultdict) else {}
+        for key, item in value.items():
+            frozen[key] = _freeze(item)
+        return MappingProxyType(frozen)
+    return value
+
+
+class DatasetAnalysis(object):
+    """
+    Holds the classifications derived from a single dataset, such as its
+    coordinate, auxiliary coordinate, boundary and geophysical variables, the
+    axis map and feature type of each variable.  An analysis is built once
+    per read only dataset and shared by every checker run against it, and is
+    released when the dataset is closed.
+    """
+
+    def __init__(self):
+        self._results = {}
+
+    def lookup(self, func, ds, *args):
+        """
+        Returns the result of `func(ds, *args)`, computing it on first use.
+        Results are frozen, see `_freeze`, so that callers cannot affect
+        other checkers.
+
+        :param function func: Classification function taking the dataset as
+                              its first argument
+        :param netCDF4.Dataset ds: The dataset this analysis belongs to
+        """
+        key = (func.__name__,) + args
+        try:
+            return self._results[key]
+        except KeyError:
+            result = self._results[key] = _freeze(func(ds, *args))
+            return result
+
+    def shared(self, key, factory):
+        """
+        Returns the value stored under a key, computing it with `factory` on
+        first use.  Unlike `lookup` the value is not frozen, so it should be
+        immutable.
+
+        :param tuple key: Key of the value, distinct from classification
+                          function names
+        :param callable factory: Function of no arguments computing the value
+        """
+        try:
+            return self._results[key]
+        except KeyError:
+            value = self._results[key] = factory()
+            return value
+
+    def clear(self):
+        """
+        Discards all derived results
+        """
+        self._results.clear()
+
+
+# dataset -> DatasetAnalysis.  Entries are removed when the dataset is closed
+# or garbage collected.
+_DATASET_ANALYSES = weakref.WeakKeyDictionary()
+
+
+def get_dataset_analysis(ds):
+    """
+    Returns the DatasetAnalysis for a dataset, creating it if necessary.
+    Returns None for objects which cannot be tracked, and for datasets which
+    aren't read only, as their classifications change when they're written
+    to.
+
+    :param netCDF4.Dataset ds: An open netCDF dataset
+    :rtype: DatasetAnalysis or None
+    """
+    if not getattr(ds, "read_only", False):
+        return None
+    try:
+        analysis = _DATASET_ANALYSES.get(ds)
+        if analysis is None:
+            analysis = _DATASET_ANALYSES[ds] = DatasetAnalysis()
+    except TypeError:
+        return None
+    return analysis
+
+
+def release_dataset_analysis(ds):
+    """
+    Frees the DatasetAnalysis associated with a dataset, if any
+
+    :param netCDF4.Dataset ds: A netCDF dataset
+    """
+    try:
+        analysis = _DATASET_ANALYSES.pop(ds, None)
+    except TypeError:
+        return
+    if analysis is not None:
+        analysis.clear()
+
+
+def shared_analysis(ds, key, factory):
+    """
+    Returns a value derived from a read only dataset which is computed once
+    and shared, without copying, by every checker run against the dataset
+
+    :param netCDF4.Dataset ds: An open netCDF dataset
+    :param tuple key: Key of the value, see DatasetAnalysis.shared
+    :param callable factory: Function of no arguments computing the value
+    """
+    analysis = get_dataset_analysis(ds)
+    if analysis is None:
+        return factory()
+    return analysis.shared(key, factory)
+
+
+def dataset_analysis_cache(func):
+    """
+    Decorator which memoizes a classification function in the DatasetAnalysis
+    of the dataset passed as its first argument.  Results are frozen, see
+    `_freeze`, whether or not the dataset has an analysis, so callers which
+    modify a result must copy it.
+    """
+
+    @wraps(func)
+    def wrapper(ds, *args):
+        analysis = get_dataset_analysis(ds)
+        if analysis is None:
+            return _freeze(func(ds, *args))
+        return analysis.lookup(func, ds, *args)
+
+    return wrapper
+
+
 def attr_membership(attr_val, value_set, attr_type=str, modifier_fn=lambda x: x):
     """
     Helper function passed to netCDF4.Dataset.get_attributes_by_value
@@ -99,29 +303,41 @@ def attr_membership(attr_val, value_set, attr_type=str, modifier_fn=lambda x: x)
     return is_in_set
 
 
-@lru_cache(128)
-def is_dimensionless_standard_name(xml_tree, standard_name):
+def is_dimensionless_standard_name(standard_name_table, standard_name):
     """
     Returns True if the units for the associated standard name are
     dimensionless.  Dimensionless standard names include those that have no
     units and units that are defined as constant units in the CF standard name
     table i.e. '1', or '1e-3'.
+
+    :param standard_name_table: A cf.util.StandardNameTable, or the root
+                                element of a parsed standard name table XML
+                                document
+    :param str standard_name: The standard name to look up
     """
     # standard_name must be string, so if it is not, it is *wrong* by default
     if not isinstance(standard_name, str):
         return False
-    found_standard_name = xml_tree.find(".//entry[@id='{}']".format(standard_name))
-    if found_standard_name is not None:
-        canonical_units = found_standard_name.find("canonical_units")
-        # so far, standard name XML table includes
-        # 1 and 1e-3 for constant units, but expanding to valid udunits
-        # prefixes to be on the safe side
-        # taken from CF Table 3.1 of valid UDUnits prefixes
-        dimless_units = r"1(?:e-?(?:1|2|3|6|9|12|15|18|21|24))?$"
-        return canonical_units is None or re.match(dimless_units, canonical_units.text)
-    # if the standard name is not found, assume we need units for the time being
+    if hasattr(standard_name_table, "find"):
+        found_standard_name = standard_name_table.find(
+            ".//entry[@id='{}']".format(standard_name)
+        )
+        # if the standard name is not found, assume we need units for the
+        # time being
+        if found_standard_name is None:
+            return False
+        canonical_units = found_standard_name.findtext("canonical_units")
     else:
-        return False
+        entry = standard_name_table.get(standard_name)
+        if entry is None:
+            return False
+        canonical_units = entry.canonical_units
+    # so far, standard name XML table includes
+    # 1 and 1e-3 for constant units, but expanding to valid udunits
+    # prefixes to be on the safe side
+    # taken from CF Table 3.1 of valid UDUnits prefixes
+    dimless_units = r"1(?:e-?(?:1|2|3|6|9|12|15|18|21|24))?$"
+    return not canonical_units or bool(re.match(dimless_units, canonical_units))
 
 
 def get_sea_names():
@@ -133,9 +349,7 @@ def get_sea_names():
     global _SEA_NAMES
     if _SEA_NAMES is None:
         buf = {}
-        with open(
-            resource_filename("compliance_checker", "data/seanames.csv"), "r"
-        ) as f:
+        with open(os.path.join(_DATA_DIR, "seanames.csv"), "r") as f:
             reader = csv.reader(f)
             for code, sea_name in reader:
                 buf[sea_name] = code
@@ -247,9 +461,31 @@ def is_geophysical(ds, variable):
     return True
 
 
+@dataset_analysis_cache
+def _get_cached_variable_stats(ds, variable_name, masked):
+    return variable_stats(ds.variables[variable_name], masked)
+
+
+def get_variable_stats(ds, variable_name, masked=True):
+    """
+    Returns the minimum, maximum and number of NaN and masked values of a
+    variable's data, computed in a single chunked pass over the variable.
+    For read only datasets the statistics are kept in the dataset's analysis
+    so every checker reading the same variable reuses them.
+
+    :param netCDF4.Dataset ds: An open netCDF dataset
+    :param str variable_name: Name of the variable
+    :param bool masked: Whether fill and missing values are excluded
+    :raises TypeError: If the variable does not hold numeric data
+    :rtype: compliance_checker.stats.VariableStats
+    """
+    return _get_cached_variable_stats(ds, variable_name, masked)
+
+
+@dataset_analysis_cache
 def get_coordinate_variables(ds):
     """
-    Returns a list of variable names that identify as coordinate variables.
+    Returns a tuple of variable names that identify as coordinate variables.
 
     A coordinate variable is a netCDF variable with exactly one dimension. The
     name of this dimension must be equivalent to the variable name.
@@ -271,9 +507,10 @@ def get_coordinate_variables(ds):
     return coord_vars
 
 
+@dataset_analysis_cache
 def get_auxiliary_coordinate_variables(ds):
     """
-    Returns a list of auxiliary coordinate variables
+    Returns a tuple of auxiliary coordinate variables
 
     An auxiliary coordinate variable is any netCDF variable that contains
     coordinate data, but is not a coordinate variable (in the sense of the term
@@ -349,10 +586,11 @@ def get_forecast_metadata_variables(ds):
     return forecast_metadata_variables
 
 
+@dataset_analysis_cache
 def get_cell_boundary_map(ds):
     """
-    Returns a dictionary mapping a variable to its boundary variable. The
-    returned dictionary maps a string variable name to the name of the boundary
+    Returns a read only mapping of a variable to its boundary variable. The
+    returned mapping maps a string variable name to the name of the boundary
     variable.
 
     :param netCDF4.Dataset nc: netCDF dataset
@@ -364,9 +602,10 @@ def get_cell_boundary_map(ds):
     return boundary_map
 
 
+@dataset_analysis_cache
 def get_cell_boundary_variables(ds):
     """
-    Returns a list of variable names for variables that represent cell
+    Returns a tuple of variable names for variables that represent cell
     boundaries through the `bounds` attribute
 
     :param netCDF4.Dataset nc: netCDF dataset
@@ -379,10 +618,10 @@ def get_cell_boundary_variables(ds):
     return boundary_variables
 
 
-@lru_cache(128)
+@dataset_analysis_cache
 def get_geophysical_variables(ds):
     """
-    Returns a list of variable names for the variables detected as geophysical
+    Returns a tuple of variable names for the variables detected as geophysical
     variables.
 
     :param netCDF4.Dataset nc: An open netCDF dataset
@@ -395,7 +634,7 @@ def get_geophysical_variables(ds):
     return parameters
 
 
-@lru_cache(128)
+@dataset_analysis_cache
 def get_z_variable(nc):
     """
     Returns the name of the variable that defines the Z axis or height/depth
@@ -472,7 +711,7 @@ def get_z_variables(nc):
     return z_variables
 
 
-@lru_cache(128)
+@dataset_analysis_cache
 def get_lat_variable(nc):
     """
     Returns the first variable matching latitude
@@ -537,7 +776,7 @@ def get_true_latitude_variables(nc):
     return true_lats
 
 
-@lru_cache(128)
+@dataset_analysis_cache
 def get_lon_variable(nc):
     """
     Returns the variable for longitude
@@ -672,10 +911,10 @@ def get_time_variable(ds):
     return None
 
 
-@lru_cache(128)
+@dataset_analysis_cache
 def get_time_variables(ds):
     """
-    Returns a list of variables describing the time coordinate
+    Returns a frozenset of variables describing the time coordinate
 
     :param netCDF4.Dataset ds: An open netCDF4 Dataset
     """
@@ -760,15 +999,16 @@ def get_grid_mapping_variables(ds):
     return grid_mapping_variables
 
 
-@lru_cache(128)
+@dataset_analysis_cache
 def get_axis_map(ds, variable):
     """
-    Returns an axis_map dictionary that contains an axis key and the coordinate
-    names as values.
+    Returns a read only axis_map mapping that contains an axis key and a
+    tuple of the coordinate names as values.  Axes without coordinates map to
+    an empty tuple.
 
     For example::
 
-        {'X': ['longitude'], 'Y': ['latitude'], 'T': ['time']}
+        {'X': ('longitude',), 'Y': ('latitude',), 'T': ('time',)}
 
     The axis C is for compressed coordinates like a reduced grid, and U is for
     unknown axis. This can sometimes be physical quantities representing a
@@ -1712,6 +1952,7 @@ def is_reduced_grid(nc, variable):
     return True
 
 
+@dataset_analysis_cache
 def guess_feature_type(nc, variable):
     """
     Returns a string describing the feature type for this variable
@@ -1773,9 +2014,4 @@ def units_convertible(units1, units2, reftimeistime=True):
     :param str units1: A string representing the units
     :param str units2: A string representing the units
     """
-    try:
-        u1 = Unit(units1)
-        u2 = Unit(units2)
-    except ValueError:
-        return False
-    return u1.is_convertible(u2)
+    return cached_units.units_convertible(units1, units2)
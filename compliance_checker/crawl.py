@@ -0,0 +1,307 @@
+"""
+Concurrent validation of many remote datasets
+
+Checking a catalog of remote endpoints one at a time is dominated by network
+latency.  `RemoteValidator` runs the network side of loading remote datasets
+(probing the kind of service, fetching ERDDAP DDS responses and downloading
+netCDF files) concurrently from an asyncio event loop, with a bound on the
+total number of requests in flight, per-host concurrency and rate limits and
+timeouts.  Datasets are handed to `CheckSuite.run` as soon as they're ready.
+
+The netCDF C library isn't thread safe, so opening datasets, including
+OPeNDAP endpoints, and running checks on them happens on a single thread
+while downloads carry on in the background.
+"""
+
+import asyncio
+import functools
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from netCDF4 import Dataset
+
+from compliance_checker.protocols import opendap, remote
+from compliance_checker.suite import CheckSuite
+
+
+# url: location of the dataset
+# score_groups: checker name -> (groups, errors) as returned by
+#               CheckSuite.run, or None if the dataset couldn't be checked
+# error: exception raised while loading or checking the dataset, or None
+RemoteResult = namedtuple("RemoteResult", ["url", "score_groups", "error"])
+
+
+class _HostState(object):
+    def __init__(self, max_concurrent):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+
+
+class HostLimiter(object):
+    """
+    Limits the number of concurrent requests to each host, and the rate at
+    which requests to each host are started.  Must be used from a single
+    event loop.
+    """
+
+    def __init__(self, max_concurrent=2, rate=None):
+        """
+        :param int max_concurrent: Maximum number of requests in flight to
+                                   any one host
+        :param float rate: Maximum number of requests started per second to
+                           any one host, or None for no limit
+        """
+        self.max_concurrent = max_concurrent
+        self.min_interval = 1.0 / rate if rate else 0.0
+        self._hosts = {}
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.max_concurrent)
+        return state
+
+    async def acquire(self, host):
+        """
+        Waits until a request to the host may be started
+
+        :param str host: Host name and port
+        """
+        state = self._state(host)
+        await state.semaphore.acquire()
+        try:
+            async with state.lock:
+                loop = asyncio.get_event_loop()
+                delay = state.next_start - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                state.next_start = loop.time() + self.min_interval
+        except BaseException:
+            state.semaphore.release()
+            raise
+
+    def release(self, host):
+        """
+        Marks a request to the host started with `acquire` as finished
+
+        :param str host: Host name and port
+        """
+        self._state(host).semaphore.release()
+
+
+def _read_content(response):
+    return response.content
+
+
+class RemoteValidator(object):
+    """
+    Loads and checks remote datasets concurrently.  Use as a context manager,
+    or call `close` when done, to shut down its threads.
+    """
+
+    def __init__(
+        self, suite=None, concurrency=8, per_host=2, per_host_rate=None, timeout=60
+    ):
+        """
+        :param CheckSuite suite: Suite to load and check datasets with
+        :param int concurrency: Maximum number of requests in flight
+        :param int per_host: Maximum number of requests in flight to any one
+                             host
+        :param float per_host_rate: Maximum number of requests started per
+                                    second to any one host, or None
+        :param float timeout: Timeout of each request in seconds
+        """
+        self.suite = suite if suite is not None else CheckSuite()
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.per_host_rate = per_host_rate
+        self.timeout = timeout
+        self._limits_loop = None
+        self._network = ThreadPoolExecutor(max_workers=concurrency)
+        # every netCDF library call happens on this thread
+        self._netcdf = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Waits for outstanding work to finish and shuts down the threads
+        """
+        self._network.shutdown()
+        self._netcdf.shutdown()
+
+    def _limits(self):
+        """
+        Returns the request semaphore and host limiter of the running event
+        loop, as they can only be used from the loop they are created in
+        """
+        loop = asyncio.get_event_loop()
+        if self._limits_loop is not loop:
+            self._requests = asyncio.Semaphore(self.concurrency)
+            self._hosts = HostLimiter(self.per_host, self.per_host_rate)
+            self._limits_loop = loop
+        return self._requests, self._hosts
+
+    async def _request(self, url, func, *args, deadline=True):
+        """
+        Runs a blocking network call for a URL in the network thread pool,
+        within the concurrency limits.  Unless `deadline` is False, the call
+        must finish within the timeout; otherwise only the requests made
+        must not stall for longer than it.
+
+        A thread can't be stopped, so a call which misses its deadline, or
+        whose caller is cancelled, carries on until the timeout given to its
+        requests stops it.  It holds its place within the concurrency limits
+        until then, and a Probe it returns is closed.
+        """
+        request_slots, hosts = self._limits()
+        host = urlparse(url).netloc
+        await request_slots.acquire()
+        try:
+            await hosts.acquire(host)
+        except BaseException:
+            request_slots.release()
+            raise
+
+        abandoned = False
+
+        def done(future):
+            hosts.release(host)
+            request_slots.release()
+            if future.cancelled() or future.exception() is not None:
+                return
+            if abandoned and isinstance(future.result(), remote.Probe):
+                future.result().close()
+
+        loop = asyncio.get_event_loop()
+        try:
+            future = loop.run_in_executor(self._network, functools.partial(func, *args))
+        except BaseException:
+            hosts.release(host)
+            request_slots.release()
+            raise
+        future.add_done_callback(done)
+        try:
+            if deadline:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            return await asyncio.shield(future)
+        except BaseException:
+            abandoned = True
+            raise
+
+    async def _call_netcdf(self, func, *args):
+        """
+        Runs a function on the netCDF thread
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._netcdf, functools.partial(func, *args))
+
+    async def _probe(self, url):
+        """
+        Returns the remote.Probe of a URL and the URL to load it from, which
+        is rewritten to request the .ncCF file of ERDDAP TableDAP forms
+        """
+        probe = await self._request(url, remote.probe, url, self.timeout)
+        if probe.kind != remote.OPENDAP or "tabledap" not in url or urlparse(url).query:
+            return probe, url
+
+        # the DDS is only fetched once the URL is known to be an OPeNDAP
+        # endpoint, to list the variables in the .ncCF request
+        probe.close()
+        variables_str = await self._request(
+            url, opendap.create_DAP_variable_str, url, self.timeout
+        )
+        ds_str = "{}.ncCF?{}".format(url, variables_str)
+        return await self._request(ds_str, remote.probe, ds_str, self.timeout), ds_str
+
+    async def load(self, url):
+        """
+        Loads a remote dataset, as `CheckSuite.load_dataset` does
+
+        :param str url: URL of the dataset
+        :raises ValueError: If the kind of service can't be determined
+        """
+        probe, ds_str = await self._probe(url)
+        with probe:
+            if probe.kind == remote.NETCDF:
+                # large files may take longer than the timeout to download
+                opener = await self._request(
+                    ds_str,
+                    self.suite._download_remote_netcdf,
+                    probe.response,
+                    deadline=False,
+                )
+                ds = await self._call_netcdf(opener)
+            elif probe.kind == remote.OPENDAP:
+                ds = await self._call_netcdf(Dataset, ds_str)
+            elif probe.kind == remote.XML:
+                content = await self._request(ds_str, _read_content, probe.response)
+                ds = await self._call_netcdf(self.suite.process_doc, content)
+            else:
+                raise ValueError(
+                    "Unknown service with content-type: {}".format(probe.content_type)
+                )
+        return await self._call_netcdf(self.suite._prepare_dataset, ds)
+
+    async def check(self, url, checker_names, skip_checks=None):
+        """
+        Loads and checks a remote dataset
+
+        :param str url: URL of the dataset
+        :param list checker_names: Names of the checkers to run
+        :param list skip_checks: Names of checks to skip
+        :rtype: RemoteResult
+        """
+        try:
+            ds = await self.load(url)
+        except Exception as e:
+            return RemoteResult(url, None, e)
+        try:
+            score_groups = await self._call_netcdf(
+                self.suite.run, ds, skip_checks, *checker_names
+            )
+        except Exception as e:
+            return RemoteResult(url, None, e)
+        finally:
+            if hasattr(ds, "close"):
+                await self._call_netcdf(ds.close)
+        return RemoteResult(url, score_groups, None)
+
+    async def check_all(self, urls, checker_names, skip_checks=None):
+        """
+        Loads and checks remote datasets concurrently
+
+        :param list urls: URLs of the datasets
+        :param list checker_names: Names of the checkers to run
+        :param list skip_checks: Names of checks to skip
+        :rtype: list
+        :returns: RemoteResults in the same order as `urls`
+        """
+        return await asyncio.gather(
+            *(self.check(url, checker_names, skip_checks) for url in urls)
+        )
+
+    def run(self, urls, checker_names, skip_checks=None):
+        """
+        Loads and checks remote datasets concurrently, in a new event loop
+
+        :param list urls: URLs of the datasets
+        :param list checker_names: Names of the checkers to run
+        :param list skip_checks: Names of checks to skip
+        :rtype: list
+        :returns: RemoteResults in the same order as `urls`
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(
+                self.check_all(urls, checker_names, skip_checks)
+            )
+        finally:
+            loop.close()
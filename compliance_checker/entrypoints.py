@@ -0,0 +1,98 @@
+"""
+Discovery of the checker and generator plugins installed as entry points
+
+`importlib.metadata` reads the entry points from the metadata of installed
+distributions without importing them, whereas importing `pkg_resources`
+scans the whole working set and takes a good part of the start up time of
+the command line tool.  `pkg_resources` is only used on Python versions
+without `importlib.metadata`.
+"""
+
+import importlib
+
+from functools import reduce
+
+
+class EntryPoint(object):
+    """
+    An entry point of an installed distribution, which is only imported when
+    resolved
+    """
+
+    __slots__ = ("name", "module_name", "attr", "dist_name", "dist_version")
+
+    def __init__(self, name, module_name, attr, dist_name=None, dist_version=None):
+        """
+        :param str name: Entry point name
+        :param str module_name: Module the entry point refers to
+        :param str attr: Dotted path of the object within the module
+        :param str dist_name: Name of the distribution registering it
+        :param str dist_version: Version of the distribution registering it
+        """
+        self.name = name
+        self.module_name = module_name
+        self.attr = attr
+        self.dist_name = dist_name
+        self.dist_version = dist_version
+
+    def __repr__(self):
+        return "{} = {}:{}".format(self.name, self.module_name, self.attr)
+
+    def resolve(self):
+        """
+        Imports the module of the entry point and returns the object it
+        refers to
+        """
+        module = importlib.import_module(self.module_name)
+        return reduce(getattr, self.attr.split("."), module)
+
+
+def _parse_value(value):
+    """
+    Splits an entry point value, "module:attr [extras]", into its module and
+    attribute
+    """
+    module_name, _, attr = value.partition(":")
+    return module_name.strip(), attr.split("[", 1)[0].strip()
+
+
+def iter_entry_points(group):
+    """
+    Yields the entry points registered in a group by installed
+    distributions.  Distributions installed more than once are only taken
+    from the first location on sys.path, as they would be imported from.
+
+    :param str group: Entry point group, e.g. "compliance_checker.suites"
+    :rtype: iterator of EntryPoint
+    """
+    try:
+        from importlib import metadata
+    except ImportError:  # Python < 3.8
+        import pkg_resources
+
+        for ep in pkg_resources.working_set.iter_entry_points(group):
+            yield EntryPoint(
+                ep.name,
+                ep.module_name,
+                ".".join(ep.attrs),
+                ep.dist.project_name,
+                ep.dist.version,
+            )
+        return
+
+    seen = set()
+    for dist in metadata.distributions():
+        # reading the metadata of every distribution is slow, so only that of
+        # distributions with entry points in the group is
+        text = dist.read_text("entry_points.txt")
+        if not text or group not in text:
+            continue
+        dist_name = dist.metadata["Name"]
+        key = (dist_name or "").lower().replace("_", "-")
+        if key in seen:
+            continue
+        seen.add(key)
+        for ep in dist.entry_points:
+            if ep.group == group:
+                module_name, attr = _parse_value(ep.value)
+                yield EntryPoint(ep.name, module_name, attr, dist_name, dist.version)
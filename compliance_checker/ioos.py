@@ -7,7 +7,6 @@ from numbers import Number
 
 import validators
 
-from cf_units import Unit
 from lxml.etree import XPath
 from owslib.namespaces import Namespaces
 
@@ -31,6 +30,7 @@ from compliance_checker.cfutil import (
     get_instrument_variables,
     get_z_variables,
 )
+from compliance_checker.units import parse_unit
 
 
 class IOOSBaseCheck(BaseCheck):
@@ -39,6 +39,9 @@ class IOOSBaseCheck(BaseCheck):
     _cc_description = "IOOS Inventory Metadata"
     _cc_url = "https://ioos.github.io/ioos-metadata/ioos-metadata-profile-v1-1.html#ioos-netcdf-metadata-profile-attributes"
     _cc_display_headers = {3: "Highly Recommended", 2: "Recommended", 1: "Suggested"}
+    # the IOOS checkers keep no state from a dataset beyond what their reset
+    # forgets
+    _cc_reusable = True
 
     @classmethod
     def _has_attr(cls, ds, attr, concept_name, priority=BaseCheck.HIGH):
@@ -465,7 +468,7 @@ class IOOS1_2Check(IOOSNCCheck):
             "spike_test_quality_flag",
             "syntax_test_quality_flag",
         ]
-        self.cf1_7._std_names._names.extend(self._qartod_std_names)
+        self.cf1_7._std_names.extend(self._qartod_std_names)
 
         self._default_check_var_attrs = set(
             [
@@ -599,8 +602,17 @@ class IOOS1_2Check(IOOSNCCheck):
             "instrument_vocabulary",
         ]
 
+    def reset(self):
+        super(IOOS1_2Check, self).reset()
+        self.platform_vars = []
+        self.cf1_7.reset()
+        self.acdd1_6.reset()
+
     def setup(self, ds):
         self.platform_vars = self._find_platform_vars(ds)
+        # the CF checker checks are delegated to shares the CF setup done
+        # for any CF checker run against the same dataset
+        self.cf1_7.setup(ds)
 
     def _find_platform_vars(self, ds):
         """
@@ -1345,11 +1357,11 @@ class IOOS1_2Check(IOOSNCCheck):
             )
 
             unit_def_set = {
-                Unit(unit_str).definition for unit_str in expected_unit_strs
+                parse_unit(unit_str).definition for unit_str in expected_unit_strs
             }
 
             try:
-                units = Unit(units_str)
+                units = parse_unit(units_str)
                 pass_stat = units.definition in unit_def_set
             # unknown unit not convertible to UDUNITS
             except ValueError:
@@ -0,0 +1,198 @@
+"""
+Serialised access to netCDF datasets shared between threads
+
+Unless netCDF-C and HDF5 are built thread safe, which netCDF4-python doesn't
+report, only one thread at a time may call into the netCDF library.
+`locked` wraps a dataset in a proxy which holds `NETCDF_LOCK` for every
+attribute access, method call and data read made through it, and wraps the
+groups, variables and dimensions it hands out in the same way, so checks can
+run on several threads while the pure Python parts of them overlap.
+
+Proxies compare and hash equal to, and pass isinstance checks for, the
+objects they wrap, so caches keyed on a dataset, such as the dataset
+analyses in `compliance_checker.cfutil`, are shared with unwrapped code.
+"""
+
+import functools
+import threading
+
+from collections.abc import MutableMapping
+
+from netCDF4 import Dataset, Dimension, Variable
+
+
+# held while calling into the netCDF library from a proxy, reentrant so
+# that callbacks passed to netCDF4 methods may use proxies as well
+NETCDF_LOCK = threading.RLock()
+
+_NETCDF_TYPES = (Dataset, Dimension, Variable)
+
+
+def _unwrap(value):
+    if isinstance(value, (_Locked, _LockedMapping)):
+        return object.__getattribute__(value, "_obj")
+    return value
+
+
+class _Wrapper(object):
+    """
+    Wraps objects returned from netCDF objects, reusing the proxies made for
+    each object so that identity comparisons between them still hold
+    """
+
+    def __init__(self):
+        # id(object) -> (object, proxy), keeping the objects alive so their
+        # ids aren't reused
+        self._proxies = {}
+
+    def proxy(self, obj, proxy_class):
+        entry = self._proxies.get(id(obj))
+        if entry is None:
+            entry = self._proxies.setdefault(id(obj), (obj, proxy_class(obj, self)))
+        return entry[1]
+
+    def __call__(self, value, owner=None):
+        if isinstance(value, _NETCDF_TYPES):
+            return self.proxy(value, _Locked)
+        elif isinstance(value, dict):
+            # groups, variables and dimensions of a group
+            return self.proxy(value, _LockedMapping)
+        elif isinstance(value, list):
+            return [self(v) for v in value]
+        elif owner is not None and getattr(value, "__self__", None) is owner:
+            # bound method of the netCDF object
+            return self._locked_method(value)
+        return value
+
+    def _locked_method(self, method):
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            args = [_unwrap(a) for a in args]
+            with NETCDF_LOCK:
+                value = method(*args, **kwargs)
+            return self(value)
+
+        return call
+
+
+class _LockedMapping(MutableMapping):
+    """
+    Dict of netCDF objects, such as the variables of a group, whose values
+    are handed out as proxies
+    """
+
+    __slots__ = ("_obj", "_wrap")
+
+    def __init__(self, obj, wrap):
+        self._obj = obj
+        self._wrap = wrap
+
+    def __getitem__(self, key):
+        return self._wrap(self._obj[key])
+
+    def __setitem__(self, key, value):
+        self._obj[key] = _unwrap(value)
+
+    def __delitem__(self, key):
+        del self._obj[key]
+
+    def __iter__(self):
+        return iter(self._obj)
+
+    def __len__(self):
+        return len(self._obj)
+
+    def __contains__(self, key):
+        return key in self._obj
+
+    def __repr__(self):
+        with NETCDF_LOCK:
+            return repr(self._obj)
+
+
+class _Locked(object):
+    """
+    Proxy of a netCDF dataset, group, variable or dimension which holds
+    NETCDF_LOCK while using it
+    """
+
+    __slots__ = ("_obj", "_wrap", "__weakref__")
+
+    def __init__(self, obj, wrap):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_wrap", wrap)
+
+    @property
+    def __class__(self):
+        return type(self._obj)
+
+    def __getattr__(self, name):
+        obj = self._obj
+        with NETCDF_LOCK:
+            value = getattr(obj, name)
+        return self._wrap(value, obj)
+
+    def __setattr__(self, name, value):
+        with NETCDF_LOCK:
+            setattr(self._obj, name, _unwrap(value))
+
+    def __delattr__(self, name):
+        with NETCDF_LOCK:
+            delattr(self._obj, name)
+
+    def __getitem__(self, key):
+        with NETCDF_LOCK:
+            value = self._obj[key]
+        return self._wrap(value)
+
+    def __setitem__(self, key, value):
+        with NETCDF_LOCK:
+            self._obj[key] = _unwrap(value)
+
+    def __len__(self):
+        with NETCDF_LOCK:
+            return len(self._obj)
+
+    def __bool__(self):
+        with NETCDF_LOCK:
+            return bool(self._obj)
+
+    def __iter__(self):
+        with NETCDF_LOCK:
+            values = list(self._obj)
+        return iter([self._wrap(v) for v in values])
+
+    def __contains__(self, item):
+        with NETCDF_LOCK:
+            return _unwrap(item) in self._obj
+
+    def __array__(self, *args, **kwargs):
+        with NETCDF_LOCK:
+            return self._obj.__array__(*args, **kwargs)
+
+    def __eq__(self, other):
+        return self._obj == _unwrap(other)
+
+    def __ne__(self, other):
+        return self._obj != _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._obj)
+
+    def __repr__(self):
+        with NETCDF_LOCK:
+            return repr(self._obj)
+
+    def __str__(self):
+        with NETCDF_LOCK:
+            return str(self._obj)
+
+
+def locked(ds):
+    """
+    Returns a proxy of a netCDF dataset which may be shared between threads,
+    serialising every call into the netCDF library made through it
+
+    :param netCDF4.Dataset ds: An open netCDF dataset
+    """
+    return _Wrapper()(ds)
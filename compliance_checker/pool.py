@@ -0,0 +1,136 @@
+"""
+Pool of checker instances reused across datasets
+
+Checkers go through a lifecycle of one-time initialisation in their
+constructor, then `setup(ds)`, the checks and `teardown(ds)` for each
+dataset they check.  A `CheckerPool` keeps the instances of reusable
+checkers between datasets, so only the checks themselves are run per
+dataset.  Each instance is handed to one run at a time, so suites shared
+between threads get an instance per concurrent run.
+"""
+
+import threading
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def _options_key(options):
+    return frozenset(options or ())
+
+
+def create_checker(checker_class, options=None):
+    """
+    Instantiates a checker, passing it its options if its constructor takes
+    any
+
+    :param type checker_class: Checker class
+    :param set options: Checker options
+    """
+    try:
+        return checker_class(options=options)
+    # hacky fix for no options in constructor
+    except TypeError:
+        return checker_class()
+
+
+def is_reusable(checker_class):
+    """
+    Returns True if instances of a checker class may check more than one
+    dataset, see `BaseCheck._cc_reusable`
+
+    :param type checker_class: Checker class
+    """
+    return getattr(checker_class, "_cc_reusable", False)
+
+
+class CheckerPool(object):
+    """
+    Idle instances of reusable checkers, keyed by checker class and options
+    """
+
+    def __init__(self, max_idle=None):
+        """
+        :param int max_idle: Maximum number of idle instances kept of each
+                             checker class and options, or None for no limit
+        """
+        self.max_idle = max_idle
+        # (checker class, frozenset of options) -> list of idle instances
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(instances) for instances in self._idle.values())
+
+    def acquire(self, checker_class, options=None):
+        """
+        Returns an idle instance of a checker, or a new one if there is
+        none.  Hand it back with `release` once done with the dataset.
+
+        :param type checker_class: Checker class
+        :param set options: Checker options
+        """
+        key = (checker_class, _options_key(options))
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return create_checker(checker_class, options)
+
+    def release(self, checker, options=None):
+        """
+        Returns an instance obtained from `acquire` to the pool, once its
+        `teardown` has been called.  Instances of checkers which aren't
+        reusable are discarded.
+
+        :param checker: Checker instance
+        :param set options: Options the checker was acquired with
+        """
+        checker_class = type(checker)
+        if not is_reusable(checker_class):
+            return
+        key = (checker_class, _options_key(options))
+        with self._lock:
+            idle = self._idle[key]
+            if self.max_idle is None or len(idle) < self.max_idle:
+                idle.append(checker)
+
+    @contextmanager
+    def checker(self, checker_class, options=None):
+        """
+        Context manager acquiring a checker instance and releasing it
+        afterwards
+        """
+        checker = self.acquire(checker_class, options)
+        try:
+            yield checker
+        finally:
+            self.release(checker, options)
+
+    def warm(self, checker_class, options=None, count=1):
+        """
+        Creates instances of a reusable checker until at least `count` are
+        idle, so that later runs don't pay for their initialisation
+
+        :param type checker_class: Checker class
+        :param set options: Checker options
+        :param int count: Number of idle instances wanted
+        """
+        if not is_reusable(checker_class):
+            return
+        if self.max_idle is not None:
+            count = min(count, self.max_idle)
+        key = (checker_class, _options_key(options))
+        while True:
+            with self._lock:
+                if len(self._idle[key]) >= count:
+                    return
+            self.release(create_checker(checker_class, options), options)
+
+    def clear(self):
+        """
+        Discards every idle instance
+        """
+        with self._lock:
+            self._idle.clear()
@@ -0,0 +1,186 @@
+"""
+Timing and memory profiles of checker runs
+
+A `Profile` passed to a CheckSuite records the wall time, CPU time and peak
+memory allocated while setting up each checker, running each check method
+and grouping the scores, so that the checks dominating a run can be found.
+"""
+
+import json
+import time
+import tracemalloc
+
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+
+# dataset: path or name of the dataset checked, if known
+# checker: checker name, e.g. "cf:1.7"
+# phase: "setup", "check" or "scores"
+# name: check method name for checks, otherwise the phase
+# wall, cpu: elapsed wall clock and process CPU time in seconds
+# peak_memory: peak memory allocated in bytes, as traced by tracemalloc
+ProfileRecord = namedtuple(
+    "ProfileRecord",
+    ["dataset", "checker", "phase", "name", "wall", "cpu", "peak_memory"],
+)
+
+
+class Profile(object):
+    """
+    Collects ProfileRecords for the checkers run by a CheckSuite.  Memory is
+    traced with tracemalloc while measuring, which slows down the checks, so
+    the peak memory can optionally be left out.
+    """
+
+    SORT_KEYS = ("wall", "cpu", "peak_memory")
+
+    def __init__(self, trace_memory=True):
+        """
+        :param bool trace_memory: Whether to record the peak memory allocated
+                                  by each measured step
+        """
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    @contextmanager
+    def measure(self, dataset, checker, phase, name=None):
+        """
+        Context manager which records the time and memory used by its body
+
+        :param str dataset: Path or name of the dataset being checked
+        :param str checker: Checker name
+        :param str phase: "setup", "check" or "scores"
+        :param str name: Check method name, defaults to the phase
+        """
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            try:
+                tracemalloc.reset_peak()
+            except AttributeError:
+                # Python < 3.9, forget earlier allocations instead
+                tracemalloc.clear_traces()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            peak_memory = None
+            if self.trace_memory:
+                peak_memory = max(0, tracemalloc.get_traced_memory()[1] - start_memory)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.records.append(
+                ProfileRecord(
+                    dataset, checker, phase, name or phase, wall, cpu, peak_memory
+                )
+            )
+
+    def extend(self, records):
+        """
+        Adds records collected elsewhere, e.g. by a worker process
+
+        :param records: Iterable of ProfileRecords or equivalent tuples
+        """
+        self.records.extend(ProfileRecord(*r) for r in records)
+
+    def summary(self, sort_by="wall"):
+        """
+        Aggregates the records by checker, phase and name across datasets,
+        summing the times and taking the largest peak memory, sorted in
+        descending order of `sort_by`.
+
+        :param str sort_by: One of "wall", "cpu" or "peak_memory"
+        :rtype: list
+        :returns: List of dicts with the aggregated values and call counts
+        """
+        if sort_by not in self.SORT_KEYS:
+            raise ValueError(
+                "Cannot sort profile by {}, expected one of {}".format(
+                    sort_by, ", ".join(self.SORT_KEYS)
+                )
+            )
+        totals = OrderedDict()
+        for record in self.records:
+            key = (record.checker, record.phase, record.name)
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = {
+                    "checker": record.checker,
+                    "phase": record.phase,
+                    "name": record.name,
+                    "calls": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "peak_memory": None,
+                }
+            entry["calls"] += 1
+            entry["wall"] += record.wall
+            entry["cpu"] += record.cpu
+            if record.peak_memory is not None:
+                entry["peak_memory"] = max(
+                    entry["peak_memory"] or 0, record.peak_memory
+                )
+        return sorted(totals.values(), key=lambda e: e[sort_by] or 0, reverse=True)
+
+    def format_table(self, sort_by="wall", limit=None):
+        """
+        Returns the summary as a text table, slowest first
+
+        :param str sort_by: One of "wall", "cpu" or "peak_memory"
+        :param int limit: Maximum number of rows, or None for all
+        :rtype: str
+        """
+        rows = self.summary(sort_by)[:limit]
+        lines = [
+            "{:>9} {:>9} {:>10} {:>5}  {:<12} {}".format(
+                "wall (s)", "cpu (s)", "peak (KiB)", "calls", "checker", "step"
+            )
+        ]
+        for row in rows:
+            peak = (
+                "-"
+                if row["peak_memory"] is None
+                else "{:.0f}".format(row["peak_memory"] / 1024.0)
+            )
+            if row["phase"] == "check":
+                step = row["name"]
+            else:
+                step = "<{}>".format(row["phase"])
+            lines.append(
+                "{:>9.4f} {:>9.4f} {:>10} {:>5}  {:<12} {}".format(
+                    row["wall"], row["cpu"], peak, row["calls"], row["checker"], step
+                )
+            )
+        return "\n".join(lines)
+
+    def to_dict(self, sort_by="wall"):
+        """
+        Returns the individual records and the summary as a dict suitable
+        for serializing to JSON
+
+        :param str sort_by: Sort key of the summary
+        :rtype: dict
+        """
+        return {
+            "records": [r._asdict() for r in self.records],
+            "summary": self.summary(sort_by),
+        }
+
+    def to_json(self, sort_by="wall", **kwargs):
+        """
+        Returns the profile serialized as JSON
+
+        :param str sort_by: Sort key of the summary
+        :rtype: str
+        """
+        return json.dumps(self.to_dict(sort_by), **kwargs)
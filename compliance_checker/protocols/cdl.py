@@ -1,8 +1,717 @@
 #!/usr/bin/env python
 """
 compliance_checker/protocols/cdl.py
+
+Detection and parsing of CDL, the text notation of netCDF datasets written
+by ncdump.  CDL is turned into netCDF datasets in process, without calling
+ncgen, so a .cdl file can be checked from an in-memory dataset.
 """
+import io
 import os
+import re
+
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from netCDF4 import Dataset, default_fillvals
+
+
+# changed whenever the datasets the parser writes change, so netCDF files
+# generated by earlier versions are not reused
+PARSER_VERSION = 2
+
+# CDL primitive type names and their aliases mapped to numpy dtype strings
+CDL_TYPES = {
+    "char": "S1",
+    "byte": "i1",
+    "ubyte": "u1",
+    "short": "i2",
+    "ushort": "u2",
+    "int": "i4",
+    "integer": "i4",
+    "long": "i4",
+    "uint": "u4",
+    "int64": "i8",
+    "uint64": "u8",
+    "float": "f4",
+    "real": "f4",
+    "double": "f8",
+    "string": str,
+}
+
+# types which require the netCDF-4 data model
+_NC4_TYPES = {"ubyte", "ushort", "uint", "int64", "uint64", "string"}
+
+# type of constants with the L suffix, which ncgen writes as int64 in
+# netCDF-4 files and as int otherwise
+_LONG_CONSTANT = "long constant"
+
+# numeric literal suffixes and the CDL type they denote
+_SUFFIX_TYPES = {
+    "": None,
+    "b": "byte",
+    "ub": "ubyte",
+    "s": "short",
+    "us": "ushort",
+    "l": _LONG_CONSTANT,
+    "u": "uint",
+    "ul": "uint",
+    "ll": "int64",
+    "ull": "uint64",
+    "f": "float",
+    "d": "double",
+}
+
+# ordering used to pick a single type for attributes with mixed constants
+_TYPE_RANK = [
+    "byte",
+    "ubyte",
+    "short",
+    "ushort",
+    "int",
+    _LONG_CONSTANT,
+    "uint",
+    "int64",
+    "uint64",
+    "float",
+    "double",
+]
+
+# special attributes which ncgen consumes instead of writing
+_SPECIAL_ATTRS = {
+    "_ChunkSizes",
+    "_DeflateLevel",
+    "_Endianness",
+    "_Fletcher32",
+    "_Format",
+    "_NoFill",
+    "_Shuffle",
+    "_Storage",
+}
+
+_TOKEN_PATTERN = r"""
+    (?P<ws>\s+|//[^\n]*)
+    |(?P<string>"(?:\\.|[^"\\])*")
+    |(?P<char>'(?:\\.|[^'\\])')
+    |(?P<number>[+-]?(?:
+        0[xX][0-9a-fA-F]+(?:[uU]?[lL]{0,2}|[uU]?[sSbB])?
+        |(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?[a-zA-Z]{0,3}
+        |(?:NaN|nan|Infinity|infinity|Inf|inf)[fF]?
+      )(?![\w.]))
+    |(?P<ident>(?:[A-Za-z_\x80-\uffff]|\\.)(?:[A-Za-z0-9_.@+\-\x80-\uffff]|\\.)*)
+    |(?P<punct>[{}(),;:=])
+    |(?P<other>[^\s{}(),;:="']+)
+    """
+
+
+@lru_cache(maxsize=None)
+def _token_re():
+    # compiled on first use rather than on import, as compiling it takes a
+    # noticeable part of the start up time of the command line tool
+    return re.compile(_TOKEN_PATTERN, re.VERBOSE)
+
+
+class CDLSyntaxError(ValueError):
+    """
+    Raised when CDL text cannot be parsed
+    """
+
+
+class _Token(object):
+    __slots__ = ("kind", "value", "line")
+
+    def __init__(self, kind, value, line):
+        self.kind = kind
+        self.value = value
+        self.line = line
+
+    def __repr__(self):
+        return "{}({!r})".format(self.kind, self.value)
+
+
+def _unescape(text):
+    """Removes CDL backslash escapes from an identifier or string body"""
+    return re.sub(
+        r"\\(.)",
+        lambda m: {"n": "\n", "t": "\t", "r": "\r", "0": "\0"}.get(
+            m.group(1), m.group(1)
+        ),
+        text,
+    )
+
+
+def tokenize(text):
+    """
+    Splits CDL text into a list of tokens, dropping whitespace and comments.
+
+    :param str text: CDL text
+    :rtype: list
+    """
+    tokens = []
+    pos = 0
+    line = 1
+    length = len(text)
+    token_re = _token_re()
+    while pos < length:
+        match = token_re.match(text, pos)
+        if match is None:
+            raise CDLSyntaxError(
+                "Unexpected character {!r} on line {}".format(text[pos], line)
+            )
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind != "ws":
+            tokens.append(_Token(kind, value, line))
+        line += value.count("\n")
+        pos = match.end()
+    return tokens
+
+
+def _parse_number(text):
+    """
+    Converts a numeric CDL literal into a python value and the CDL type
+    implied by its form and suffix.
+    """
+    lowered = text.lower()
+    sign = -1 if lowered.startswith("-") else 1
+    body = lowered.lstrip("+-")
+    for special, value in (("infinity", np.inf), ("inf", np.inf), ("nan", np.nan)):
+        if body.startswith(special):
+            return sign * value, "float" if body.endswith("f") else "double"
+
+    if body.startswith("0x"):
+        match = re.match(r"0x([0-9a-f]+?)(u?l{0,2}|u?[sb])?$", body)
+        suffix = match.group(2) or ""
+        return sign * int(match.group(1), 16), _SUFFIX_TYPES.get(suffix) or "int"
+
+    match = re.match(r"([0-9.]+(?:e[+-]?\d+)?)([a-z]*)$", body)
+    if match is None:
+        raise CDLSyntaxError("Malformed numeric constant {}".format(text))
+    digits, suffix = match.groups()
+    if suffix not in _SUFFIX_TYPES:
+        raise CDLSyntaxError("Unknown numeric suffix in constant {}".format(text))
+    cdl_type = _SUFFIX_TYPES[suffix]
+    is_float = "." in digits or "e" in digits
+    if is_float or cdl_type in ("float", "double"):
+        return sign * float(digits), cdl_type or "double"
+    value = sign * int(digits)
+    if cdl_type is None:
+        cdl_type = "int" if -(2 ** 31) <= value < 2 ** 31 else "int64"
+    return value, cdl_type
+
+
+class CDLVariable(object):
+    """
+    Parsed variable declaration: type, dimensions, attributes and data
+    """
+
+    def __init__(self, name, cdl_type, dimensions):
+        self.name = name
+        self.cdl_type = cdl_type
+        self.dimensions = tuple(dimensions)
+        self.attributes = OrderedDict()
+        self.data = None
+
+
+class CDLDocument(object):
+    """
+    Result of parsing a CDL file: the dataset name, dimensions, variables and
+    global attributes.  Attribute values are stored as (cdl_type, value)
+    pairs.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.dimensions = OrderedDict()
+        self.variables = OrderedDict()
+        self.attributes = OrderedDict()
+
+    @property
+    def requires_netcdf4(self):
+        """True if the document uses any netCDF-4 only data types"""
+        for variable in self.variables.values():
+            if variable.cdl_type in _NC4_TYPES:
+                return True
+            for att_type, _ in variable.attributes.values():
+                if att_type in _NC4_TYPES:
+                    return True
+        return any(t in _NC4_TYPES for t, _ in self.attributes.values())
+
+
+class _Parser(object):
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        idx = self.pos + offset
+        return self.tokens[idx] if idx < len(self.tokens) else None
+
+    def next(self):
+        tok = self.peek()
+        if tok is None:
+            raise CDLSyntaxError("Unexpected end of CDL input")
+        self.pos += 1
+        return tok
+
+    def expect(self, value):
+        tok = self.next()
+        if tok.value != value:
+            raise CDLSyntaxError(
+                "Expected {!r} on line {}, got {!r}".format(value, tok.line, tok.value)
+            )
+        return tok
+
+    def is_section(self, name):
+        tok, nxt = self.peek(), self.peek(1)
+        return (
+            tok is not None
+            and tok.kind == "ident"
+            and tok.value == name
+            and nxt is not None
+            and nxt.value == ":"
+        )
+
+    def at_section_end(self):
+        tok = self.peek()
+        return (
+            tok is None
+            or tok.value == "}"
+            or any(
+                self.is_section(s) for s in ("dimensions", "variables", "data", "types")
+            )
+            or (tok.kind == "ident" and tok.value == "group")
+        )
+
+    def ident(self):
+        tok = self.next()
+        if tok.kind not in ("ident", "number"):
+            raise CDLSyntaxError(
+                "Expected a name on line {}, got {!r}".format(tok.line, tok.value)
+            )
+        return _unescape(tok.value)
+
+    def parse(self):
+        self.expect("netcdf")
+        name = ""
+        while self.peek() is not None and self.peek().value != "{":
+            name += self.next().value
+        doc = CDLDocument(_unescape(name))
+        self.expect("{")
+        while True:
+            tok = self.peek()
+            if tok is None:
+                raise CDLSyntaxError("Missing closing brace")
+            if tok.value == "}":
+                self.next()
+                break
+            if self.is_section("dimensions"):
+                self.pos += 2
+                self.parse_dimensions(doc)
+            elif self.is_section("variables"):
+                self.pos += 2
+                self.parse_variables(doc)
+            elif self.is_section("data"):
+                self.pos += 2
+                self.parse_data(doc)
+            elif tok.value == ":":
+                # global attributes declared before any section
+                self.parse_variables(doc)
+            elif self.is_section("types") or tok.value == "group":
+                raise CDLSyntaxError(
+                    "User defined types and groups are not supported (line {})".format(
+                        tok.line
+                    )
+                )
+            else:
+                raise CDLSyntaxError(
+                    "Unexpected {!r} on line {}".format(tok.value, tok.line)
+                )
+        return doc
+
+    def parse_dimensions(self, doc):
+        while not self.at_section_end():
+            name = self.ident()
+            self.expect("=")
+            tok = self.next()
+            if tok.value.lower() == "unlimited":
+                doc.dimensions[name] = None
+            elif tok.kind == "number":
+                doc.dimensions[name] = int(_parse_number(tok.value)[0])
+            else:
+                raise CDLSyntaxError(
+                    "Expected the length of dimension {} on line {}, got {!r}".format(
+                        name, tok.line, tok.value
+                    )
+                )
+            sep = self.next()
+            if sep.value not in (",", ";"):
+                raise CDLSyntaxError("Expected ',' or ';' on line {}".format(sep.line))
+
+    def parse_variables(self, doc):
+        while not self.at_section_end():
+            tok = self.peek()
+            if tok.value == ":":
+                self.next()
+                self.parse_attribute(doc, None, None)
+            elif tok.kind == "ident" and tok.value in CDL_TYPES:
+                nxt = self.peek(1)
+                after = self.peek(2)
+                if nxt.value == ":" or (after is not None and after.value == ":"):
+                    # typed attribute, e.g. `int64 var:att = 1 ;`
+                    self.next()
+                    if self.peek().value == ":":
+                        self.next()
+                        self.parse_attribute(doc, None, tok.value)
+                    else:
+                        var_name = self.ident()
+                        self.expect(":")
+                        self.parse_attribute(doc, var_name, tok.value)
+                else:
+                    self.next()
+                    self.parse_declarations(doc, tok.value)
+            else:
+                var_name = self.ident()
+                self.expect(":")
+                self.parse_attribute(doc, var_name, None)
+
+    def parse_declarations(self, doc, cdl_type):
+        while True:
+            name = self.ident()
+            dims = []
+            if self.peek().value == "(":
+                self.next()
+                while self.peek().value != ")":
+                    dims.append(self.ident())
+                    if self.peek().value == ",":
+                        self.next()
+                self.expect(")")
+            doc.variables[name] = CDLVariable(name, cdl_type, dims)
+            sep = self.next()
+            if sep.value == ";":
+                return
+            if sep.value != ",":
+                raise CDLSyntaxError("Expected ',' or ';' on line {}".format(sep.line))
+
+    def parse_constants(self):
+        values = []
+        while True:
+            tok = self.next()
+            if tok.value in ("{", "}"):
+                continue
+            if tok.value == ";":
+                return values
+            if tok.value == ",":
+                continue
+            if tok.kind == "string":
+                values.append((_unescape(tok.value[1:-1]), "char"))
+            elif tok.kind == "char":
+                values.append((_unescape(tok.value[1:-1]), "char"))
+            elif tok.kind == "number":
+                value, cdl_type = _parse_number(tok.value)
+                values.append((value, cdl_type))
+            elif tok.kind == "ident" and tok.value == "_":
+                values.append((None, None))
+            elif tok.kind == "ident" and tok.value.upper() == "NIL":
+                values.append((None, None))
+            else:
+                raise CDLSyntaxError(
+                    "Unexpected constant {!r} on line {}".format(tok.value, tok.line)
+                )
+
+    def parse_attribute(self, doc, var_name, declared_type):
+        att_name = self.ident()
+        self.expect("=")
+        values = self.parse_constants()
+        cdl_type = declared_type or _infer_type(values)
+        if cdl_type in ("char", "string") and declared_type != "string":
+            value = "".join(v for v, _ in values if v is not None)
+        elif cdl_type == "string":
+            value = [v for v, _ in values]
+            if len(value) == 1:
+                value = value[0]
+        else:
+            value = [v for v, _ in values]
+        if var_name is None:
+            doc.attributes[att_name] = (cdl_type, value)
+        else:
+            if var_name not in doc.variables:
+                raise CDLSyntaxError(
+                    "Attribute {} refers to undeclared variable {}".format(
+                        att_name, var_name
+                    )
+                )
+            doc.variables[var_name].attributes[att_name] = (cdl_type, value)
+
+    def parse_data(self, doc):
+        while not self.at_section_end():
+            name = self.ident()
+            self.expect("=")
+            if name not in doc.variables:
+                raise CDLSyntaxError("Data for undeclared variable {}".format(name))
+            doc.variables[name].data = [v for v, _ in self.parse_constants()]
+
+
+def _infer_type(values):
+    """
+    Picks the CDL type of an untyped attribute from its constants, widening
+    numeric types as required
+    """
+    types = {t for _, t in values if t is not None}
+    if not types or "char" in types:
+        return "char"
+    return max(types, key=_TYPE_RANK.index)
+
+
+def parse_cdl(text):
+    """
+    Parses CDL text into a CDLDocument
+
+    :param str text: CDL text as produced by `ncdump` or written by hand
+    :rtype: CDLDocument
+    """
+    return _Parser(tokenize(text)).parse()
+
+
+def _char_array(values, shape):
+    """Lays out string constants into a char array of the given shape"""
+    arr = np.zeros(shape, dtype="S1")
+    if not shape:
+        text = "".join(v for v in values if v)
+        arr[()] = text[:1].encode("utf-8")
+        return arr
+    row_len = shape[-1]
+    if len(shape) == 1:
+        rows = ["".join(v for v in values if v)]
+    else:
+        rows = [v or "" for v in values]
+    flat = arr.reshape(-1, row_len)
+    for i, row in enumerate(rows[: flat.shape[0]]):
+        encoded = row.encode("utf-8")[:row_len]
+        flat[i, : len(encoded)] = [encoded[j : j + 1] for j in range(len(encoded))]
+    return arr
+
+
+def _attr_value(cdl_type, value, data_model):
+    if cdl_type in ("char", "string"):
+        return value
+    if cdl_type == _LONG_CONSTANT:
+        cdl_type = "int64" if data_model == "NETCDF4" else "int"
+    dtype = np.dtype(CDL_TYPES[cdl_type])
+    arr = np.array([np.nan if v is None else v for v in value], dtype=dtype)
+    return arr[0] if arr.size == 1 else arr
+
+
+def _unlimited_size(doc, variable, sizes):
+    """
+    Returns the unlimited dimension a variable's data is written along and
+    the length the data gives it, or None if the variable has no data along
+    an unlimited dimension.  The lengths of any other unlimited dimensions
+    the variable uses are taken from `sizes`.
+    """
+    unlimited = [d for d in variable.dimensions if doc.dimensions[d] is None]
+    if variable.data is None or not unlimited:
+        return None
+    name = unlimited[0]
+    # the length of the data, counted in elements
+    count = len(variable.data)
+    if variable.cdl_type == "char" and len(variable.dimensions) > 1:
+        # each string constant fills a row of the last dimension
+        count *= doc.dimensions[variable.dimensions[-1]] or 1
+    inner = 1
+    for dim in variable.dimensions:
+        if dim != name:
+            inner *= doc.dimensions[dim] or sizes.get(dim) or 1
+    # the dimension may be used more than once, e.g. temp(time, time)
+    repeats = variable.dimensions.count(name)
+    rows = -(-count // inner)
+    size = int(round(rows ** (1.0 / repeats)))
+    while size ** repeats < rows:
+        size += 1
+    return name, size
+
+
+def _unlimited_sizes(doc):
+    """
+    Returns the length of each unlimited dimension, sized from the data
+    written along it.  Variables using a single unlimited dimension are
+    sized first, so that variables using several can be sized from them.
+    """
+    sizes = {}
+    variables = sorted(
+        doc.variables.values(),
+        key=lambda v: len({d for d in v.dimensions if doc.dimensions[d] is None}),
+    )
+    for variable in variables:
+        sized = _unlimited_size(doc, variable, sizes)
+        if sized is not None:
+            name, size = sized
+            sizes[name] = max(sizes.get(name, 0), size)
+    return sizes
+
+
+def _write_data(ncvar, variable, shape):
+    """
+    Writes the data constants of a variable, writing the fill value for
+    missing values and any values beyond the end of the constants
+    """
+    # data constants are the packed values stored in the file
+    ncvar.set_auto_scale(False)
+    if variable.cdl_type == "char":
+        ncvar.set_auto_chartostring(False)
+        ncvar[...] = _char_array(variable.data, shape)
+    elif variable.cdl_type == "string":
+        values = np.array(
+            [v if v is not None else "" for v in variable.data], dtype=object
+        )
+        ncvar[...] = values.reshape(shape) if shape else values[0]
+    else:
+        dtype = np.dtype(CDL_TYPES[variable.cdl_type])
+        if "_FillValue" in ncvar.ncattrs():
+            fill_value = ncvar.getncattr("_FillValue")
+        else:
+            fill_value = default_fillvals[dtype.str[1:]]
+        size = int(np.prod(shape)) if shape else 1
+        data = [fill_value if v is None else v for v in variable.data[:size]]
+        data += [fill_value] * (size - len(data))
+        arr = np.array(data, dtype=dtype)
+        ncvar[...] = arr.reshape(shape) if shape else arr[0]
+
+
+def _shape(doc, variable, unlimited_sizes):
+    return tuple(
+        unlimited_sizes.get(d, 0) if doc.dimensions[d] is None else doc.dimensions[d]
+        for d in variable.dimensions
+    )
+
+
+def _extend_unlimited(nc, doc, unlimited_sizes):
+    """
+    Grows the unlimited dimensions of a dataset written without data to
+    their length, by writing a single fill value at the last index of the
+    smallest variable using each one
+    """
+    for name in unlimited_sizes:
+        using_dim = sorted(
+            (v for v in doc.variables.values() if name in v.dimensions),
+            key=lambda v: len(v.dimensions),
+        )
+        for variable in using_dim:
+            shape = _shape(doc, variable, unlimited_sizes)
+            if 0 in shape:
+                continue
+            ncvar = nc.variables[variable.name]
+            try:
+                ncvar[tuple(size - 1 for size in shape)] = (
+                    "" if ncvar.dtype is str else np.ma.masked
+                )
+            except (TypeError, ValueError):
+                continue
+            break
+
+
+def write_dataset(doc, nc, data=True):
+    """
+    Populates an empty, writable netCDF4.Dataset from a parsed CDLDocument.
+
+    :param CDLDocument doc: the parsed CDL
+    :param netCDF4.Dataset nc: dataset opened in write mode
+    :param bool data: If False, only the header is written: dimensions,
+                      variables and attributes, with unlimited dimensions
+                      keeping their length but no variable data
+    """
+    unlimited_sizes = _unlimited_sizes(doc)
+
+    for name, size in doc.dimensions.items():
+        nc.createDimension(name, size)
+
+    for name, variable in doc.variables.items():
+        kwargs = {}
+        attrs = OrderedDict(variable.attributes)
+        if "_FillValue" in attrs:
+            att_type, value = attrs.pop("_FillValue")
+            if variable.cdl_type in ("char", "string"):
+                kwargs["fill_value"] = value
+            else:
+                kwargs["fill_value"] = np.array(
+                    value, dtype=CDL_TYPES[variable.cdl_type]
+                ).ravel()[0]
+        if "_ChunkSizes" in attrs and nc.data_model.startswith("NETCDF4"):
+            kwargs["chunksizes"] = [int(v) for v in attrs["_ChunkSizes"][1]]
+        ncvar = nc.createVariable(
+            name, CDL_TYPES[variable.cdl_type], variable.dimensions, **kwargs
+        )
+        for att_name, (att_type, value) in attrs.items():
+            if att_name in _SPECIAL_ATTRS:
+                continue
+            if att_type == "string":
+                ncvar.setncattr_string(att_name, value)
+            else:
+                ncvar.setncattr(att_name, _attr_value(att_type, value, nc.data_model))
+
+        if not data or variable.data is None:
+            continue
+        _write_data(ncvar, variable, _shape(doc, variable, unlimited_sizes))
+
+    if not data:
+        _extend_unlimited(nc, doc, unlimited_sizes)
+
+    for att_name, (att_type, value) in doc.attributes.items():
+        if att_name in _SPECIAL_ATTRS:
+            continue
+        if att_type == "string":
+            nc.setncattr_string(att_name, value)
+        else:
+            nc.setncattr(att_name, _attr_value(att_type, value, nc.data_model))
+    return nc
+
+
+def read_cdl(cdl_path):
+    """
+    Parses a CDL file into a CDLDocument
+
+    :param str cdl_path: Path of the CDL file
+    :rtype: CDLDocument
+    """
+    with io.open(cdl_path, encoding="utf-8") as f:
+        return parse_cdl(f.read())
+
+
+def netcdf_format(doc, format=None):
+    """
+    Returns the netCDF format to write a CDLDocument in: `format` if given,
+    otherwise netCDF-3 classic unless the document uses netCDF-4 types, as
+    ncgen does by default
+
+    :param CDLDocument doc: the parsed CDL
+    :param str format: Requested format, or None
+    :raises ValueError: If a netCDF-3 format is requested for a document
+                        using netCDF-4 types
+    :rtype: str
+    """
+    if format is None:
+        return "NETCDF4" if doc.requires_netcdf4 else "NETCDF3_CLASSIC"
+    if not format.startswith("NETCDF4") and doc.requires_netcdf4:
+        raise ValueError("{} cannot hold netCDF-4 data types".format(format))
+    return format
+
+
+def generate_netcdf(cdl_path, nc_path, format=None):
+    """
+    Writes the netCDF file described by a CDL file, as `ncgen -o` does
+
+    :param str cdl_path: Path of the CDL file
+    :param str nc_path: Path of the netCDF file to write
+    :param str format: netCDF format to write, see `netcdf_format`
+    :rtype: str
+    :returns: The path written
+    """
+    doc = read_cdl(cdl_path)
+    with Dataset(nc_path, "w", format=netcdf_format(doc, format)) as nc:
+        write_dataset(doc, nc)
+    return nc_path
 
 
 def is_cdl(filename):
@@ -5,7 +5,11 @@ compliance_checker/protocols/netcdf.py
 Functions to assist in determining if the URL points to a netCDF file
 """
 
-import requests
+from compliance_checker.protocols import remote
+
+
+# bytes read from a remote netCDF response at a time
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 def is_netcdf(url):
@@ -61,6 +65,53 @@ def is_hdf5(file_buffer):
     return False
 
 
+def has_netcdf_signature(file_buffer):
+    """
+    Returns True if a byte array starts with the signature of any netCDF
+    format: classic, 64-bit offset, 64-bit data or netCDF-4/HDF5
+
+    :param bytes file_buffer: Byte-array of at least the first 4 bytes of a
+                              file
+    """
+    header = bytes(file_buffer[:4])
+    # CDF followed by the format version, or .HDF
+    if header[:3] == b"CDF" and header[3:] in (b"\x01", b"\x02", b"\x05"):
+        return True
+    return is_hdf5(header)
+
+
+def download_netcdf(response, fileobj, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Writes the body of a streamed response to a file object, one chunk at a
+    time so that memory use doesn't depend on the size of the file.  The
+    start of the body is checked against the netCDF signatures before the
+    rest of it is read.
+
+    :param requests.Response response: Response of a request made with
+                                       `stream=True`
+    :param fileobj: Writable binary file object
+    :param int chunk_size: Maximum number of bytes held in memory at once
+    :raises ValueError: If the response body isn't a netCDF file
+    :rtype: int
+    :returns: Number of bytes written
+    """
+    chunks = response.iter_content(chunk_size)
+    header = b""
+    for chunk in chunks:
+        header += chunk
+        if len(header) >= 4:
+            break
+    if not has_netcdf_signature(header):
+        raise ValueError("Response from {} is not a netCDF file".format(response.url))
+
+    fileobj.write(header)
+    size = len(header)
+    for chunk in chunks:
+        fileobj.write(chunk)
+        size += len(chunk)
+    return size
+
+
 def is_remote_netcdf(ds_str):
     """
     Check a remote path points to a NetCDF resource.
@@ -77,7 +128,7 @@ def is_remote_netcdf(ds_str):
     # Some datasets do not support HEAD requests!  The vast majority will,
     # however, support GET requests
     try:
-        head_req = requests.head(ds_str, allow_redirects=True, timeout=10)
+        head_req = remote.get_session().head(ds_str, allow_redirects=True, timeout=10)
         head_req.raise_for_status()
     except:
         content_type = None
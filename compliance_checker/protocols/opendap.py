@@ -5,12 +5,11 @@ compliance_checker/protocols/opendap.py
 Functions to assist in determining if the URL is an OPeNDAP endpoint
 """
 import urllib.parse
-import urllib.request
 
-import requests
+from compliance_checker.protocols import remote
 
 
-def create_DAP_variable_str(url):
+def create_DAP_variable_str(url, timeout=60):
     """
     Create a URL-encoded string of variables for a given DAP dataset.
     Works on OPeNDAP datasets.
@@ -18,6 +17,7 @@ def create_DAP_variable_str(url):
     Parameters
     ----------
     url (str): endpoint to *DAP dataset
+    timeout (float): timeout of the request in seconds
 
     Returns
     -------
@@ -25,8 +25,9 @@ def create_DAP_variable_str(url):
     """
 
     # get dds
-    with urllib.request.urlopen("{}.dds".format(url)) as resp:
-        _str = resp.read().decode()[8:]
+    with remote.get_session().get("{}.dds".format(url), timeout=timeout) as resp:
+        resp.raise_for_status()
+        _str = resp.content.decode()[8:]
 
     # remove beginning and ending braces, split on newlines
     no_braces_newlines = list(
@@ -50,19 +51,4 @@ def is_opendap(url):
 
     :param str url: URL for a remote OPeNDAP endpoint
     """
-    # If the server replies to a Data Attribute Structure request
-    if url.endswith("#fillmismatch"):
-        das_url = url.replace("#fillmismatch", ".das")
-    else:
-        das_url = url + ".das"
-    response = requests.get(das_url, allow_redirects=True)
-    if "xdods-server" in response.headers:
-        return True
-    # Check if it is an access restricted ESGF thredds service
-    if (
-        response.status_code == 401
-        and "text/html" in response.headers["content-type"]
-        and "The following URL requires authentication:" in response.text
-    ):
-        return True
-    return False
+    return remote.is_opendap(url)
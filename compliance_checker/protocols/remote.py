@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""
+compliance_checker/protocols/remote.py
+
+Shared HTTP session and detection of the kind of service behind a URL
+"""
+
+import os
+import threading
+import time
+
+from urllib.parse import urlparse
+
+
+# kinds of remote resources
+NETCDF = "netcdf"
+OPENDAP = "opendap"
+XML = "xml"
+UNKNOWN = "unknown"
+
+# connection pools kept per session, and connections kept per host
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 32
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# seconds the kind of a URL is remembered for
+CLASSIFICATION_TTL = 300
+
+# (scheme, host, path) -> (kind, content type, expiry time)
+_classifications = {}
+_classifications_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the requests.Session shared by every request the compliance
+    checker makes, which keeps connections alive and pooled per host.  Each
+    process gets its own session, as connections can't be shared with
+    forked worker processes.
+
+    :rtype: requests.Session
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            # requests is imported on first use, as it is slow to import
+            import requests
+
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+def _classification_key(url):
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.netloc, parsed.path
+
+
+def clear_classifications():
+    """
+    Forgets the kinds of all URLs probed so far
+    """
+    with _classifications_lock:
+        _classifications.clear()
+
+
+def _content_type(response):
+    return response.headers.get("content-type", "")
+
+
+def is_opendap_response(response):
+    """
+    Returns True if a response was served by an OPeNDAP server
+
+    :param requests.Response response: Response of any request to the server
+    """
+    if "xdods-server" in response.headers or "xopendap-server" in response.headers:
+        return True
+    # Check if it is an access restricted ESGF thredds service
+    return (
+        response.status_code == 401
+        and "text/html" in _content_type(response)
+        and "The following URL requires authentication:" in response.text
+    )
+
+
+def _classify_response(response):
+    """
+    Returns the kind of resource a response is for, or None if it can't be
+    told from the response alone
+    """
+    content_type = _content_type(response)
+    if response.ok and content_type.startswith("application/x-netcdf"):
+        return NETCDF
+    elif is_opendap_response(response):
+        return OPENDAP
+    elif response.ok and content_type.startswith("text/xml"):
+        return XML
+    return None
+
+
+class Probe(object):
+    """
+    The kind of resource at a URL, and the response to the request made to
+    find out, if any.  A NETCDF or XML probe holds the response to a GET of
+    the resource itself, with its body not yet read, so the resource can be
+    loaded without requesting it again.  Close the probe, or use it as a
+    context manager, to release the connection.
+    """
+
+    def __init__(self, url, kind, content_type, response=None):
+        self.url = url
+        self.kind = kind
+        self.content_type = content_type
+        self.response = response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+            self.response = None
+
+
+def probe(url, timeout=60):
+    """
+    Finds out the kind of resource at a URL: a netCDF file, an OPeNDAP
+    endpoint, an XML document such as an SOS response, or UNKNOWN.
+
+    A single streamed GET of the URL tells apart netCDF files, XML documents
+    and OPeNDAP servers, which identify themselves in their response
+    headers.  Only if that response is inconclusive is the OPeNDAP Data
+    Attribute Structure requested as well.  The kind is remembered per
+    host and path for CLASSIFICATION_TTL seconds, so OPeNDAP URLs are not
+    requested again meanwhile, and netCDF and XML URLs are only requested to
+    fetch their content.  URLs of unknown kind, which include any that
+    failed to respond, are probed again each time.
+
+    :param str url: URL of the resource
+    :param int timeout: Timeout of each request in seconds
+    :rtype: Probe
+    """
+    key = _classification_key(url)
+    with _classifications_lock:
+        cached = _classifications.get(key)
+        if cached is not None and cached[2] <= time.monotonic():
+            del _classifications[key]
+            cached = None
+    if cached is not None and cached[0] == OPENDAP:
+        return Probe(url, cached[0], cached[1])
+
+    session = get_session()
+    response = session.get(url, allow_redirects=True, timeout=timeout, stream=True)
+    kind = _classify_response(response)
+    content_type = _content_type(response)
+    if kind is None:
+        kind = OPENDAP if is_opendap(url, timeout) else UNKNOWN
+    if kind not in (NETCDF, XML):
+        response.close()
+        response = None
+
+    if kind != UNKNOWN:
+        expires = time.monotonic() + CLASSIFICATION_TTL
+        with _classifications_lock:
+            _classifications[key] = (kind, content_type, expires)
+    return Probe(url, kind, content_type, response)
+
+
+def is_opendap(url, timeout=60):
+    """
+    Returns True if the server replies to a Data Attribute Structure request
+    for the URL as an OPeNDAP server
+
+    :param str url: URL for a remote OPeNDAP endpoint
+    :param int timeout: Timeout of the request in seconds
+    """
+    if url.endswith("#fillmismatch"):
+        das_url = url.replace("#fillmismatch", ".das")
+    else:
+        das_url = url + ".das"
+    with get_session().get(das_url, allow_redirects=True, timeout=timeout) as response:
+        return is_opendap_response(response)
@@ -0,0 +1,279 @@
+"""
+Snapshot of the installed checkers
+
+Loading the checkers registered as `compliance_checker.suites` entry points
+imports every checker module, the CF checker and pyproj among them, even
+when only one checker is then run.  A snapshot records the name, versions,
+module and class of each checker, so that later runs can register the
+checkers without importing any of them until one is looked up.
+
+A snapshot is only used while it matches a fingerprint of the distributions
+installed on the import path, and while the checker modules it was taken
+from are unchanged.  Otherwise the entry points are loaded again and a new
+snapshot is written.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+
+from operator import attrgetter
+
+from compliance_checker import __version__
+from compliance_checker.cache import create_cached_data_dir
+from compliance_checker.entrypoints import EntryPoint
+
+
+# bumped whenever the layout of a snapshot changes
+SNAPSHOT_FORMAT = 1
+
+# import path entries describing installed distributions
+_METADATA_SUFFIXES = (".dist-info", ".egg-info", ".egg-link", ".pth")
+
+_VERSION_PATTERN = re.compile(r"^\d+(\.\d+)*$")
+
+
+def version_key(version):
+    """
+    Returns a key ordering dotted version numbers numerically, so that e.g.
+    "1.10" sorts after "1.9"
+
+    :param str version: Version number, e.g. "1.6"
+    :rtype: tuple
+    :raises ValueError: If the version isn't made of dotted numbers
+    """
+    if not _VERSION_PATTERN.match(version):
+        raise ValueError("Invalid version number: {!r}".format(version))
+    return tuple(int(part) for part in version.split("."))
+
+
+def latest_version(versions):
+    """
+    Returns the latest of some version numbers, compared numerically if they
+    are all dotted numbers and as strings otherwise
+
+    :param list versions: Version numbers
+    :rtype: str
+    """
+    try:
+        return max(versions, key=version_key)
+    except ValueError:
+        return max(versions)
+
+
+def distributions_fingerprint(paths=None):
+    """
+    Returns a digest of the distributions installed on the import path,
+    which changes whenever one is installed, upgraded or removed
+
+    :param list paths: Import path, defaults to sys.path
+    :rtype: str
+    """
+    sha = hashlib.sha256()
+    sha.update("{}\0{}\0".format(sys.version, __version__).encode("utf-8"))
+    # only directories holding distributions count, so that the script
+    # directory or working directory leading the path doesn't
+    seen = set()
+    for path in sys.path if paths is None else paths:
+        path = os.path.abspath(path or ".")
+        if path in seen:
+            continue
+        seen.add(path)
+        try:
+            entries = sorted(os.scandir(path), key=attrgetter("name"))
+        except OSError:
+            # zipped standard library, or a directory which doesn't exist
+            continue
+        for entry in entries:
+            if not entry.name.endswith(_METADATA_SUFFIXES):
+                continue
+            stats = [entry.stat()]
+            if entry.name.endswith(".egg-info") and entry.is_dir():
+                # develop installs rewrite the files of their egg-info in place
+                try:
+                    stats.append(os.stat(os.path.join(entry.path, "entry_points.txt")))
+                except OSError:
+                    pass
+            sha.update(
+                "{}\0{}\0".format(
+                    entry.path, [(s.st_mtime_ns, s.st_size) for s in stats]
+                ).encode("utf-8", "surrogateescape")
+            )
+    return sha.hexdigest()
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+
+class LazyChecker(object):
+    """
+    A checker class recorded in a snapshot, which is only imported when it's
+    first resolved
+    """
+
+    __slots__ = ("module_name", "attr", "checker_version", "_checker")
+
+    def __init__(self, module_name, attr, checker_version=None):
+        """
+        :param str module_name: Module defining the checker class
+        :param str attr: Dotted path of the class within the module
+        :param str checker_version: The _cc_checker_version of the class
+        """
+        self.module_name = module_name
+        self.attr = attr
+        self.checker_version = checker_version
+        self._checker = None
+
+    def __repr__(self):
+        return "<LazyChecker {}:{}>".format(self.module_name, self.attr)
+
+    def resolve(self):
+        """
+        Imports the checker class, once
+        """
+        if self._checker is None:
+            self._checker = EntryPoint(None, self.module_name, self.attr).resolve()
+        return self._checker
+
+
+class CheckerDict(dict):
+    """
+    Checker name -> checker class, in which the LazyCheckers of a snapshot
+    are imported when they're first looked up.  Iterating over the names
+    and testing for a name imports nothing.
+    """
+
+    def __getitem__(self, name):
+        checker = dict.__getitem__(self, name)
+        if isinstance(checker, LazyChecker):
+            checker = checker.resolve()
+        return checker
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def checker_version(self, name):
+        """
+        Returns the _cc_checker_version of a checker, without importing it
+
+        :param str name: Checker name
+        :rtype: str or None
+        """
+        checker = dict.__getitem__(self, name)
+        if isinstance(checker, LazyChecker):
+            return checker.checker_version
+        return getattr(checker, "_cc_checker_version", None)
+
+
+class RegistrySnapshot(object):
+    """
+    Snapshot of the checkers loaded from entry points, stored as JSON
+    """
+
+    def __init__(self, path=None):
+        """
+        :param str path: Path of the snapshot file, by default in the
+                         compliance-checker data directory
+        """
+        if path is None:
+            path = os.path.join(create_cached_data_dir(), "checker_registry.json")
+        self.path = path
+
+    def load(self):
+        """
+        Returns the checkers of the snapshot, or None if there is no snapshot
+        or it's out of date
+
+        :rtype: dict
+        :returns: Checker name -> LazyChecker
+        """
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            if (
+                snapshot["format"] != SNAPSHOT_FORMAT
+                or snapshot["fingerprint"] != distributions_fingerprint()
+            ):
+                return None
+            for recorded in snapshot["files"]:
+                if _file_stat(recorded[0]) != recorded:
+                    return None
+            return {
+                c["name"]: LazyChecker(c["module"], c["attr"], c["checker_version"])
+                for c in snapshot["checkers"]
+            }
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            return None
+
+    def save(self, checkers):
+        """
+        Writes a snapshot of checkers loaded from entry points.  Nothing is
+        written if the module of any checker can't be found.
+
+        :param list checkers: (name, checker class, EntryPoint) tuples
+        :rtype: bool
+        :returns: Whether the snapshot was written
+        """
+        records = []
+        paths = set()
+        for name, checker, entry_point in checkers:
+            modules = [
+                sys.modules.get(entry_point.module_name),
+                sys.modules.get(getattr(checker, "__module__", None)),
+            ]
+            files = [getattr(module, "__file__", None) for module in modules]
+            if None in files:
+                return False
+            paths.update(files)
+            records.append(
+                {
+                    "name": name,
+                    "module": entry_point.module_name,
+                    "attr": entry_point.attr,
+                    "spec": getattr(checker, "_cc_spec", None),
+                    "spec_version": getattr(checker, "_cc_spec_version", None),
+                    "checker_version": getattr(checker, "_cc_checker_version", None),
+                    "dist": entry_point.dist_name,
+                    "dist_version": entry_point.dist_version,
+                }
+            )
+        try:
+            snapshot = {
+                "format": SNAPSHOT_FORMAT,
+                "fingerprint": distributions_fingerprint(),
+                "files": [_file_stat(path) for path in sorted(paths)],
+                "checkers": records,
+            }
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.path), suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(snapshot, f, indent=1)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            return False
+        return True
+
+    def clear(self):
+        """
+        Removes the snapshot, so that the entry points are loaded next time
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
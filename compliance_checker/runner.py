@@ -1,12 +1,16 @@
 import io
 import json
 import os
+import pickle
 import sys
 import traceback
 
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 
+from compliance_checker.cache import NetCDFCache, ResultCache
+from compliance_checker.profiling import Profile
 from compliance_checker.suite import CheckSuite
 
 
@@ -23,6 +27,128 @@ def stdout_redirector(stream):
         sys.stdout = old_stdout
 
 
+# score limit truncating the output to the strictness level of a criteria
+CRITERIA_LIMITS = {"strict": 1, "normal": 2, "lenient": 3}
+
+# per-process CheckSuite used by worker processes in parallel batch mode
+_worker_suite = None
+
+
+def _init_worker(
+    options,
+    result_cache,
+    metadata_only=False,
+    trace_memory=None,
+    netcdf_cache=None,
+    check_threads=1,
+    checker_names=(),
+):
+    """
+    Creates the CheckSuite of a worker process, the first time the process
+    runs a dataset.  Each worker process owns its own CheckSuite and opens
+    its own dataset handles, and keeps a warm pool of the checkers it runs
+    for the datasets it is handed.
+
+    @param options        Checker options, as passed to CheckSuite
+    @param result_cache   ResultCache shared with the parent, or None
+    @param metadata_only  Whether to check only dataset headers
+    @param trace_memory   None if the parent isn't profiling, otherwise
+                          whether the worker's profile traces memory
+    @param netcdf_cache   NetCDFCache shared with the parent, or None
+    @param check_threads  Number of threads the checks of each checker are
+                          run on
+    @param checker_names  Names of the checkers to create ahead of the first
+                          dataset
+    """
+    global _worker_suite
+    # checkers are inherited from the parent when forking, but need to be
+    # loaded again for spawned workers
+    if not CheckSuite.checkers:
+        CheckSuite.load_all_available_checkers()
+    _worker_suite = CheckSuite(
+        options=options,
+        result_cache=result_cache,
+        metadata_only=metadata_only,
+        profile=None if trace_memory is None else Profile(trace_memory),
+        netcdf_cache=netcdf_cache,
+        check_threads=check_threads,
+    )
+    _worker_suite.warm_up(checker_names)
+
+
+def _worker_init_args(cs, checker_names):
+    """
+    Returns the arguments to _init_worker creating a worker suite like `cs`
+
+    @param cs             Compliance Checker Suite of the parent process
+    @param checker_names  Names of the checkers the workers will run
+    """
+    trace_memory = None if cs.profile is None else cs.profile.trace_memory
+    return (
+        cs.options,
+        cs.result_cache,
+        cs.metadata_only,
+        trace_memory,
+        cs.netcdf_cache,
+        cs.check_threads,
+        checker_names,
+    )
+
+
+def _picklable_errors(errs):
+    """
+    Converts a check errors dict of check name -> (exception, traceback) into
+    a form which can be sent back from a worker process.  Tracebacks are
+    formatted to strings, skipping the first two frames as they are noise
+    from running the check itself, and exceptions which cannot be round
+    tripped through pickle are replaced by a RuntimeError with the same
+    message.
+
+    @param errs  Dict of check method name -> (exception, traceback)
+    @returns     Dict of check method name -> (exception, formatted traceback)
+    """
+    ret_val = {}
+    for check_name, (exc, tb) in errs.items():
+        try:
+            pickle.loads(pickle.dumps(exc))
+        except Exception:
+            exc = RuntimeError("{}: {}".format(type(exc).__name__, exc))
+        skipped_tb = tb.tb_next.tb_next if tb.tb_next is not None else tb
+        ret_val[check_name] = (exc, "".join(traceback.format_tb(skipped_tb)))
+    return ret_val
+
+
+def _run_worker(init_args, loc, checker_names, skip_checks):
+    """
+    Runs the checks against a single dataset inside a worker process
+
+    @param init_args      Arguments to _init_worker, used by the first task
+                          run in the process.  ProcessPoolExecutor only
+                          takes an initializer from Python 3.7
+    @param loc            Dataset location (url or file)
+    @param checker_names  List of string names to run
+    @param skip_checks    Names of checks to skip
+    @returns              Picklable score groups for the dataset, and the
+                          profile records of the run if profiling
+    """
+    if _worker_suite is None:
+        _init_worker(*init_args)
+    score_groups = ComplianceChecker._run_dataset(
+        _worker_suite, loc, checker_names, skip_checks
+    )
+    records = []
+    if _worker_suite.profile is not None:
+        records = [tuple(r) for r in _worker_suite.profile.records]
+        del _worker_suite.profile.records[:]
+    return (
+        OrderedDict(
+            (checker, (groups, _picklable_errors(errors)))
+            for checker, (groups, errors) in score_groups.items()
+        ),
+        records,
+    )
+
+
 class ComplianceChecker(object):
     """
     Compliance Checker runner class.
@@ -43,6 +169,11 @@ class ComplianceChecker(object):
         output_filename="-",
         output_format=["text"],
         options=None,
+        jobs=None,
+        use_cache=False,
+        metadata_only=False,
+        profile=None,
+        check_threads=1,
     ):
         """
         Static check runner.
@@ -54,16 +185,36 @@ class ComplianceChecker(object):
         @param  output_filename Path to the file for output
         @param  skip_checks     Names of checks to skip
         @param  output_format   Format of the output(s)
+        @param  options         Checker options, keyed by checker type
+        @param  jobs            Number of worker processes to check multiple
+                                datasets with.  None or 1 runs serially.
+        @param  use_cache       Whether to reuse and store results in the
+                                on-disk result cache, and netCDF files
+                                generated from CDL in the on-disk netCDF
+                                cache
+        @param  metadata_only   Check only the header of netCDF datasets,
+                                skipping checks which read variable data
+        @param  profile         Optional Profile to record the time and memory
+                                used by each check in
+        @param  check_threads   Number of threads the checks of each checker
+                                are run on.  1 runs checks serially.
 
         @returns                If the tests failed (based on the criteria)
         """
         all_groups = []
-        cs = CheckSuite(options=options or {})
+        cs = CheckSuite(
+            options=options or {},
+            result_cache=ResultCache() if use_cache else None,
+            metadata_only=metadata_only,
+            profile=profile,
+            netcdf_cache=NetCDFCache() if use_cache else None,
+            check_threads=check_threads,
+        )
         # using OrderedDict is important here to preserve the order
         # of multiple datasets which may be passed in
         score_dict = OrderedDict()
         if not isinstance(ds_loc, str):
-            locs = ds_loc
+            locs = list(ds_loc)
         # if single dataset, put in list
         else:
             locs = [ds_loc]
@@ -72,15 +223,11 @@ class ComplianceChecker(object):
         if isinstance(output_format, str):
             output_format = [output_format]
 
-        for loc in locs:  # loop through each dataset and run specified checks
-            ds = cs.load_dataset(loc)
-
-            score_groups = cs.run(ds, skip_checks, *checker_names)
+        for loc, score_groups in zip(
+            locs, cls._iter_score_groups(cs, locs, checker_names, skip_checks, jobs)
+        ):
             for group in score_groups.values():
                 all_groups.append(group[0])
-            # TODO: consider wrapping in a proper context manager instead
-            if hasattr(ds, "close"):
-                ds.close()
 
             if not score_groups:
                 raise ValueError(
@@ -91,12 +238,7 @@ class ComplianceChecker(object):
 
         # define a score limit to truncate the output to the strictness level
         # specified by the user
-        if criteria == "normal":
-            limit = 2
-        elif criteria == "strict":
-            limit = 1
-        elif criteria == "lenient":
-            limit = 3
+        limit = CRITERIA_LIMITS[criteria]
 
         for out_fmt in output_format:
             if out_fmt == "text":
@@ -140,6 +282,63 @@ class ComplianceChecker(object):
             errors_occurred,
         )
 
+    @classmethod
+    def _run_dataset(cls, cs, loc, checker_names, skip_checks):
+        """
+        Loads a single dataset, runs the specified checks against it and
+        closes it again.
+
+        @param cs             Compliance Checker Suite
+        @param loc            Dataset location (url or file)
+        @param checker_names  List of string names to run
+        @param skip_checks    Names of checks to skip
+        @returns              Dict of checker name -> (groups, errors)
+        """
+        ds = cs.load_dataset(loc)
+        try:
+            score_groups = cs.run(ds, skip_checks, *checker_names)
+        finally:
+            # TODO: consider wrapping in a proper context manager instead
+            if hasattr(ds, "close"):
+                ds.close()
+        return score_groups
+
+    @classmethod
+    def _iter_score_groups(cls, cs, locs, checker_names, skip_checks, jobs=None):
+        """
+        Yields the score groups for each dataset in the same order as `locs`.
+        If more than one job is requested and there are multiple datasets,
+        each dataset is checked in a separate worker process and results are
+        streamed back as they become available.
+
+        @param cs             Compliance Checker Suite
+        @param locs           List of dataset locations
+        @param checker_names  List of string names to run
+        @param skip_checks    Names of checks to skip
+        @param jobs           Number of worker processes
+        """
+        # creating the checkers in the parent first means forked workers
+        # inherit whatever the checkers load once per process
+        cs.warm_up(checker_names)
+        if jobs is None or jobs <= 1 or len(locs) <= 1:
+            for loc in locs:
+                yield cls._run_dataset(cs, loc, checker_names, skip_checks)
+            return
+
+        init_args = _worker_init_args(cs, checker_names)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(locs))) as executor:
+            n_locs = len(locs)
+            for score_groups, records in executor.map(
+                _run_worker,
+                [init_args] * n_locs,
+                locs,
+                [checker_names] * n_locs,
+                [skip_checks] * n_locs,
+            ):
+                if cs.profile is not None:
+                    cs.profile.extend(records)
+                yield score_groups
+
     @classmethod
     def stdout_output(cls, cs, score_dict, verbose, limit):
         """
@@ -204,6 +403,31 @@ class ComplianceChecker(object):
         @param output_type     Either 'json' or 'json_new'. json_new is the new
                                json output format that supports multiple datasets
         """
+        results = cls.json_results(cs, score_dict, limit, output_type)
+        json_results = json.dumps(results, indent=2, ensure_ascii=False)
+
+        if output_filename == "-":
+            print(json_results)
+        else:
+            with io.open(output_filename, "w", encoding="utf8") as f:
+                f.write(json_results)
+
+        # the groups of the last checker run against the last dataset
+        last_score_groups = list(score_dict.values())[-1]
+        return list(last_score_groups.values())[-1][0]
+
+    @classmethod
+    def json_results(cls, cs, score_dict, limit, output_type="json"):
+        """
+        Builds the JSON serializable results written by json_output
+
+        @param cs              Compliance Checker Suite
+        @param score_dict      Dict with dataset name as key, score groups as
+                               value
+        @param limit           The degree of strictness, 1 being the strictest,
+                               and going up from there.
+        @param output_type     Either 'json' or 'json_new'
+        """
         results = {}
         # json output keys out at the top level by
         if len(score_dict) > 1 and output_type != "json_new":
@@ -222,15 +446,7 @@ class ComplianceChecker(object):
                     groups, errors = rpair
                     results[ds] = {}
                     results[ds][checker] = cs.dict_output(checker, groups, ds, limit)
-        json_results = json.dumps(results, indent=2, ensure_ascii=False)
-
-        if output_filename == "-":
-            print(json_results)
-        else:
-            with io.open(output_filename, "w", encoding="utf8") as f:
-                f.write(json_results)
-
-        return groups
+        return results
 
     @classmethod
     def check_errors(cls, score_groups, verbose):
@@ -257,9 +473,14 @@ class ComplianceChecker(object):
                     )
 
                     if verbose > 0:
-                        traceback.print_tb(
-                            epair[1].tb_next.tb_next
-                        )  # skip first two as they are noise from the running itself @TODO search for check_name
+                        # tracebacks from worker processes are already
+                        # formatted
+                        if isinstance(epair[1], str):
+                            print(epair[1], end="", file=sys.stderr)
+                        else:
+                            traceback.print_tb(
+                                epair[1].tb_next.tb_next
+                            )  # skip first two as they are noise from the running itself @TODO search for check_name
                         print(file=sys.stderr)
 
         return errors_occurred
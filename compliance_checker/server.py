@@ -0,0 +1,462 @@
+"""
+Long running compliance checking service
+
+Every run of the command line tool pays for starting Python, importing the
+checkers and their dependencies and parsing the CF standard name table
+before it checks anything.  `CheckService` pays for them once, then checks
+datasets on request with checkers kept warm in worker processes, or in
+this process.  `make_server` serves it over HTTP on a TCP port or a Unix
+domain socket:
+
+    POST /check   {"location": "path or URL of a dataset",
+                   "checkers": ["cf", "acdd"], "criteria": "normal",
+                   "skip_checks": [], "format": "json"}
+    GET /health
+
+Responses are JSON.  Each request is given `timeout` seconds, including the
+time spent waiting for one of the `max_concurrent` request slots.  Worker
+processes which die, e.g. when the netCDF library crashes on a malformed
+file, are replaced.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from compliance_checker import __version__, runner
+from compliance_checker.cache import NetCDFCache, ResultCache
+from compliance_checker.runner import CRITERIA_LIMITS, ComplianceChecker
+from compliance_checker.suite import CheckSuite
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("json", "json_new")
+
+
+class RequestError(ValueError):
+    """
+    Raised for check requests which are malformed or name unknown checkers
+    """
+
+
+class ServiceBusy(RuntimeError):
+    """
+    Raised when no request slot is free within the timeout of a request
+    """
+
+
+def _warm_worker(init_args):
+    """
+    Creates the CheckSuite of a worker process ahead of its first dataset
+    """
+    if runner._worker_suite is None:
+        runner._init_worker(*init_args)
+
+
+class CheckService(object):
+    """
+    Checks datasets on request, keeping the checkers warm between requests.
+    Use as a context manager, or call `start` and `close`.
+    """
+
+    def __init__(
+        self,
+        checker_names=("acdd",),
+        criteria="normal",
+        options=None,
+        workers=1,
+        max_concurrent=None,
+        timeout=60,
+        use_cache=False,
+        metadata_only=False,
+        check_threads=1,
+    ):
+        """
+        :param list checker_names: Checkers run for requests which name none
+        :param str criteria: Criteria for requests which give none
+        :param dict options: Checker options, keyed by checker type
+        :param int workers: Number of worker processes checking datasets, or
+                            0 to check them in this process, one at a time
+        :param int max_concurrent: Maximum number of requests being checked
+                                   at once, by default the number of workers
+        :param float timeout: Seconds each request may take, or None for no
+                              limit.  Checks still running when a request
+                              times out carry on, holding their slot.
+        :param bool use_cache: Whether to reuse and store results in the
+                               on-disk caches
+        :param bool metadata_only: Check only the header of netCDF datasets
+        :param int check_threads: Number of threads the checks of each
+                                  checker are run on
+        """
+        self.suite = CheckSuite(
+            options=options or {},
+            result_cache=ResultCache() if use_cache else None,
+            metadata_only=metadata_only,
+            netcdf_cache=NetCDFCache() if use_cache else None,
+            check_threads=check_threads,
+        )
+        self.checker_names = list(checker_names)
+        self.criteria = criteria
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent or max(workers, 1))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """
+        Loads the checkers and starts the worker processes, which create the
+        default checkers before any request is made
+        """
+        if not CheckSuite.checkers:
+            CheckSuite.load_all_available_checkers()
+        # forked workers inherit whatever the checkers load once per process
+        self.suite.warm_up(self.checker_names)
+        if self.workers > 0:
+            self._executor = self._start_workers()
+        else:
+            # every netCDF library call happens on this thread
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _start_workers(self):
+        """
+        Returns a new pool of worker processes, once they have created the
+        default checkers
+        """
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        init_args = runner._worker_init_args(self.suite, self.checker_names)
+        # the processes are started here rather than on demand by the
+        # threads submitting requests
+        wait([executor.submit(_warm_worker, init_args) for _ in range(self.workers)])
+        return executor
+
+    def _replace_workers(self, broken):
+        """
+        Replaces a pool of worker processes broken by one of them dying,
+        unless another request has already replaced it
+
+        :param ProcessPoolExecutor broken: The broken pool
+        """
+        with self._executor_lock:
+            if self._executor is not broken:
+                return
+            logger.warning("A worker process died, restarting the workers")
+            broken.shutdown(wait=False)
+            self._executor = self._start_workers()
+
+    def close(self):
+        """
+        Waits for outstanding checks to finish and stops the workers
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _parse(self, request):
+        """
+        Validates a check request, filling in the defaults
+
+        :returns: location, checker names, skip checks, score limit and
+                  output format of the request
+        """
+        if not isinstance(request, dict):
+            raise RequestError("A check request must be a JSON object")
+        location = request.get("location")
+        if not location or not isinstance(location, str):
+            raise RequestError('"location" must be the path or URL of a dataset')
+
+        checker_names = request.get("checkers") or self.checker_names
+        if isinstance(checker_names, str):
+            checker_names = [checker_names]
+        unknown = [name for name in checker_names if name not in self.suite.checkers]
+        if unknown:
+            raise RequestError("Unknown checkers: {}".format(", ".join(unknown)))
+
+        skip_checks = request.get("skip_checks") or []
+        if isinstance(skip_checks, str):
+            skip_checks = [skip_checks]
+
+        criteria = request.get("criteria") or self.criteria
+        if criteria not in CRITERIA_LIMITS:
+            raise RequestError(
+                '"criteria" must be one of {}'.format(", ".join(CRITERIA_LIMITS))
+            )
+        output_type = request.get("format") or "json"
+        if output_type not in FORMATS:
+            raise RequestError('"format" must be one of {}'.format(", ".join(FORMATS)))
+
+        return (
+            location,
+            list(checker_names),
+            list(skip_checks),
+            CRITERIA_LIMITS[criteria],
+            output_type,
+        )
+
+    def _run_local(self, location, checker_names, skip_checks):
+        score_groups = ComplianceChecker._run_dataset(
+            self.suite, location, checker_names, skip_checks
+        )
+        return score_groups, []
+
+    def _submit(self, executor, location, checker_names, skip_checks):
+        if self.workers > 0:
+            init_args = runner._worker_init_args(self.suite, self.checker_names)
+            return executor.submit(
+                runner._run_worker, init_args, location, checker_names, skip_checks
+            )
+        return executor.submit(self._run_local, location, checker_names, skip_checks)
+
+    def _remaining(self, start):
+        if self.timeout is None:
+            return None
+        return max(self.timeout - (time.monotonic() - start), 0)
+
+    def check(self, request):
+        """
+        Checks the dataset a request is for
+
+        :param dict request: Check request, with the path or URL of the
+                             dataset as "location", and optionally lists of
+                             "checkers" and "skip_checks", the "criteria" and
+                             the output "format", "json" or "json_new"
+        :rtype: dict
+        :raises RequestError: If the request is invalid
+        :raises ServiceBusy: If no request slot is free within the timeout
+        :raises concurrent.futures.TimeoutError: If the dataset isn't checked
+                                                 within the timeout
+        :raises concurrent.futures.process.BrokenProcessPool: If the worker
+            process checking the dataset died.  The workers are replaced.
+        """
+        start = time.monotonic()
+        location, checker_names, skip_checks, limit, output_type = self._parse(request)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ServiceBusy("No request slot became free within the timeout")
+        executor = self._executor
+        try:
+            try:
+                future = self._submit(executor, location, checker_names, skip_checks)
+            except BrokenProcessPool:
+                # a worker died during an earlier request
+                self._replace_workers(executor)
+                executor = self._executor
+                future = self._submit(executor, location, checker_names, skip_checks)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot is held until the check finishes, even if it times out
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            score_groups = future.result(self._remaining(start))[0]
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            self._replace_workers(executor)
+            raise
+
+        if not score_groups:
+            raise RequestError(
+                "None of the checkers can check the dataset at {}".format(location)
+            )
+        return {
+            "location": location,
+            "passed": all(
+                self.suite.passtree(groups, limit)
+                for groups, _ in score_groups.values()
+            ),
+            "errors": {
+                checker: {
+                    check_name: "{}: {}".format(type(exc).__name__, exc)
+                    for check_name, (exc, _) in errors.items()
+                }
+                for checker, (_, errors) in score_groups.items()
+            },
+            "results": ComplianceChecker.json_results(
+                self.suite, {location: score_groups}, limit, output_type
+            ),
+            "elapsed": time.monotonic() - start,
+        }
+
+
+class CheckRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the CheckService of its server
+    """
+
+    server_version = "compliance-checker/{}".format(__version__)
+    # keep connections open between requests
+    protocol_version = "HTTP/1.1"
+    # largest request body accepted, in bytes
+    max_body = 1 << 20
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send(404, {"error": "Not found: {}".format(self.path)})
+        self._send(
+            200,
+            {
+                "status": "ok",
+                "version": __version__,
+                "checkers": sorted(self.server.service.suite.checkers),
+            },
+        )
+
+    def do_POST(self):
+        if self.path != "/check":
+            # the body isn't read, so the connection can't be reused
+            self.close_connection = True
+            return self._send(404, {"error": "Not found: {}".format(self.path)})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= self.max_body:
+            self.close_connection = True
+            if length < 0:
+                error = "Invalid Content-Length"
+            else:
+                error = "The request is too large"
+            return self._send(400, {"error": error})
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+
+        try:
+            result = self.server.service.check(request)
+        except RequestError as e:
+            self._send(400, {"error": str(e)})
+        except ServiceBusy as e:
+            self._send(503, {"error": str(e)})
+        except FutureTimeoutError:
+            self._send(504, {"error": "The dataset wasn't checked in time"})
+        except BrokenProcessPool:
+            self._send(
+                503,
+                {
+                    "error": "The worker process checking the dataset died, "
+                    "the workers have been restarted"
+                },
+            )
+        except Exception as e:
+            # the dataset couldn't be loaded, or a worker process failed
+            self._send(422, {"error": "{}: {}".format(type(e).__name__, e)})
+        else:
+            self._send(200, result)
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # clients of Unix domain sockets have no address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class _ThreadingUnixHTTPServer(
+        socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+    ):
+        daemon_threads = True
+
+
+def parse_address(address):
+    """
+    Parses the address to serve on: "host:port", ":port" or "port" for a TCP
+    port, which is bound to localhost if no host is given, or otherwise the
+    path of a Unix domain socket
+
+    :param str address: Address to serve on
+    :returns: (host, port) tuple or path
+    :raises ValueError: If the address is a path, but the platform has no
+                        Unix domain sockets
+    """
+    host, _, port = address.rpartition(":")
+    if port.isdigit() and "/" not in address:
+        return host or "localhost", int(port)
+    _check_unix_sockets(address)
+    return address
+
+
+def _check_unix_sockets(path):
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError(
+            "Can't serve on {}: Unix domain sockets aren't supported on this "
+            "platform, serve on a TCP port instead".format(path)
+        )
+
+
+def make_server(service, address):
+    """
+    Returns an HTTP server for a CheckService, which is run with
+    `serve_forever()`.  Stale Unix domain sockets are replaced.
+
+    :param CheckService service: Started check service
+    :param address: (host, port) tuple or path of a Unix domain socket
+    :raises ValueError: If the address is a path, but the platform has no
+                        Unix domain sockets
+    """
+    if isinstance(address, str):
+        _check_unix_sockets(address)
+        if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            os.remove(address)
+        server = _ThreadingUnixHTTPServer(address, CheckRequestHandler)
+    else:
+        server = _ThreadingHTTPServer(address, CheckRequestHandler)
+    server.service = service
+    return server
+
+
+def serve(service, address):
+    """
+    Starts a CheckService and serves it until interrupted
+
+    :param CheckService service: Check service, not yet started
+    :param address: (host, port) tuple or path of a Unix domain socket
+    """
+    with service:
+        server = make_server(service, address)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if isinstance(address, str):
+                os.remove(address)
@@ -0,0 +1,136 @@
+"""
+Single pass reductions over variable data
+
+Data dependent checks compare attributes such as actual_range or the ACDD
+geospatial extents against the minimum and maximum of a variable's data.
+Rather than reading a whole variable into memory, once for each statistic,
+`variable_stats` walks the variable in slabs aligned to its chunking and
+accumulates the minimum, maximum and the number of NaN and masked values in
+a single pass with bounded memory.
+"""
+
+import itertools
+
+from collections import namedtuple
+
+import numpy as np
+
+
+# upper bound on the number of elements read from a variable at once
+DEFAULT_MAX_ELEMENTS = 2 ** 22
+
+# size: total number of elements
+# min, max: extremes of the values which are neither masked nor NaN, or None
+#           if there are no such values
+# nan_count: number of unmasked NaN values
+# fill_count: number of masked values, i.e. fill, missing or out of range
+VariableStats = namedtuple(
+    "VariableStats", ["size", "min", "max", "nan_count", "fill_count"]
+)
+
+
+def _chunk_shape(variable):
+    """
+    Returns the chunk shape of a netCDF variable, or None for contiguous
+    and netCDF-3 variables
+    """
+    try:
+        chunking = variable.chunking()
+    except AttributeError:
+        return None
+    if chunking is None or chunking == "contiguous":
+        return None
+    return chunking
+
+
+def iter_slabs(shape, chunks=None, max_elements=DEFAULT_MAX_ELEMENTS):
+    """
+    Yields tuples of slices which together cover an array of the given shape.
+    Each slab is a whole number of chunks along every dimension, grown from
+    the fastest varying dimension outwards while it holds no more than
+    `max_elements` elements, so that no chunk is read more than once.
+
+    :param tuple shape: Shape of the array
+    :param chunks: Chunk shape of the array, or None if it is stored
+                   contiguously
+    :param int max_elements: Maximum number of elements in a slab, unless a
+                             single chunk is larger
+    """
+    if not shape:
+        yield ()
+        return
+    if 0 in shape:
+        return
+    if chunks is None:
+        chunks = [1] * len(shape)
+    slab = [min(max(c, 1), s) for c, s in zip(chunks, shape)]
+    for axis in reversed(range(len(shape))):
+        others = int(np.prod(slab)) // slab[axis]
+        chunk_count = max(1, max_elements // (others * slab[axis]))
+        slab[axis] = min(shape[axis], slab[axis] * chunk_count)
+        if slab[axis] < shape[axis]:
+            break
+
+    starts = [range(0, size, step) for size, step in zip(shape, slab)]
+    for start in itertools.product(*starts):
+        yield tuple(
+            slice(first, min(first + step, size))
+            for first, step, size in zip(start, slab, shape)
+        )
+
+
+def variable_stats(variable, masked=True, max_elements=DEFAULT_MAX_ELEMENTS):
+    """
+    Computes the minimum and maximum of a variable's data and counts its NaN
+    and masked values in a single chunked pass.
+
+    :param netCDF4.Variable variable: A numeric netCDF variable
+    :param bool masked: If False, fill and missing values are not masked
+                        while reading and are included in the minimum and
+                        maximum
+    :param int max_elements: Maximum number of elements read at once
+    :raises TypeError: If the variable does not hold numeric data
+    :rtype: VariableStats
+    """
+    if variable.dtype is str or variable.dtype.kind not in "biuf":
+        raise TypeError(
+            "Cannot compute statistics of non-numeric variable {}".format(variable.name)
+        )
+
+    auto_mask = getattr(variable, "mask", masked)
+    if auto_mask != masked:
+        variable.set_auto_mask(masked)
+
+    size = 0
+    nan_count = 0
+    fill_count = 0
+    vmin = vmax = None
+    try:
+        for index in iter_slabs(variable.shape, _chunk_shape(variable), max_elements):
+            data = variable[index]
+            size += np.size(data)
+            # only copy the values out when some of them need to be dropped
+            masked_count = int(np.count_nonzero(np.ma.getmask(data)))
+            if masked_count:
+                fill_count += masked_count
+                values = data.compressed()
+            else:
+                values = np.ma.getdata(data)
+            if values.dtype.kind == "f":
+                nans = np.isnan(values)
+                nan_slab = int(np.count_nonzero(nans))
+                if nan_slab:
+                    nan_count += nan_slab
+                    values = values[~nans]
+            if values.size == 0:
+                continue
+            slab_min, slab_max = values.min(), values.max()
+            if vmin is None or slab_min < vmin:
+                vmin = slab_min
+            if vmax is None or slab_max > vmax:
+                vmax = slab_max
+    finally:
+        if auto_mask != masked:
+            variable.set_auto_mask(auto_mask)
+
+    return VariableStats(size, vmin, vmax, nan_count, fill_count)
@@ -3,33 +3,42 @@ Compliance Checker suite runner
 """
 
 import codecs
+import filecmp
+import functools
 import inspect
+import io
 import itertools
 import os
 import re
-import subprocess
+import shutil
 import sys
 import textwrap
 import warnings
 
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from distutils.version import StrictVersion
 from operator import itemgetter
+from tempfile import NamedTemporaryFile
 from urllib.parse import urlparse
 
-import requests
-
-from lxml import etree as ET
 from netCDF4 import Dataset
-from owslib.sos import SensorObservationService
-from owslib.swe.sensor.sml import SensorML
-from pkg_resources import working_set
 
-from compliance_checker import MemoizedDataset, __version__, tempnc
-from compliance_checker.base import BaseCheck, GenericFile, Result, fix_return_value
-from compliance_checker.cf.cf import CFBaseCheck
-from compliance_checker.protocols import cdl, erddap, netcdf, opendap
+from compliance_checker import MemoizedDataset, __version__
+from compliance_checker.base import (
+    BaseCheck,
+    GenericFile,
+    Result,
+    fix_return_value,
+    is_data_dependent,
+)
+from compliance_checker.cache import dataset_digest
+from compliance_checker.entrypoints import iter_entry_points
+from compliance_checker.locking import locked
+from compliance_checker.pool import CheckerPool
+from compliance_checker.protocols import cdl, erddap, netcdf, opendap, remote
+from compliance_checker.registry import CheckerDict, RegistrySnapshot, latest_version
 
 
 # Ensure output is encoded as Unicode when checker output is redirected or piped
@@ -58,15 +67,112 @@ def extract_docstring_summary(docstring):
     )
 
 
+@contextmanager
+def _unmeasured():
+    yield
+
+
+# name: name of the check method
+# defining_class: class in the checker's MRO which defines the method
+# data_dependent: whether the check reads variable data
+CheckInfo = namedtuple("CheckInfo", ["name", "defining_class", "data_dependent"])
+
+# checks: CheckInfo of each check method, sorted by name
+# supported_ds: dataset types the checker can check
+CheckerInfo = namedtuple("CheckerInfo", ["checks", "supported_ds"])
+
+
+def _name_path(name):
+    """
+    Returns the group names of a result name as a tuple
+    """
+    if isinstance(name, (tuple, list)):
+        return tuple(name)
+    return (name,) if name else ()
+
+
+class _ScoreGroup(object):
+    """
+    Node of the trie results are grouped into by CheckSuite._group_raw
+    """
+
+    __slots__ = ("name", "children", "results", "result")
+
+    def __init__(self, name):
+        self.name = name
+        # (name, weight) -> _ScoreGroup, in sorted order
+        self.children = {}
+        self.results = []
+        self.result = None
+
+
+def _inspect_checker(checker_class):
+    """
+    Returns the CheckerInfo of a checker class
+    """
+    checks = []
+    for name, member in inspect.getmembers(checker_class, inspect.isroutine):
+        if not name.startswith("check_"):
+            continue
+        defining_class = next(
+            (c for c in checker_class.__mro__ if name in c.__dict__), checker_class
+        )
+        checks.append(CheckInfo(name, defining_class, is_data_dependent(member)))
+    return CheckerInfo(
+        tuple(checks), frozenset(getattr(checker_class, "supported_ds", ()))
+    )
+
+
 class CheckSuite(object):
     checkers = (
-        {}
+        CheckerDict()
     )  # Base dict of checker names to BaseCheck derived types, override this in your CheckSuite implementation
+    # checker class -> CheckerInfo, shared by every suite
+    checker_registry = {}
     templates_root = "compliance_checker"  # modify to load alternative Jinja2 templates
-
-    def __init__(self, options=None):
+    # remote netCDF files up to this many bytes are opened in memory rather
+    # than from a temporary file, set to 0 to always use a temporary file
+    remote_in_memory_limit = 16 * 1024 * 1024
+    # whether the netCDF and HDF5 libraries are built thread safe, otherwise
+    # checks run on several threads take turns calling into them
+    netcdf_thread_safe = False
+
+    def __init__(
+        self,
+        options=None,
+        result_cache=None,
+        metadata_only=False,
+        profile=None,
+        netcdf_cache=None,
+        check_threads=1,
+        checker_pool=None,
+    ):
+        """
+        :param dict options: Checker options, keyed by checker type
+        :param ResultCache result_cache: Optional cache of previously
+                                         computed results
+        :param bool metadata_only: Check only the header of netCDF datasets,
+                                   skipping checks which read variable data
+        :param Profile profile: Optional profile recording the time and
+                                memory used by each checker setup, check
+                                and scoring
+        :param NetCDFCache netcdf_cache: Optional cache of netCDF files
+                                         generated from CDL files
+        :param int check_threads: Number of threads the checks of each
+                                  checker are run on.  Checks are run one at
+                                  a time if 1, or if profiling.
+        :param CheckerPool checker_pool: Pool of checker instances reused
+                                         across datasets, by default one
+                                         per suite
+        """
         self.col_width = 40
         self.options = options or {}
+        self.result_cache = result_cache
+        self.metadata_only = metadata_only
+        self.profile = profile
+        self.netcdf_cache = netcdf_cache
+        self.check_threads = check_threads
+        self.checker_pool = checker_pool if checker_pool is not None else CheckerPool()
 
     @classmethod
     def _get_generator_plugins(cls):
@@ -76,7 +182,7 @@ class CheckSuite(object):
         """
 
         if not hasattr(cls, "suite_generators"):
-            gens = working_set.iter_entry_points("compliance_checker.generators")
+            gens = iter_entry_points("compliance_checker.generators")
             cls.suite_generators = [x.resolve() for x in gens]
 
         return cls.suite_generators
@@ -91,7 +197,11 @@ class CheckSuite(object):
         :type verbose: int
         """
         for checker in sorted(self.checkers.keys()):
-            version = getattr(self.checkers[checker], "_cc_checker_version", "???")
+            if isinstance(self.checkers, CheckerDict):
+                # listing the checkers of a snapshot doesn't import them
+                version = self.checkers.checker_version(checker) or "???"
+            else:
+                version = getattr(self.checkers[checker], "_cc_checker_version", "???")
             if verbose > 0:
                 print(" - {} (v{})".format(checker, version))
             elif ":" in checker and not checker.endswith(
@@ -132,22 +242,53 @@ class CheckSuite(object):
         for gen in cls._get_generator_plugins():
             checkers = gen.get_checkers(args)
             cls.checkers.update(checkers)
+            for checker_class in checkers.values():
+                if inspect.isclass(checker_class):
+                    cls.get_checker_info(checker_class)
 
     @classmethod
-    def load_all_available_checkers(cls):
+    def load_all_available_checkers(cls, use_snapshot=True):
         """
         Helper method to retrieve all sub checker classes derived from various
         base classes.
+
+        :param bool use_snapshot: Whether to register the checkers from a
+                                  snapshot of the installed checkers, which
+                                  are then only imported when looked up.
+                                  The snapshot is taken when there is none,
+                                  or when it's out of date.
         """
-        cls._load_checkers(working_set.iter_entry_points("compliance_checker.suites"))
+        entry_points = iter_entry_points("compliance_checker.suites")
+        if not use_snapshot or not isinstance(cls.checkers, CheckerDict):
+            cls._load_checkers(entry_points)
+            return
+        try:
+            snapshot = RegistrySnapshot()
+        except OSError:
+            # the data directory can't be created
+            cls._load_checkers(entry_points)
+            return
+
+        checkers = snapshot.load()
+        if checkers is not None:
+            cls.checkers.update(checkers)
+            cls._set_latest_versions()
+            return
+        loaded = cls._load_checkers(entry_points)
+        snapshot.save(
+            [(name, cls.checkers[name], entry_point) for name, entry_point in loaded]
+        )
 
     @classmethod
     def _load_checkers(cls, checkers):
         """
         Loads up checkers in an iterable into the class checkers dict
         :param checkers: An iterable containing the checker objects
+        :rtype: list
+        :returns: (name, entry point) of each checker loaded
         """
 
+        loaded = []
         for c in checkers:
             try:
                 check_obj = c.resolve()
@@ -158,6 +299,7 @@ class CheckSuite(object):
                         (check_obj._cc_spec, check_obj._cc_spec_version)
                     )
                     cls.checkers[check_version_str] = check_obj
+                    loaded.append((check_version_str, c))
                 # TODO: remove this once all checkers move over to the new
                 #       _cc_spec, _cc_spec_version
                 else:
@@ -176,38 +318,72 @@ class CheckSuite(object):
                     # append "unknown" to version string since no versioning
                     # info was provided
                     cls.checkers["{}:unknown".format(checker_name)] = check_obj
+                    loaded.append(("{}:unknown".format(checker_name), c))
 
             except Exception as e:
                 print("Could not load", c, ":", e, file=sys.stderr)
-        # find the latest version of versioned checkers and set that as the
-        # default checker for compliance checker if no version is specified
-        ver_checkers = sorted([c.split(":", 1) for c in cls.checkers if ":" in c])
+        cls._set_latest_versions()
+        return loaded
+
+    @classmethod
+    def _set_latest_versions(cls):
+        """
+        Finds the latest version of versioned checkers and sets it as the
+        default checker for compliance checker if no version is specified
+        """
+        ver_checkers = sorted(
+            [
+                c.split(":", 1)
+                for c in cls.checkers
+                if ":" in c and not c.endswith(":latest")
+            ]
+        )
         for spec, versions in itertools.groupby(ver_checkers, itemgetter(0)):
-            version_nums = [v[-1] for v in versions]
-            try:
-                latest_version = str(max(StrictVersion(v) for v in version_nums))
-            # if the version can't be parsed as a StrictVersion, parse
+            # dotted numbers are compared numerically, any other versions
             # according to character collation
-            except ValueError:
-                latest_version = max(version_nums)
-            cls.checkers[spec] = cls.checkers[spec + ":latest"] = cls.checkers[
-                ":".join((spec, latest_version))
-            ]
+            latest = latest_version([v[-1] for v in versions])
+            # the checker itself rather than a lookup, which would import it
+            checker = dict.__getitem__(cls.checkers, ":".join((spec, latest)))
+            cls.checkers[spec] = cls.checkers[spec + ":latest"] = checker
+        for checker_class in dict.values(cls.checkers):
+            if inspect.isclass(checker_class):
+                cls.get_checker_info(checker_class)
+
+    @classmethod
+    def get_checker_info(cls, checker_class):
+        """
+        Returns the check methods and supported dataset types of a checker
+        class.  They're found once per class, when checkers are loaded or
+        on first use, and reused for every dataset checked.
+
+        :param type checker_class: A BaseCheck derived class
+        :rtype: CheckerInfo
+        """
+        info = cls.checker_registry.get(checker_class)
+        if info is None:
+            info = cls.checker_registry[checker_class] = _inspect_checker(checker_class)
+        return info
 
     def _get_checks(self, checkclass, skip_checks):
         """
         Helper method to retrieve check methods from a Checker class.  Excludes
-        any checks in `skip_checks`.
+        any checks in `skip_checks`, and in metadata only mode any checks which
+        read variable data.
 
         The name of the methods in the Checker class should start with "check_"
         for this method to find them.
         """
-        meths = inspect.getmembers(checkclass, inspect.isroutine)
+        checker_class = checkclass if inspect.isclass(checkclass) else type(checkclass)
         # return all check methods not among the skipped checks
         returned_checks = []
-        for fn_name, fn_obj in meths:
-            if fn_name.startswith("check_") and skip_checks[fn_name] != BaseCheck.HIGH:
-                returned_checks.append((fn_obj, skip_checks[fn_name]))
+        for check in self.get_checker_info(checker_class).checks:
+            if skip_checks[check.name] == BaseCheck.HIGH:
+                continue
+            if self.metadata_only and check.data_dependent:
+                continue
+            returned_checks.append(
+                (getattr(checkclass, check.name), skip_checks[check.name])
+            )
 
         return returned_checks
 
@@ -294,7 +470,7 @@ class CheckSuite(object):
             name, a = checker_queue.pop()
             # is the current dataset type in the supported filetypes
             # for the checker class?
-            if type(ds) in a().supported_ds:
+            if type(ds) in self.get_checker_info(a).supported_ds:
                 valid.append((name, a))
 
             # add subclasses of SOS checks
@@ -358,6 +534,13 @@ class CheckSuite(object):
                 "No valid checkers found for tests '{}'".format(",".join(checker_names))
             )
 
+        # results can only be cached for datasets whose contents can be
+        # digested, and header snapshots aren't cached as digesting the
+        # source file would defeat the purpose of only reading its header
+        digest = None
+        if self.result_cache is not None and checkers and not self.metadata_only:
+            digest = dataset_digest(ds)
+
         for checker_name, checker_class in checkers:
             # TODO: maybe this a little more reliable than depending on
             #       a string to determine the type of the checker -- perhaps
@@ -366,36 +549,153 @@ class CheckSuite(object):
             checker_type_name = checker_name.split(":")[0]
             checker_opts = self.options.get(checker_type_name, set())
 
-            # instantiate a Checker object
-            try:
-                checker = checker_class(options=checker_opts)
-            # hacky fix for no options in constructor
-            except TypeError:
-                checker = checker_class()
-            # TODO? : Why is setup(ds) called at all instead of just moving the
-            #         checker setup into the constructor?
-            # setup method to prep
-            checker.setup(ds)
-
-            checks = self._get_checks(checker, skip_check_dict)
-            vals = []
+            if digest is not None:
+                cache_key = self.result_cache.make_key(
+                    digest, checker_name, checker_class, skip_checks, checker_opts
+                )
+                groups = self.result_cache.get(cache_key)
+                if groups is not None:
+                    ret_val[checker_name] = groups, {}
+                    continue
+
+            checker = self.checker_pool.acquire(checker_class, checker_opts)
             errs = {}  # check method name -> (exc, traceback)
+            try:
+                # TODO? : Why is setup(ds) called at all instead of just moving
+                #         the checker setup into the constructor?
+                # setup method to prep
+                with self._measure(ds, checker_name, "setup"):
+                    checker.setup(ds)
+
+                checks = self._get_checks(checker, skip_check_dict)
+                vals = []
+
+                # results are gathered in the order of the checks, however
+                # many threads they were run on
+                for check_name, check_vals, error in self._run_checks(
+                    ds, checker_name, checks
+                ):
+                    if error is None:
+                        vals.extend(check_vals)
+                    else:
+                        errs[check_name] = error
+
+                # score the results we got back
+                with self._measure(ds, checker_name, "scores"):
+                    groups = self.scores(vals)
+            finally:
+                error = self._release_checker(checker, ds, checker_opts)
+                if error is not None:
+                    errs["teardown"] = error
+
+            # runs which raised errors are not cached so that they are
+            # retried and reported next time
+            if digest is not None and not errs:
+                self.result_cache.put(cache_key, checker_name, groups)
+
+            # the raw results and bound check methods refer back to the
+            # checker, which may be handed to another run once released
+            del checker, checks, vals
 
-            for c, max_level in checks:
-                try:
-                    vals.extend(self._run_check(c, ds, max_level))
-                except Exception as e:
-                    errs[c.__func__.__name__] = (e, sys.exc_info()[2])
+            ret_val[checker_name] = groups, errs
+
+        return ret_val
 
-            # score the results we got back
-            groups = self.scores(vals)
+    def _release_checker(self, checker, ds, checker_opts):
+        """
+        Tears a checker down once done with a dataset and hands it back to
+        the checker pool.  Checkers whose teardown fails aren't reused.
 
-            # invoke finalizer explicitly
-            del checker
+        :rtype: tuple
+        :returns: None, or the (exception, traceback) raised by the teardown
+        """
+        teardown = getattr(checker, "teardown", None)
+        if teardown is not None:
+            try:
+                teardown(ds)
+            except Exception as e:
+                return e, sys.exc_info()[2]
+        self.checker_pool.release(checker, checker_opts)
+        return None
 
-            ret_val[checker_name] = groups, errs
+    def warm_up(self, checker_names=(), count=1):
+        """
+        Creates instances of checkers in the checker pool ahead of checking
+        any dataset, so that their one-time initialisation isn't part of the
+        first check
+
+        :param list checker_names: Names of the checkers, all of them if
+                                   empty
+        :param int count: Number of instances of each checker, e.g. the
+                          number of datasets checked concurrently
+        """
+        for checker_name in checker_names or list(self.checkers):
+            checker_class = self.checkers.get(checker_name)
+            if checker_class is None:
+                continue
+            checker_opts = self.options.get(checker_name.split(":")[0], set())
+            self.checker_pool.warm(checker_class, checker_opts, count)
 
-        return ret_val
+    def _run_checks(self, ds, checker_name, checks):
+        """
+        Runs the checks of a checker against a dataset, on a pool of
+        `check_threads` threads if more than one is requested.  Access to
+        netCDF datasets is serialised unless `netcdf_thread_safe` is set.
+
+        :param ds: Dataset being checked
+        :param str checker_name: Name of the checker
+        :param list checks: (check method, max level) tuples
+        :rtype: list
+        :returns: (check name, results, error) tuples in the order of
+                  `checks`, where error is None if the check succeeded or
+                  the (exception, traceback) it raised
+        """
+        if self.check_threads <= 1 or len(checks) <= 1 or self.profile is not None:
+            return [
+                self._run_check_safely(ds, checker_name, check, max_level)
+                for check, max_level in checks
+            ]
+
+        if isinstance(ds, Dataset) and not self.netcdf_thread_safe:
+            ds = locked(ds)
+        with ThreadPoolExecutor(
+            max_workers=min(self.check_threads, len(checks))
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._run_check_safely, ds, checker_name, check, max_level
+                )
+                for check, max_level in checks
+            ]
+            return [future.result() for future in futures]
+
+    def _run_check_safely(self, ds, checker_name, check_method, max_level):
+        """
+        Runs a check, capturing any exception it raises
+
+        :rtype: tuple
+        :returns: The check name, its list of results or None, and None or
+                  the (exception, traceback) raised by the check
+        """
+        check_name = check_method.__func__.__name__
+        try:
+            with self._measure(ds, checker_name, "check", check_name):
+                return check_name, self._run_check(check_method, ds, max_level), None
+        except Exception as e:
+            return check_name, None, (e, sys.exc_info()[2])
+
+    def _measure(self, ds, checker_name, phase, name=None):
+        """
+        Returns a context manager recording a step of a checker run in the
+        profile, or one which does nothing if the suite isn't profiling
+        """
+        if self.profile is None:
+            return _unmeasured()
+        try:
+            dataset = ds.filepath()
+        except (AttributeError, ValueError):
+            dataset = None
+        return self.profile.measure(dataset, checker_name, phase, name)
 
     @classmethod
     def passtree(cls, groups, limit):
@@ -709,6 +1009,11 @@ class CheckSuite(object):
         Attempt to parse an xml string conforming to either an SOS or SensorML
         dataset and return the results
         """
+        # imported here as owslib is slow to import and only needed for SOS
+        from lxml import etree as ET
+        from owslib.sos import SensorObservationService
+        from owslib.swe.sensor.sml import SensorML
+
         xml_doc = ET.fromstring(doc)
         if xml_doc.tag == "{http://www.opengis.net/sos/1.0}Capabilities":
             ds = SensorObservationService(None, xml=doc)
@@ -724,10 +1029,10 @@ class CheckSuite(object):
 
     def generate_dataset(self, cdl_path):
         """
-        Use ncgen to generate a netCDF file from a .cdl file
-        Returns the path to the generated netcdf file. If ncgen fails, uses
-        sys.exit(1) to terminate program so a long stack trace is not reported
-        to the user.
+        Generates a netCDF-4 file from a .cdl file, next to it, without
+        calling ncgen.  Returns the path to the generated netcdf file. If the
+        CDL can't be parsed, uses sys.exit(1) to terminate program so a long
+        stack trace is not reported to the user.
 
         :param str cdl_path: Absolute path to cdl file that is used to generate netCDF file
         """
@@ -738,29 +1043,21 @@ class CheckSuite(object):
         else:
             ds_str = cdl_path + ".nc"
 
-        # generate netCDF-4 file
-        iostat = subprocess.run(
-            ["ncgen", "-k", "nc4", "-o", ds_str, cdl_path], stderr=subprocess.PIPE
-        )
-        if iostat.returncode != 0:
-            # if not successful, create netCDF classic file
-            print(
-                "netCDF-4 file could not be generated from cdl file with " + "message:"
-            )
-            print(iostat.stderr.decode())
-            print("Trying to create netCDF Classic file instead.")
-            iostat = subprocess.run(
-                ["ncgen", "-k", "nc3", "-o", ds_str, cdl_path], stderr=subprocess.PIPE
-            )
-            if iostat.returncode != 0:
-                # Exit program if neither a netCDF Classic nor a netCDF-4 file
-                # could be created.
-                print(
-                    "netCDF Classic file could not be generated from cdl file"
-                    + "with message:"
-                )
-                print(iostat.stderr.decode())
-                sys.exit(1)
+        try:
+            if self.netcdf_cache is None:
+                cdl.generate_netcdf(cdl_path, ds_str, format="NETCDF4")
+            else:
+                cached = self.netcdf_cache.get(cdl_path, format="NETCDF4")
+                # leave an identical file alone rather than rewriting it
+                if not (
+                    os.path.isfile(ds_str)
+                    and filecmp.cmp(cached, ds_str, shallow=False)
+                ):
+                    shutil.copyfile(cached, ds_str)
+        except ValueError as e:
+            print("netCDF file could not be generated from cdl file with message:")
+            print(e)
+            sys.exit(1)
         return ds_str
 
     def load_dataset(self, ds_str):
@@ -774,67 +1071,157 @@ class CheckSuite(object):
         # as a local resource.
         pr = urlparse(ds_str)
         if pr.netloc:
-            return self.load_remote_dataset(ds_str)
+            ds = self.load_remote_dataset(ds_str)
         else:
-            return self.load_local_dataset(ds_str)
+            ds = self.load_local_dataset(ds_str)
+        return self._prepare_dataset(ds)
 
-    def check_remote_netcdf(self, ds_str):
-        if netcdf.is_remote_netcdf(ds_str):
-            response = requests.get(ds_str, allow_redirects=True, timeout=60)
+    def _prepare_dataset(self, ds):
+        """
+        Returns the dataset to check in place of a loaded dataset
+        """
+        # in metadata only mode netCDF datasets are swapped for an in-memory
+        # copy of their header so no check can read variable data
+        if (
+            self.metadata_only
+            and isinstance(ds, Dataset)
+            and not ds.__dict__.get("header_only")
+        ):
             try:
-                return MemoizedDataset(
-                    urlparse(response.url).path, memory=response.content
-                )
-            except OSError as e:
-                # handle case when netCDF C libs weren't compiled with
-                # in-memory support by using tempfile
-                with tempnc(response.content) as _nc:
-                    return MemoizedDataset(_nc)
+                return MemoizedDataset.header_snapshot(ds)
+            finally:
+                ds.close()
+        return ds
 
-    def load_remote_dataset(self, ds_str):
+    def check_remote_netcdf(self, ds_str):
         """
-        Returns a dataset instance for the remote resource, either OPeNDAP or SOS
+        Returns a dataset for a URL serving a netCDF file, or None if the
+        server doesn't report the content as netCDF.
 
-        :param str ds_str: URL to the remote resource
+        :param str ds_str: URL of the netCDF file
+        :raises ValueError: If the content isn't a netCDF file
+        """
+        with remote.probe(ds_str) as probe:
+            if probe.kind == remote.NETCDF:
+                return self._load_remote_netcdf(probe.response)
+        return None
+
+    def _load_remote_netcdf(self, response):
+        """
+        Returns a dataset for the netCDF file in the body of a streamed
+        response, see `_download_remote_netcdf`
+
+        :param requests.Response response: Response of a request made with
+                                           `stream=True`
+        :raises ValueError: If the content isn't a netCDF file
+        """
+        return self._download_remote_netcdf(response)()
+
+    def _download_remote_netcdf(self, response):
         """
+        Downloads the netCDF file in the body of a streamed response and
+        returns a function taking no arguments which opens it, so that
+        downloading and opening can happen in different threads.  The file
+        is streamed to a temporary file, which is removed when the dataset
+        is closed.  Files whose reported size is at most
+        `remote_in_memory_limit` bytes are opened in memory instead.
+
+        :param requests.Response response: Response of a request made with
+                                           `stream=True`
+        :raises ValueError: If the content isn't a netCDF file
+        :rtype: callable
+        """
+        try:
+            in_memory = (
+                int(response.headers["content-length"]) <= self.remote_in_memory_limit
+            )
+        except (KeyError, ValueError):
+            in_memory = False
+        if in_memory:
+            buf = io.BytesIO()
+            netcdf.download_netcdf(response, buf)
+            return functools.partial(
+                self._open_netcdf_bytes, urlparse(response.url).path, buf.getvalue()
+            )
 
-        url_parsed = urlparse(ds_str)
-        # ERDDAP TableDAP request
+        path = self._write_temporary_netcdf(
+            lambda f: netcdf.download_netcdf(response, f)
+        )
+        return functools.partial(MemoizedDataset.temporary, path)
 
-        nc_remote_result = self.check_remote_netcdf(ds_str)
-        if nc_remote_result:
-            return nc_remote_result
+    @staticmethod
+    def _write_temporary_netcdf(write):
+        """
+        Creates a temporary netCDF file, calling `write` with the open file
+        object to fill it, and returns its path.  The file is removed if
+        writing fails.
+        """
+        tmp = NamedTemporaryFile(
+            suffix=".nc", prefix="compliance-checker_", delete=False
+        )
+        try:
+            with tmp:
+                write(tmp)
+        except Exception:
+            os.remove(tmp.name)
+            raise
+        return tmp.name
+
+    def _open_netcdf_bytes(self, name, data):
+        """
+        Opens a netCDF file held in memory
+        """
+        try:
+            return MemoizedDataset(name, memory=data)
+        except OSError:
+            # netCDF C libs weren't compiled with in-memory support, so fall
+            # back to a temporary file
+            path = self._write_temporary_netcdf(lambda f: f.write(data))
+            return MemoizedDataset.temporary(path)
+
+    def load_remote_dataset(self, ds_str):
+        """
+        Returns a dataset instance for the remote resource, either a netCDF
+        file, OPeNDAP or SOS.  The kind of resource is detected with a
+        single request in most cases, see `remote.probe`, and the response
+        to it is reused to load netCDF files and SOS documents.
+
+        :param str ds_str: URL to the remote resource
+        """
+        probe = remote.probe(ds_str)
 
         # if application/x-netcdf wasn't detected in the Content-Type headers
         # and this is some kind of erddap tabledap form, then try to get the
         # .ncCF file from ERDDAP
-        elif "tabledap" in ds_str and not url_parsed.query:
+        if (
+            probe.kind != remote.NETCDF
+            and "tabledap" in ds_str
+            and not urlparse(ds_str).query
+        ):
+            probe.close()
             # modify ds_str to contain the full variable request
             variables_str = opendap.create_DAP_variable_str(ds_str)
 
             # join to create a URL to an .ncCF resource
             ds_str = "{}.ncCF?{}".format(ds_str, variables_str)
+            probe = remote.probe(ds_str)
 
-        nc_remote_result = self.check_remote_netcdf(ds_str)
-        if nc_remote_result:
-            return nc_remote_result
-
-        # if it's just an OPeNDAP endpoint, use that
-        elif opendap.is_opendap(ds_str):
-            return Dataset(ds_str)
-
-        # Check if the HTTP response is XML, if it is, it's likely SOS so
-        # we'll attempt to parse the response as SOS.
-        # Some SOS servers don't seem to support HEAD requests.
-        # Issue GET instead if we reach here and can't get the response
-        response = requests.get(ds_str, allow_redirects=True, timeout=60)
-        content_type = response.headers.get("content-type")
-        if content_type == "text/xml":
-            return self.process_doc(response.content)
-        else:
-            raise ValueError(
-                "Unknown service with content-type: {}".format(content_type)
-            )
+        with probe:
+            if probe.kind == remote.NETCDF:
+                return self._load_remote_netcdf(probe.response)
+
+            # if it's just an OPeNDAP endpoint, use that
+            elif probe.kind == remote.OPENDAP:
+                return Dataset(ds_str)
+
+            # if the HTTP response is XML, it's likely SOS so we'll attempt to
+            # parse the response as SOS
+            elif probe.kind == remote.XML:
+                return self.process_doc(probe.response.content)
+
+        raise ValueError(
+            "Unknown service with content-type: {}".format(probe.content_type)
+        )
 
     def load_local_dataset(self, ds_str):
         """
@@ -842,8 +1229,15 @@ class CheckSuite(object):
 
         :param ds_str: Path to the resource
         """
+        # CDL is parsed into an in-memory netCDF-4 dataset, or just its
+        # header when only metadata is checked, unless a netCDF file
+        # generated from the same CDL is cached
         if cdl.is_cdl(ds_str):
-            ds_str = self.generate_dataset(ds_str)
+            if self.netcdf_cache is None or self.metadata_only:
+                return MemoizedDataset.from_cdl(
+                    ds_str, format="NETCDF4", data=not self.metadata_only
+                )
+            ds_str = self.netcdf_cache.get(ds_str, format="NETCDF4")
 
         if netcdf.is_netcdf(ds_str):
             return MemoizedDataset(ds_str)
@@ -864,85 +1258,92 @@ class CheckSuite(object):
 
     def _group_raw(self, raw_scores, cur=None, level=1):
         """
-        Internal recursive method to group raw scores into a cascading score summary.
-        Only top level items are tallied for scores.
+        Groups raw scores into a cascading score summary.  Results are
+        grouped by each element of their names, which are either a single
+        group name or a tuple of nested group names, and by their weight.
+        Groups are scored with the sum of the scores of the results or
+        groups below them, and only the innermost groups keep the results'
+        messages.
+
+        A group is split into subgroups if any of its results has more name
+        elements than the group's depth, with the results which don't placed
+        in a subgroup named "".  Padding every name with "" to the same
+        length therefore gives, in a single sort, the order in which sorting
+        each group on (name, weight) would list the subgroups and results.
+        The groups are then built from a trie keyed on the name elements and
+        weight, in time linear in the number of results.
+
         @param list raw_scores: list of raw scores (Result objects)
+        @param cur: unused, kept for compatibility
+        @param int level: unused, kept for compatibility
+        @return list: list of grouped Result objects
         """
-
-        def trim_groups(r):
-            if isinstance(r.name, tuple) or isinstance(r.name, list):
-                new_name = r.name[1:]
-            else:
-                new_name = []
-
-            return Result(r.weight, r.value, new_name, r.msgs)
-
-        # CHECK FOR TERMINAL CONDITION: all raw_scores.name are single length
-        # @TODO could have a problem here with scalar name, but probably still works
-        terminal = [len(x.name) for x in raw_scores]
-        if terminal == [0] * len(raw_scores):
+        paths = [_name_path(r.name) for r in raw_scores]
+        if not any(paths):
             return []
 
-        def group_func(r):
-            """
-            Takes a Result object and slices off the first element of its name
-            if its's a tuple. Otherwise, does nothing to the name. Returns the
-            Result's name and weight in a tuple to be used for sorting in that
-            order in a groupby function.
-            @param Result r
-            @return tuple (str, int)
-            """
-            if isinstance(r.name, tuple) or isinstance(r.name, list):
-                if len(r.name) == 0:
-                    retval = ""
-                else:
-                    retval = r.name[0:1][0]
-            else:
-                retval = r.name
-            return retval, r.weight
-
-        # END INTERNAL FUNCS ##########################################
-
-        # NOTE until this point, *ALL* Results in raw_scores are
-        # individual Result objects.
-
-        # sort then group by name, then by priority weighting
-        grouped = itertools.groupby(sorted(raw_scores, key=group_func), key=group_func)
-
-        # NOTE: post-grouping, grouped looks something like
-        # [(('Global Attributes', 1), <itertools._grouper at 0x7f10982b5390>),
-        #  (('Global Attributes', 3), <itertools._grouper at 0x7f10982b5438>),
-        #  (('Not a Global Attr', 1), <itertools._grouper at 0x7f10982b5470>)]
-        #  (('Some Variable', 2),     <itertools._grouper at 0x7f10982b5400>),
-
-        ret_val = []
-
-        for k, v in grouped:  # iterate through the grouped tuples
-
-            k = k[0]  # slice ("name", weight_val) --> "name"
-            v = list(v)  # from itertools._grouper to list
-
-            cv = self._group_raw(list(map(trim_groups, v)), k, level + 1)
-            if len(cv):
-                # if this node has children, max weight of children + sum of all the scores
+        # (weight, *name prefix) of the groups which are split into subgroups
+        branches = set()
+        for r, path in zip(raw_scores, paths):
+            for depth in range(1, len(path)):
+                branches.add((r.weight,) + path[:depth])
+
+        max_depth = max(len(path) for path in paths)
+
+        def sort_key(i):
+            padded = paths[i] + ("",) * (max_depth - len(paths[i]))
+            return (padded[0], raw_scores[i].weight) + padded[1:]
+
+        root = _ScoreGroup(None)
+        for i in sorted(range(len(raw_scores)), key=sort_key):
+            r, path = raw_scores[i], paths[i]
+            group, prefix, depth = root, (r.weight,), 0
+            while True:
+                name = path[depth] if depth < len(path) else ""
+                key = (name, r.weight)
+                child = group.children.get(key)
+                if child is None:
+                    child = group.children[key] = _ScoreGroup(name)
+                group, prefix, depth = child, prefix + (name,), depth + 1
+                if prefix not in branches:
+                    break
+            group.results.append(r)
+
+        # score the groups from the innermost out, which reversing a
+        # preorder walk of the trie visits before their parents
+        preorder, stack = [], list(root.children.values())
+        while stack:
+            group = stack.pop()
+            preorder.append(group)
+            stack.extend(group.children.values())
+
+        for group in reversed(preorder):
+            if group.children:
+                cv = [child.result for child in group.children.values()]
                 max_weight = max([x.weight for x in cv])
-                sum_scores = tuple(map(sum, list(zip(*([x.value for x in cv])))))
+                sum_scores = tuple(map(sum, zip(*[x.value for x in cv])))
                 msgs = []
-
             else:
-                max_weight = max([x.weight for x in v])
+                cv = []
+                max_weight = max([x.weight for x in group.results])
                 sum_scores = tuple(
-                    map(sum, list(zip(*([self._translate_value(x.value) for x in v]))))
-                )
-                msgs = sum([x.msgs for x in v], [])
-
-            ret_val.append(
-                Result(
-                    name=k, weight=max_weight, value=sum_scores, children=cv, msgs=msgs
+                    map(
+                        sum,
+                        zip(*[self._translate_value(x.value) for x in group.results]),
+                    )
                 )
+                msgs = []
+                for x in group.results:
+                    msgs.extend(x.raw_msgs)
+            group.result = Result(
+                name=group.name,
+                weight=max_weight,
+                value=sum_scores,
+                children=cv,
+                msgs=msgs,
             )
 
-        return ret_val
+        return [group.result for group in root.children.values()]
 
     def _translate_value(self, val):
         """
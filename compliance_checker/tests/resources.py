@@ -1,22 +1,40 @@
+import atexit
 import os
-import subprocess
+import shutil
+import tempfile
 
 from pkg_resources import resource_filename
 
+from compliance_checker.cache import NetCDFCache
+
+
+def _netcdf_cache_dir():
+    """
+    Returns the directory to keep netCDF files generated from the CDL
+    fixtures in.  This is $COMPLIANCE_CHECKER_TEST_CACHE if it's set, so that
+    the files are only generated again when a fixture changes, or otherwise
+    a temporary directory which is removed when the tests finish.  The
+    command line's cache is never used.
+    """
+    directory = os.environ.get("COMPLIANCE_CHECKER_TEST_CACHE")
+    if directory:
+        return directory
+    directory = tempfile.mkdtemp(prefix="compliance-checker-tests-")
+    atexit.register(shutil.rmtree, directory, True)
+    return directory
+
+
+NETCDF_CACHE = NetCDFCache(_netcdf_cache_dir())
+
 
 def get_filename(path):
     """
     Returns the path to a valid dataset
     """
     filename = resource_filename("compliance_checker", path)
-    nc_path = filename.replace(".cdl", ".nc")
-    if not os.path.exists(nc_path):
-        generate_dataset(filename, nc_path)
-    return nc_path
-
-
-def generate_dataset(cdl_path, nc_path):
-    subprocess.call(["ncgen", "-o", nc_path, cdl_path])
+    if os.path.splitext(filename)[1] == ".cdl":
+        return NETCDF_CACHE.get(filename)
+    return filename
 
 
 STATIC_FILES = {
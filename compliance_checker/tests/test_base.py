@@ -123,6 +123,58 @@ class TestBase(TestCase):
             ),
         )
 
+    def test_lazy_messages(self):
+        """
+        Message templates are formatted when the messages of a result are
+        read, unless their arguments could change before then
+        """
+        ctx = base.TestCtx(base.BaseCheck.HIGH, "Lazy")
+        self.assertTrue(ctx.assert_true(True, "{} passed", "var"))
+        ctx.assert_true(False, "{} is {:.1f}", "var", 2.25)
+        ctx.assert_true(False, "{} are missing", ["a", "b"])
+        ctx.assert_true(False, "plain message")
+        self.assertIsInstance(ctx.messages[0], base.Message)
+        self.assertEqual(ctx.messages[1], "['a', 'b'] are missing")
+
+        result = ctx.to_result()
+        self.assertIsInstance(result.raw_msgs[0], base.Message)
+        self.assertEqual(
+            result.msgs, ["var is 2.2", "['a', 'b'] are missing", "plain message"]
+        )
+        self.assertIs(type(result.raw_msgs[0]), str)
+        self.assertEqual(result.serialize()["msgs"], result.msgs)
+        self.assertEqual(
+            result, base.Result(base.BaseCheck.HIGH, (1, 4), "Lazy", list(result.msgs))
+        )
+        self.assertEqual(result.value, (1, 4))
+
+    def test_deferred_message_args(self):
+        """
+        Deferred message arguments are only computed when the message is
+        formatted, and only if their own arguments are immutable
+        """
+        calls = []
+
+        def join(items):
+            calls.append(items)
+            return ", ".join(items)
+
+        ctx = base.TestCtx(base.BaseCheck.HIGH, "Deferred")
+        ctx.assert_true(True, "{} passed", base.Deferred(join, ("a", "b")))
+        ctx.assert_true(False, "{} failed", base.Deferred(join, ("c", "d")))
+        ctx.assert_true(False, "{} failed", base.Deferred(join, ["e", "f"]))
+        self.assertEqual(calls, [["e", "f"]])
+        self.assertIsInstance(ctx.messages[0], base.Message)
+
+        result = ctx.to_result()
+        self.assertEqual(result.msgs, ["c, d failed", "e, f failed"])
+        self.assertEqual(calls, [["e", "f"], ("c", "d")])
+
+        with self.assertRaises(AttributeError):
+            result.extra = True
+        with self.assertRaises(AttributeError):
+            ctx.extra = True
+
     def test_email_validation(self):
         test_attr_name = "test"
         validator = base.EmailValidator()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the benchmark harness and synthetic dataset generator
+"""
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from netCDF4 import Dataset
+
+from compliance_checker.benchmarks import harness, startup
+from compliance_checker.benchmarks.datasets import FEATURE_TYPES, generate_dataset
+from compliance_checker.suite import CheckSuite
+
+
+class TestBenchmarks(TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        CheckSuite.load_all_available_checkers()
+
+    def test_generate_dataset(self):
+        """
+        Generated datasets have the requested shape for every feature type
+        """
+        for feature_type in FEATURE_TYPES:
+            path = generate_dataset(
+                os.path.join(self.work_dir, "{}.nc".format(feature_type)),
+                n_variables=12,
+                n_attributes=3,
+                dim_size=7,
+                feature_type=feature_type,
+            )
+            with Dataset(path) as ds:
+                data_vars = ds.get_variables_by_attributes(
+                    coverage_content_type="physicalMeasurement"
+                )
+                self.assertEqual(len(data_vars), 12)
+                self.assertIn("comment_2", data_vars[0].ncattrs())
+                self.assertIn("attribute_2", ds.ncattrs())
+                self.assertEqual(data_vars[0].shape[-1], 7)
+                if feature_type != "grid":
+                    self.assertEqual(ds.featureType, feature_type)
+
+        with self.assertRaises(ValueError):
+            generate_dataset(os.path.join(self.work_dir, "x.nc"), feature_type="swath")
+
+    def test_run_and_compare(self):
+        """
+        A small benchmark run records every kind of benchmark and compares
+        against a baseline by name and parameters
+        """
+        results = harness.results_to_dict(
+            harness.run_benchmarks(
+                variable_counts=(2,),
+                dim_size=5,
+                checker_names=["cf:1.7", "acdd:1.3"],
+                repeat=1,
+                output_checkers=("acdd:1.3",),
+                work_dir=self.work_dir,
+                result_counts=(50,),
+            )
+        )
+        names = [r["name"] for r in results["results"]]
+        for name in (
+            "startup/version",
+            "startup/list",
+            "standard_name_table/parse",
+            "run/cf:1.7",
+            "run/acdd:1.3",
+            "scores/acdd:1.3",
+            "scores_recursive/acdd:1.3",
+            "scores/synthetic",
+            "scores_recursive/synthetic",
+            "output/text",
+            "output/html",
+            "output/json",
+            "output/json_new",
+        ):
+            self.assertIn(name, names)
+        self.assertIn("python", results["environment"])
+        self.assertIn("run/cf:1.7", harness.format_results(results))
+
+        slower = {
+            "environment": {},
+            "results": [dict(r, min=r["min"] * 2) for r in results["results"]],
+        }
+        rows = harness.compare(results, slower)
+        self.assertEqual(len(rows), len(results["results"]))
+        self.assertTrue(all(row[5] == "slower" for row in rows if row[2] > 0))
+        self.assertEqual(harness.compare(slower, {"results": []}), [])
+
+    def test_startup_budgets(self):
+        """
+        Invocations which check nothing don't import the checkers or their
+        dependencies, and results over their time budget are reported
+        """
+        # the first listing takes the snapshot of the checkers later ones use
+        startup.imported_modules(["-l"])
+        for args in (["--version"], ["--help"], ["-l"]):
+            self.assertEqual(startup.deferred_imports(args), [], args)
+
+        results = [
+            harness.BenchmarkResult("startup/version", {}, [0.2, 0.1]),
+            harness.BenchmarkResult("startup/list", {}, [0.6, 0.5]),
+            harness.BenchmarkResult("run/cf:1.7", {}, [5.0]),
+        ]
+        budgets = {"version": 0.15, "list": 0.4, "cf:1.7": 1.0}
+        messages = startup.check_budgets(results, budgets)
+        self.assertEqual(len(messages), 1)
+        self.assertIn("startup/list", messages[0])
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the on-disk caches of results and generated netCDF files
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from unittest import TestCase, mock
+
+from compliance_checker.base import Result
+from netCDF4 import Dataset
+
+from compliance_checker.cache import (
+    NetCDFCache,
+    ResultCache,
+    dumps_results,
+    loads_results,
+)
+from compliance_checker.suite import CheckSuite
+from compliance_checker.tests.resources import STATIC_FILES
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.tmpdir, "results.sqlite"))
+        CheckSuite.load_all_available_checkers()
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_results_round_trip(self):
+        """
+        Grouped results survive serialization unchanged
+        """
+        groups = [
+            Result(
+                weight=3,
+                value=(1, 2),
+                name="group",
+                msgs=[],
+                children=[Result(3, (1, 2), "child", ["a message"])],
+            )
+        ]
+        restored = loads_results(dumps_results(groups))
+        self.assertEqual(restored, groups)
+        self.assertEqual(restored[0].value, (1, 2))
+        self.assertEqual(restored[0].children[0].msgs, ["a message"])
+
+    def test_run_uses_cache(self):
+        """
+        A second run against an unchanged dataset is answered from the cache
+        """
+        cs = CheckSuite(result_cache=self.cache)
+        ds = cs.load_dataset(STATIC_FILES["2dim"])
+        first = cs.run(ds, [], "cf:1.6")
+        ds.close()
+
+        count = self.cache.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        self.assertEqual(count[0], 1)
+
+        key = next(iter(self.cache.conn.execute("SELECT key FROM results")))[0]
+        self.cache.conn.execute(
+            "UPDATE results SET payload = ? WHERE key = ?",
+            (dumps_results([Result(1, (1, 1), "sentinel")]), key),
+        )
+
+        ds = cs.load_dataset(STATIC_FILES["2dim"])
+        second = cs.run(ds, [], "cf:1.6")
+        ds.close()
+        self.assertEqual(second["cf:1.6"][0][0].name, "sentinel")
+
+        # results for other skip checks are computed separately
+        ds = cs.load_dataset(STATIC_FILES["2dim"])
+        third = cs.run(ds, ["check_units"], "cf:1.6")
+        ds.close()
+        self.assertNotEqual(third["cf:1.6"][0][0].name, "sentinel")
+        self.assertNotEqual(first["cf:1.6"][0][0].name, "sentinel")
+
+    def test_make_key(self):
+        """
+        Keys change with the dataset, checker, compliance checker version,
+        skip checks and options
+        """
+        checker_class = CheckSuite.checkers["cf:1.6"]
+        key = ResultCache.make_key("abc", "cf:1.6", checker_class, [], set())
+        self.assertEqual(
+            key, ResultCache.make_key("abc", "cf:1.6", checker_class, None, None)
+        )
+        for other in (
+            ResultCache.make_key("abd", "cf:1.6", checker_class, [], set()),
+            ResultCache.make_key("abc", "cf:1.7", checker_class, [], set()),
+            ResultCache.make_key(
+                "abc", "cf:1.6", checker_class, ["check_units"], set()
+            ),
+            ResultCache.make_key(
+                "abc", "cf:1.6", checker_class, [], {"enable_appendix_a_checks"}
+            ),
+        ):
+            self.assertNotEqual(key, other)
+        with mock.patch("compliance_checker.cache.__version__", "0.0.0"):
+            self.assertNotEqual(
+                key, ResultCache.make_key("abc", "cf:1.6", checker_class, [], set())
+            )
+
+    def test_eviction(self):
+        """
+        Entries are evicted by age and, least recently used first, by size
+        """
+        groups = [Result(1, (1, 1), "name")]
+        size = len(dumps_results(groups))
+
+        self.cache.max_size = 2 * size
+        self.cache.put("a", "cf", groups)
+        time.sleep(0.01)
+        self.cache.put("b", "cf", groups)
+        time.sleep(0.01)
+        self.assertIsNotNone(self.cache.get("a"))
+        self.cache.put("c", "cf", groups)
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+        self.cache.max_age = 0
+        time.sleep(0.01)
+        self.cache.evict()
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("c"))
+
+
+CDL_TEMPLATE = """netcdf template {{
+dimensions:
+    time = {} ;
+variables:
+    double time(time) ;
+        time:units = "seconds since 1970-01-01" ;
+}}
+"""
+
+
+class TestNetCDFCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache = NetCDFCache(os.path.join(self.tmpdir, "netcdf"))
+        self.cdl_path = os.path.join(self.tmpdir, "template.cdl")
+        self.write_cdl(self.cdl_path, 3)
+
+    def write_cdl(self, path, size):
+        with open(path, "w") as f:
+            f.write(CDL_TEMPLATE.format(size))
+
+    def test_get(self):
+        """
+        Unchanged CDL is only generated once, and edits are noticed
+        """
+        path = self.cache.get(self.cdl_path)
+        self.assertEqual(os.path.basename(path), "template.nc")
+        with Dataset(path) as ds:
+            self.assertEqual(len(ds.dimensions["time"]), 3)
+
+        mtime = os.path.getmtime(path)
+        self.assertEqual(self.cache.get(self.cdl_path), path)
+        self.assertEqual(os.path.getmtime(path), mtime)
+        self.assertNotEqual(self.cache.get(self.cdl_path, "NETCDF4"), path)
+
+        self.write_cdl(self.cdl_path, 4)
+        changed = self.cache.get(self.cdl_path)
+        self.assertNotEqual(changed, path)
+        with Dataset(changed) as ds:
+            self.assertEqual(len(ds.dimensions["time"]), 4)
+
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_eviction(self):
+        """
+        The least recently used entries are removed once the cache is full
+        """
+        paths = []
+        for size in range(1, 4):
+            cdl_path = os.path.join(self.tmpdir, "template{}.cdl".format(size))
+            self.write_cdl(cdl_path, size)
+            path = self.cache.get(cdl_path)
+            mtime = time.time() - 100 + size
+            os.utime(os.path.dirname(path), (mtime, mtime))
+            paths.append(path)
+        # using the oldest entry makes it the most recently used
+        self.cache.get(os.path.join(self.tmpdir, "template1.cdl"))
+
+        self.cache.max_size = os.path.getsize(paths[0]) + os.path.getsize(paths[2])
+        self.cache.evict()
+        self.assertTrue(os.path.isfile(paths[0]))
+        self.assertFalse(os.path.isfile(paths[1]))
+        self.assertTrue(os.path.isfile(paths[2]))
+
+    def test_suite_uses_cache(self):
+        """
+        The suite loads CDL from, and generates datasets with, the cache
+        """
+        cs = CheckSuite(netcdf_cache=self.cache)
+        ds = cs.load_dataset(self.cdl_path)
+        self.addCleanup(ds.close)
+        self.assertEqual(ds.filepath(), self.cache.get(self.cdl_path, "NETCDF4"))
+
+        nc_path = cs.generate_dataset(self.cdl_path)
+        self.assertEqual(nc_path, os.path.join(self.tmpdir, "template.nc"))
+        mtime = os.path.getmtime(nc_path)
+        os.utime(nc_path, (mtime - 100, mtime - 100))
+        cs.generate_dataset(self.cdl_path)
+        self.assertEqual(os.path.getmtime(nc_path), mtime - 100)
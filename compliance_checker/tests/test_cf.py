@@ -2,11 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import copy
+import json
 import os
+import shutil
 import sqlite3
+import tempfile
 
 from itertools import chain
 from tempfile import gettempdir
+from unittest import mock
 
 import numpy as np
 import pytest
@@ -19,6 +23,7 @@ from compliance_checker.cf import (
     CF1_7Check,
     dimless_vertical_coordinates_1_6,
     dimless_vertical_coordinates_1_7,
+    util,
 )
 from compliance_checker.cf.appendix_d import no_missing_terms
 from compliance_checker.cf.util import (
@@ -105,6 +110,41 @@ class TestCF1_6(BaseTestCase):
         # present in coord_data_vars
         self.assertEqual(self.cf.coord_data_vars, {"time", "sigma"})
 
+    def test_shared_setup(self):
+        """
+        CF setup is done once per read only dataset and shared between CF
+        checkers, which each get their own copies of the variable lists
+        """
+        ds = MockTimeSeries()
+        temp = ds.createVariable("temp", np.float64, dimensions=("time",))
+        temp.ancillary_variables = "temp_qc"
+        ds.createVariable("temp_qc", np.int8, dimensions=("time",))
+        # the dataset is complete, and only read from here on
+        ds.__dict__["read_only"] = True
+        self.addCleanup(cfutil.release_dataset_analysis, ds)
+
+        cf16, cf17 = CF1_6Check(), CF1_7Check()
+        with mock.patch.object(
+            CF1_6Check,
+            "_find_setup_products",
+            autospec=True,
+            side_effect=CF1_6Check._find_setup_products,
+        ) as find:
+            cf16.setup(ds)
+            cf17.setup(ds)
+        self.assertEqual(find.call_count, 1)
+
+        self.assertEqual(cf16._find_ancillary_vars(ds), ["temp_qc"])
+        self.assertEqual(cf17.coord_vars, cf16.coord_vars)
+        self.assertEqual(cf17.coord_data_vars, cf16.coord_data_vars)
+        cf16._find_ancillary_vars(ds).append("temp")
+        self.assertEqual(cf17._find_ancillary_vars(ds), ["temp_qc"])
+
+        # names added to a table are kept when the dataset names another
+        cf17._std_names.extend(["qartod_name"])
+        cf17._use_standard_name_table(cf17._std_names._path)
+        self.assertIn("qartod_name", cf17._std_names)
+
     def load_dataset(self, nc_dataset):
         """
         Return a loaded NC Dataset for the given path
@@ -619,6 +659,80 @@ class TestCF1_6(BaseTestCase):
         ):
             self.assertFalse(self.cf._find_cf_standard_name_table(nc_obj))
 
+    def test_standard_name_table_index(self):
+        """
+        Standard name tables share one parsed index, resolve aliases and
+        keep names added with extend to themselves.
+        """
+        table = StandardNameTable()
+        other = StandardNameTable()
+        self.assertIs(table._entries, other._entries)
+
+        entry = table["sea_water_temperature"]
+        self.assertEqual(entry.canonical_units, "K")
+        self.assertIn("sea_water_temperature", table)
+        self.assertNotIn("not_a_standard_name", table)
+        self.assertNotIn(None, table)
+        with self.assertRaises(KeyError):
+            table["not_a_standard_name"]
+        self.assertEqual(
+            table["longwave_radiance"].canonical_units,
+            table["isotropic_longwave_radiance_in_air"].canonical_units,
+        )
+
+        table.extend(["made_up_standard_name"])
+        self.assertIn("made_up_standard_name", table)
+        self.assertNotIn("made_up_standard_name", other)
+        self.assertEqual(len(table), len(other) + 1)
+
+        self.assertTrue(
+            cfutil.is_dimensionless_standard_name(table, "sea_water_salinity")
+        )
+        self.assertFalse(
+            cfutil.is_dimensionless_standard_name(table, "sea_water_temperature")
+        )
+        self.assertTrue(
+            cfutil.is_dimensionless_standard_name(table._root, "sea_water_salinity")
+        )
+
+    def test_standard_name_table_cache(self):
+        """
+        Parsed standard name tables are cached as JSON, and cached indexes
+        which are malformed or for another table are parsed again
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(util._DATA_DIR, "cf-standard-name-table.xml")
+        with mock.patch.object(
+            util, "create_cached_data_dir", return_value=tmpdir
+        ), mock.patch.dict(util._STANDARD_NAME_INDEXES, clear=True):
+            index = util._load_standard_name_index(path)
+            (cache_file,) = os.listdir(tmpdir)
+            self.assertTrue(cache_file.endswith(".json"))
+            cache_path = os.path.join(tmpdir, cache_file)
+
+            util._STANDARD_NAME_INDEXES.clear()
+            with mock.patch.object(util, "_parse_standard_name_table") as parse:
+                self.assertEqual(util._load_standard_name_index(path), index)
+            parse.assert_not_called()
+
+            with open(cache_path) as f:
+                cached = json.load(f)
+            for change in (
+                {"digest": "other"},
+                {"format": 0},
+                {"entries": {"sea_water_temperature": ["K"]}},
+                {"aliases": {"alias": {"not": "a name"}}},
+            ):
+                with open(cache_path, "w") as f:
+                    json.dump(dict(cached, **change), f)
+                util._STANDARD_NAME_INDEXES.clear()
+                with mock.patch.object(
+                    util, "_parse_standard_name_table", return_value=index
+                ) as parse:
+                    self.assertEqual(util._load_standard_name_index(path), index)
+                parse.assert_called_once_with(mock.ANY)
+
     def test_check_flags(self):
         """Test that the check for flags works as expected."""
 
@@ -1237,15 +1351,15 @@ class TestCF1_6(BaseTestCase):
         score, out_of, messages = get_results(results)
 
         msgs = [
-            u"Type of tempvalid_min attribute (int32) does not match variable type (int64)",
-            u"Type of temp:valid_max attribute (int32) does not match variable type (int64)",
-            u"Type of salinityvalid_min attribute (int32) does not match variable type (float64)",
-            u"Type of salinity:valid_max attribute (int32) does not match variable type (float64)",
+            u"Type of salinityvalid_min attribute (int64) does not match variable type (float64)",
+            u"Type of salinity:valid_max attribute (int64) does not match variable type (float64)",
         ]
 
         self.assertEqual(len(results), 4)
         self.assertTrue(score < out_of)
         self.assertTrue(all(m in messages for m in msgs))
+        # constants with the L suffix are int64 in netCDF-4 files, as temp is
+        self.assertFalse(any(m.startswith(u"Type of temp") for m in messages))
 
     def test_compress_packed(self):
         """Tests compressed indexed coordinates"""
@@ -15,6 +15,7 @@ from unittest import TestCase
 
 import pytest
 
+from compliance_checker.profiling import Profile
 from compliance_checker.runner import CheckSuite, ComplianceChecker
 from compliance_checker.tests.resources import STATIC_FILES
 
@@ -241,3 +242,56 @@ class TestCLI(TestCase):
             output_format="text",
         )
         self.assertFalse(return_value)
+
+    def test_parallel_run_matches_serial(self):
+        """
+        Tests that checking multiple datasets with a process pool produces
+        the same ordered results and return status as a serial run
+        """
+        datasets = [
+            STATIC_FILES["ncei_gold_point_1"],
+            STATIC_FILES["conv_bad"],
+            STATIC_FILES["2dim"],
+        ]
+
+        def run(jobs):
+            return_value, errors = ComplianceChecker.run_checker(
+                ds_loc=datasets,
+                verbose=0,
+                criteria="strict",
+                checker_names=["acdd", "cf"],
+                output_filename=self.path,
+                output_format="json_new",
+                jobs=jobs,
+            )
+            with open(self.path) as f:
+                results = json.load(f)
+            for ds_results in results.values():
+                for checker_results in ds_results.values():
+                    del checker_results["report_timestamp"]
+            return return_value, errors, results
+
+        serial = run(None)
+        parallel = run(2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(list(parallel[2].keys()), datasets)
+
+    def test_parallel_profile(self):
+        """
+        Tests that profile records collected by worker processes are merged
+        into the profile passed to the runner
+        """
+        datasets = [STATIC_FILES["ncei_gold_point_1"], STATIC_FILES["2dim"]]
+        profile = Profile(trace_memory=False)
+        ComplianceChecker.run_checker(
+            ds_loc=datasets,
+            verbose=0,
+            criteria="strict",
+            checker_names=["acdd"],
+            output_filename=self.path,
+            output_format="json_new",
+            jobs=2,
+            profile=profile,
+        )
+        self.assertEqual({r.dataset for r in profile.records}, set(datasets))
+        self.assertTrue(all(r.peak_memory is None for r in profile.records))
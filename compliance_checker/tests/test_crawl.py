@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for concurrent validation of remote datasets, against a local stub
+HTTP server
+"""
+import asyncio
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import TestCase, mock
+
+from compliance_checker.crawl import RemoteValidator
+from compliance_checker.protocols import remote
+from compliance_checker.suite import CheckSuite
+from compliance_checker.tests.resources import STATIC_FILES
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # path -> (status, content type, body, delay in seconds)
+    routes = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.starts.append(time.monotonic())
+            server.paths.append(self.path)
+        try:
+            status, content_type, body, delay = self.routes.get(
+                self.path, (404, "text/html", b"<html>Not found</html>", 0)
+            )
+            time.sleep(delay)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class TestRemoteValidator(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(STATIC_FILES["ncei_gold_point_1"], "rb") as f:
+            netcdf_body = f.read()
+        with open(
+            os.path.join(
+                os.path.dirname(__file__), "data/http_mocks/ncsos_getcapabilities.xml"
+            ),
+            "rb",
+        ) as f:
+            sos_body = f.read()
+        StubHandler.routes = {
+            "/gold.nc": (200, "application/x-netcdf", netcdf_body, 0),
+            "/sos": (200, "text/xml", sos_body, 0),
+            "/stalled.nc": (200, "application/x-netcdf", netcdf_body, 1),
+            "/erddap/tabledap/gold": (200, "application/x-netcdf", netcdf_body, 0),
+            # a restricted OPeNDAP endpoint, the only kind the stub can serve
+            "/erddap/tabledap/dap": (
+                401,
+                "text/html",
+                b"The following URL requires authentication:",
+                0,
+            ),
+            "/erddap/tabledap/dap.ncCF?time,z": (
+                200,
+                "application/x-netcdf",
+                netcdf_body,
+                0,
+            ),
+        }
+        for i in range(6):
+            StubHandler.routes["/slow{}.nc".format(i)] = (
+                200,
+                "application/x-netcdf",
+                netcdf_body,
+                0.1,
+            )
+
+        cls.server = StubServer(("127.0.0.1", 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.base_url = "http://127.0.0.1:{}".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        CheckSuite.load_all_available_checkers()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.active = 0
+        self.server.max_active = 0
+        self.server.starts = []
+        self.server.paths = []
+        remote.clear_classifications()
+        self.addCleanup(remote.clear_classifications)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def test_check_all(self):
+        """
+        Datasets of each kind are loaded and checked, with results in the
+        order of the URLs and errors reported per dataset
+        """
+        urls = [self.url("/gold.nc"), self.url("/sos"), self.url("/missing")]
+        with RemoteValidator(concurrency=4) as validator:
+            results = validator.run(urls, ["acdd", "ioos_sos"])
+
+        self.assertEqual([r.url for r in results], urls)
+        gold, sos, missing = results
+        self.assertIsNone(gold.error)
+        self.assertIn("acdd", gold.score_groups)
+        self.assertIsNone(sos.error)
+        self.assertIn("ioos_sos", sos.score_groups)
+        self.assertIsNone(missing.score_groups)
+        self.assertIsInstance(missing.error, ValueError)
+
+    @mock.patch(
+        "compliance_checker.crawl.opendap.create_DAP_variable_str",
+        return_value="time,z",
+    )
+    def test_tabledap(self, create_DAP_variable_str):
+        """
+        The DDS of ERDDAP TableDAP forms is only requested once they are
+        known to be OPeNDAP endpoints, to load their .ncCF file instead
+        """
+        urls = [self.url("/erddap/tabledap/gold"), self.url("/erddap/tabledap/dap")]
+        with RemoteValidator() as validator:
+            gold, dap = validator.run(urls, ["acdd"])
+
+        self.assertIsNone(gold.error)
+        self.assertIsNone(dap.error)
+        self.assertIn("acdd", dap.score_groups)
+        create_DAP_variable_str.assert_called_once_with(urls[1], validator.timeout)
+        self.assertIn("/erddap/tabledap/dap.ncCF?time,z", self.server.paths)
+
+    def test_limits(self):
+        """
+        No more requests than allowed are in flight to a host at once, and
+        they are started no faster than the rate limit
+        """
+        urls = [self.url("/slow{}.nc".format(i)) for i in range(6)]
+        with RemoteValidator(concurrency=8, per_host=2, per_host_rate=20) as validator:
+            results = validator.run(urls, ["acdd"])
+
+        self.assertTrue(all(r.error is None for r in results))
+        self.assertLessEqual(self.server.max_active, 2)
+        starts = self.server.starts
+        self.assertEqual(len(starts), 6)
+        for earlier, later in zip(starts, starts[1:]):
+            self.assertGreaterEqual(later - earlier, 0.04)
+
+    def test_timeout(self):
+        """
+        Stalled requests fail with a timeout without holding up the others
+        """
+        urls = [self.url("/stalled.nc"), self.url("/gold.nc")]
+        with RemoteValidator(timeout=0.5) as validator:
+            stalled, gold = validator.run(urls, ["acdd"])
+        self.assertIsNotNone(stalled.error)
+        self.assertIsNone(gold.error)
+
+    def test_abandoned_request(self):
+        """
+        Calls which miss their deadline hold their place within the
+        concurrency limits until their thread finishes, and probes they
+        return are closed
+        """
+        probe = remote.Probe(
+            self.url("/gold.nc"), remote.NETCDF, "application/x-netcdf", mock.Mock()
+        )
+        response = probe.response
+
+        def slow_probe():
+            time.sleep(0.3)
+            return probe
+
+        async def request_twice(validator):
+            with self.assertRaises(asyncio.TimeoutError):
+                await validator._request(self.url("/gold.nc"), slow_probe)
+            timed_out = time.monotonic()
+            started = await validator._request(self.url("/sos"), time.monotonic)
+            return started - timed_out
+
+        loop = asyncio.new_event_loop()
+        try:
+            with RemoteValidator(concurrency=1, timeout=0.1) as validator:
+                waited = loop.run_until_complete(request_twice(validator))
+        finally:
+            loop.close()
+        self.assertGreaterEqual(waited, 0.1)
+        response.close.assert_called_once_with()
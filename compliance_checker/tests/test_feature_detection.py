@@ -8,6 +8,7 @@ from unittest import TestCase
 
 from netCDF4 import Dataset
 
+from compliance_checker import MemoizedDataset
 from compliance_checker import cfutil as util
 from compliance_checker.tests import resources
 
@@ -307,52 +308,52 @@ class TestFeatureDetection(TestCase):
             assert util.guess_feature_type(nc, "temperature") == "point"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["Z"] == ["height"]
-            assert axis_map["T"] == ["time"]
+            assert axis_map["Z"] == ("height",)
+            assert axis_map["T"] == ("time",)
 
         with Dataset(resources.STATIC_FILES["2d-regular-grid"]) as nc:
             assert util.guess_feature_type(nc, "temperature") == "2d-regular-grid"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["T"] == ["time"]
-            assert axis_map["Z"] == ["z"]
-            assert axis_map["X"] == ["lon"]
-            assert axis_map["Y"] == ["lat"]
+            assert axis_map["T"] == ("time",)
+            assert axis_map["Z"] == ("z",)
+            assert axis_map["X"] == ("lon",)
+            assert axis_map["Y"] == ("lat",)
 
         with Dataset(resources.STATIC_FILES["2dim"]) as nc:
             assert util.guess_feature_type(nc, "T") == "mapped-grid"
 
             axis_map = util.get_axis_map(nc, "T")
-            assert axis_map["Z"] == ["lev"]
-            assert axis_map["Y"] == ["yc", "lat"]
-            assert axis_map["X"] == ["xc", "lon"]
+            assert axis_map["Z"] == ("lev",)
+            assert axis_map["Y"] == ("yc", "lat")
+            assert axis_map["X"] == ("xc", "lon")
 
         with Dataset(resources.STATIC_FILES["3d-regular-grid"]) as nc:
             assert util.guess_feature_type(nc, "temperature") == "3d-regular-grid"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["T"] == ["time"]
-            assert axis_map["Z"] == ["z"]
-            assert axis_map["Y"] == ["lat"]
-            assert axis_map["X"] == ["lon"]
+            assert axis_map["T"] == ("time",)
+            assert axis_map["Z"] == ("z",)
+            assert axis_map["Y"] == ("lat",)
+            assert axis_map["X"] == ("lon",)
 
         with Dataset(resources.STATIC_FILES["climatology"]) as nc:
             assert util.guess_feature_type(nc, "temperature") == "timeseries"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["T"] == ["time"]
-            assert axis_map["Z"] == []
-            assert axis_map["Y"] == []
-            assert axis_map["X"] == []
+            assert axis_map["T"] == ("time",)
+            assert axis_map["Z"] == ()
+            assert axis_map["Y"] == ()
+            assert axis_map["X"] == ()
 
         with Dataset(resources.STATIC_FILES["index_ragged"]) as nc:
             assert util.guess_feature_type(nc, "temperature") == "single-trajectory"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["T"] == ["time"]
-            assert axis_map["Z"] == ["z"]
-            assert axis_map["Y"] == ["lat"]
-            assert axis_map["X"] == ["lon"]
+            assert axis_map["T"] == ("time",)
+            assert axis_map["Z"] == ("z",)
+            assert axis_map["Y"] == ("lat",)
+            assert axis_map["X"] == ("lon",)
 
         with Dataset(resources.STATIC_FILES["mapping"]) as nc:
             assert (
@@ -361,52 +362,93 @@ class TestFeatureDetection(TestCase):
             )
 
             axis_map = util.get_axis_map(nc, "sea_surface_height")
-            assert axis_map["T"] == ["time"]
-            assert axis_map["Z"] == []
-            assert axis_map["Y"] == ["lat"]
-            assert axis_map["X"] == ["lon"]
+            assert axis_map["T"] == ("time",)
+            assert axis_map["Z"] == ()
+            assert axis_map["Y"] == ("lat",)
+            assert axis_map["X"] == ("lon",)
 
         with Dataset(resources.STATIC_FILES["rotated_pole_grid"]) as nc:
             assert util.guess_feature_type(nc, "temperature") == "mapped-grid"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["T"] == []
-            assert axis_map["Z"] == ["lev"]
-            assert axis_map["Y"] == ["rlat", "lat"]
-            assert axis_map["X"] == ["rlon", "lon"]
+            assert axis_map["T"] == ()
+            assert axis_map["Z"] == ("lev",)
+            assert axis_map["Y"] == ("rlat", "lat")
+            assert axis_map["X"] == ("rlon", "lon")
 
         with Dataset(resources.STATIC_FILES["rutgers"]) as nc:
             assert util.guess_feature_type(nc, "temperature") == "single-trajectory"
 
             axis_map = util.get_axis_map(nc, "temperature")
-            assert axis_map["T"] == ["time"]
-            assert axis_map["Z"] == ["depth"]
-            assert axis_map["Y"] == ["lat"]
-            assert axis_map["X"] == ["lon"]
+            assert axis_map["T"] == ("time",)
+            assert axis_map["Z"] == ("depth",)
+            assert axis_map["Y"] == ("lat",)
+            assert axis_map["X"] == ("lon",)
 
         with Dataset(resources.STATIC_FILES["self-referencing-var"]) as nc:
             assert util.guess_feature_type(nc, "TEMP") == "point"
 
             axis_map = util.get_axis_map(nc, "TEMP")
-            assert axis_map["T"] == ["TIME"]
-            assert axis_map["Z"] == ["DEPTH"]
-            assert axis_map["Y"] == []
-            assert axis_map["X"] == []
+            assert axis_map["T"] == ("TIME",)
+            assert axis_map["Z"] == ("DEPTH",)
+            assert axis_map["Y"] == ()
+            assert axis_map["X"] == ()
 
         with Dataset(resources.STATIC_FILES["2d-static-grid"]) as nc:
             assert util.guess_feature_type(nc, "T") == "2d-static-grid"
 
             axis_map = util.get_axis_map(nc, "T")
-            assert axis_map["X"] == ["lon"]
-            assert axis_map["Y"] == ["lat"]
-            assert axis_map["T"] == []
-            assert axis_map["Z"] == []
+            assert axis_map["X"] == ("lon",)
+            assert axis_map["Y"] == ("lat",)
+            assert axis_map["T"] == ()
+            assert axis_map["Z"] == ()
 
         with Dataset(resources.STATIC_FILES["3d-static-grid"]) as nc:
             assert util.guess_feature_type(nc, "T") == "3d-static-grid"
 
             axis_map = util.get_axis_map(nc, "T")
-            assert axis_map["X"] == ["lon"]
-            assert axis_map["Y"] == ["lat"]
-            assert axis_map["T"] == []
-            assert axis_map["Z"] == ["depth"]
+            assert axis_map["X"] == ("lon",)
+            assert axis_map["Y"] == ("lat",)
+            assert axis_map["T"] == ()
+            assert axis_map["Z"] == ("depth",)
+
+    def test_dataset_analysis(self):
+        """
+        Ensures classifications are shared per read only dataset, can't be
+        modified by callers, and are released when the dataset is closed
+        """
+        nc = MemoizedDataset(resources.STATIC_FILES["2dim"])
+        geophysical_variables = util.get_geophysical_variables(nc)
+        assert geophysical_variables == ("T",)
+
+        analysis = util.get_dataset_analysis(nc)
+        assert analysis is util.get_dataset_analysis(nc)
+        assert util.get_geophysical_variables(nc) is geophysical_variables
+
+        axis_map = util.get_axis_map(nc, "T")
+        assert axis_map["C"] == ()
+        assert "C" not in axis_map
+        with self.assertRaises(TypeError):
+            axis_map["X"] = ("bogus",)
+        with self.assertRaises(AttributeError):
+            axis_map["X"].append("bogus")
+        assert util.get_axis_map(nc, "T") is axis_map
+
+        nc.close()
+        assert nc not in util._DATASET_ANALYSES
+        assert analysis._results == {}
+
+    def test_writable_dataset_analysis(self):
+        """
+        Classifications of datasets which can be written to are computed
+        afresh each time, so they follow changes to the dataset
+        """
+        nc = MemoizedDataset("writable_analysis.nc", "w", diskless=True)
+        self.addCleanup(nc.close)
+        nc.createDimension("time", 2)
+        assert util.get_time_variables(nc) == frozenset()
+        time = nc.createVariable("time", "f8", ("time",))
+        time.standard_name = "time"
+        assert util.get_time_variables(nc) == {"time"}
+        assert util.get_dataset_analysis(nc) is None
+        assert nc not in util._DATASET_ANALYSES
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the thread safe proxies of netCDF datasets
+"""
+import threading
+
+from unittest import TestCase
+
+import numpy as np
+
+from netCDF4 import Dataset, Dimension, Variable
+
+from compliance_checker import MemoizedDataset, cfutil
+from compliance_checker.locking import NETCDF_LOCK, locked
+from compliance_checker.tests.resources import STATIC_FILES
+
+
+class TestLocking(TestCase):
+    def setUp(self):
+        self.ds = Dataset(STATIC_FILES["rutgers"])
+        self.addCleanup(self.ds.close)
+        self.proxy = locked(self.ds)
+
+    def test_proxy(self):
+        """
+        Proxies behave like, and compare equal to, the objects they wrap
+        """
+        ds, proxy = self.ds, self.proxy
+        self.assertIsInstance(proxy, Dataset)
+        self.assertEqual(proxy, ds)
+        self.assertEqual(hash(proxy), hash(ds))
+        self.assertEqual({ds: 1}[proxy], 1)
+
+        name = "temperature"
+        var = proxy.variables[name]
+        self.assertIsInstance(var, Variable)
+        self.assertIs(var, proxy.variables[name])
+        self.assertIs(var, proxy[name])
+        self.assertEqual(var, ds.variables[name])
+        self.assertEqual(var.units, ds.variables[name].units)
+        self.assertEqual(var.ncattrs(), ds.variables[name].ncattrs())
+        np.testing.assert_array_equal(var[:], ds.variables[name][:])
+        np.testing.assert_array_equal(np.asarray(var), ds.variables[name][:])
+        self.assertEqual(list(proxy.variables), list(ds.variables))
+
+        dim = proxy.dimensions[var.dimensions[0]]
+        self.assertIsInstance(dim, Dimension)
+        self.assertEqual(len(dim), len(ds.dimensions[var.dimensions[0]]))
+        self.assertIs(var.group(), proxy)
+        self.assertEqual(
+            proxy.get_variables_by_attributes(units=var.units),
+            ds.get_variables_by_attributes(units=var.units),
+        )
+        self.assertIsInstance(
+            proxy.get_variables_by_attributes(units=var.units)[0], type(proxy[name])
+        )
+
+        # analyses of read only datasets are shared with their proxies
+        memoized = MemoizedDataset(STATIC_FILES["rutgers"])
+        self.addCleanup(memoized.close)
+        analysis = cfutil.get_dataset_analysis(memoized)
+        self.assertIsNotNone(analysis)
+        self.assertIs(cfutil.get_dataset_analysis(locked(memoized)), analysis)
+
+    def test_lock_held(self):
+        """
+        Data is only read through a proxy while no other thread holds the
+        netCDF lock
+        """
+        acquired, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with NETCDF_LOCK:
+                acquired.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        acquired.wait()
+        reader = threading.Thread(target=lambda: self.proxy["temperature"][:])
+        try:
+            reader.start()
+            reader.join(0.2)
+            self.assertTrue(reader.is_alive())
+        finally:
+            release.set()
+            holder.join()
+        reader.join()
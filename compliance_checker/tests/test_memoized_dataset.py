@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the attribute index of MemoizedDataset
+"""
+from unittest import TestCase
+
+from netCDF4 import Dataset
+
+from compliance_checker import MemoizedDataset
+from compliance_checker.tests import resources
+
+
+class TestMemoizedDataset(TestCase):
+    def setUp(self):
+        path = resources.STATIC_FILES["ncei_gold_point_1"]
+        self.ds = MemoizedDataset(path)
+        self.reference = Dataset(path)
+
+    def tearDown(self):
+        self.ds.close()
+        self.reference.close()
+
+    def assert_same_variables(self, **kwargs):
+        expected = [
+            v.name for v in self.reference.get_variables_by_attributes(**kwargs)
+        ]
+        found = [v.name for v in self.ds.get_variables_by_attributes(**kwargs)]
+        self.assertEqual(found, expected)
+        return found
+
+    def test_matches_netcdf4(self):
+        """
+        Queries through the index return the same variables, in the same
+        order, as netCDF4's own implementation
+        """
+        self.assertTrue(self.assert_same_variables(axis="X"))
+        self.assertTrue(self.assert_same_variables(units=lambda x: x is not None))
+        self.assertTrue(self.assert_same_variables(units=lambda x: x is None))
+        self.assertTrue(
+            self.assert_same_variables(
+                standard_name=lambda x: isinstance(x, str) and x.endswith("itude")
+            )
+        )
+        self.assertTrue(
+            self.assert_same_variables(units="degrees_north", axis=lambda x: x == "Y")
+        )
+        self.assertFalse(self.assert_same_variables(axis="not an axis"))
+        # variable properties rather than attributes
+        self.assertTrue(self.assert_same_variables(name="lat"))
+
+    def test_index_queries(self):
+        """
+        Presence, equality and predicate queries
+        """
+        index = self.ds.attribute_index
+        self.assertIs(index, self.ds.attribute_index)
+
+        with_units = index.has_attribute("units")
+        self.assertEqual(
+            with_units,
+            [name for name, v in self.ds.variables.items() if "units" in v.ncattrs()],
+        )
+        self.assertEqual(index.equal_to("axis", "X"), ["lon"])
+
+        calls = []
+
+        def predicate(value):
+            calls.append(value)
+            return value == "degrees_north"
+
+        results = index.matching("units", predicate)
+        self.assertEqual(set(results), set(self.ds.variables))
+        # called once per distinct value, plus once for missing attributes
+        self.assertEqual(len(calls), len(index.values("units")) + 1)
+        self.assertTrue(results["lat"])
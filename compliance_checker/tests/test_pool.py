@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the pool of checker instances
+"""
+from unittest import TestCase
+
+from compliance_checker.base import BaseCheck
+from compliance_checker.pool import CheckerPool
+
+
+class OptionsCheck(BaseCheck):
+    _cc_reusable = True
+
+    def __init__(self, options=None):
+        self.options = options
+
+
+class NoOptionsCheck(BaseCheck):
+    _cc_reusable = True
+
+
+class SingleUseCheck(BaseCheck):
+    """
+    Checkers aren't reusable unless they say so
+    """
+
+
+class TestCheckerPool(TestCase):
+    def setUp(self):
+        self.pool = CheckerPool(max_idle=2)
+
+    def test_acquire_release(self):
+        """
+        Released instances are handed out again for the same options only
+        """
+        checker = self.pool.acquire(OptionsCheck, {"a"})
+        self.assertEqual(checker.options, {"a"})
+        self.pool.release(checker, {"a"})
+        self.assertEqual(len(self.pool), 1)
+        self.assertIsNot(self.pool.acquire(OptionsCheck, {"b"}), checker)
+        self.assertIs(self.pool.acquire(OptionsCheck, {"a"}), checker)
+        self.assertEqual(len(self.pool), 0)
+
+        # constructors without options
+        with self.pool.checker(NoOptionsCheck, {"a"}) as checker:
+            self.assertIsInstance(checker, NoOptionsCheck)
+        self.assertIs(self.pool.acquire(NoOptionsCheck, {"a"}), checker)
+
+    def test_limits(self):
+        """
+        Checkers which aren't reusable are never kept, and no more than
+        max_idle instances of a checker are
+        """
+        self.pool.release(self.pool.acquire(SingleUseCheck))
+        self.pool.warm(SingleUseCheck)
+        self.assertEqual(len(self.pool), 0)
+
+        self.pool.warm(OptionsCheck, count=5)
+        self.assertEqual(len(self.pool), 2)
+        self.pool.release(OptionsCheck())
+        self.assertEqual(len(self.pool), 2)
+
+        self.pool.clear()
+        self.assertEqual(len(self.pool), 0)
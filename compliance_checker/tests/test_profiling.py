@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the check timing and memory profiles
+"""
+import json
+import tracemalloc
+
+from unittest import TestCase
+
+from compliance_checker.profiling import Profile, ProfileRecord
+from compliance_checker.suite import CheckSuite
+from compliance_checker.tests import resources
+
+
+class TestProfile(TestCase):
+    def test_measure(self):
+        """
+        Measured steps are recorded with their time and peak memory
+        """
+        profile = Profile()
+        with profile.measure("a.nc", "cf:1.6", "check", "check_big"):
+            data = [0] * 100000
+            del data
+        with profile.measure("a.nc", "cf:1.6", "setup"):
+            pass
+
+        self.assertEqual(len(profile), 2)
+        big, setup = profile.records
+        self.assertEqual(big.name, "check_big")
+        self.assertEqual(setup.name, "setup")
+        self.assertGreaterEqual(big.peak_memory, 100000 * 8)
+        self.assertGreaterEqual(big.wall, 0)
+        # tracing is stopped again unless it was already running
+        self.assertFalse(tracemalloc.is_tracing())
+
+        untraced = Profile(trace_memory=False)
+        with untraced.measure("a.nc", "cf:1.6", "scores"):
+            pass
+        self.assertIsNone(untraced.records[0].peak_memory)
+
+    def test_summary(self):
+        """
+        Records are aggregated across datasets and sorted by the given key
+        """
+        profile = Profile()
+        profile.extend(
+            [
+                ("a.nc", "cf:1.6", "check", "check_fast", 0.1, 0.1, 300),
+                ("b.nc", "cf:1.6", "check", "check_fast", 0.2, 0.2, 100),
+                ("a.nc", "cf:1.6", "check", "check_slow", 0.5, 0.1, 10),
+            ]
+        )
+        self.assertIsInstance(profile.records[0], ProfileRecord)
+
+        summary = profile.summary()
+        self.assertEqual([s["name"] for s in summary], ["check_slow", "check_fast"])
+        self.assertEqual(summary[1]["calls"], 2)
+        self.assertAlmostEqual(summary[1]["wall"], 0.3)
+        self.assertEqual(summary[1]["peak_memory"], 300)
+
+        by_cpu = profile.summary("cpu")
+        self.assertEqual(by_cpu[0]["name"], "check_fast")
+        with self.assertRaises(ValueError):
+            profile.summary("name")
+
+        table = profile.format_table(limit=1).splitlines()
+        self.assertEqual(len(table), 2)
+        self.assertIn("check_slow", table[1])
+
+        serialized = json.loads(profile.to_json())
+        self.assertEqual(len(serialized["records"]), 3)
+        self.assertEqual(serialized["records"][0]["dataset"], "a.nc")
+        self.assertEqual(len(serialized["summary"]), 2)
+
+    def test_suite_profile(self):
+        """
+        A profiled suite records the setup, each check and the scoring
+        """
+        CheckSuite.load_all_available_checkers()
+        profile = Profile()
+        cs = CheckSuite(profile=profile)
+        path = resources.STATIC_FILES["ncei_gold_point_1"]
+        ds = cs.load_dataset(path)
+        self.addCleanup(ds.close)
+        cs.run(ds, [], "acdd")
+
+        phases = {r.phase for r in profile.records}
+        self.assertEqual(phases, {"setup", "check", "scores"})
+        self.assertEqual({r.dataset for r in profile.records}, {path})
+        check_names = {r.name for r in profile.records if r.phase == "check"}
+        self.assertIn("check_lat_extents", check_names)
+        self.assertIn("check_high", check_names)
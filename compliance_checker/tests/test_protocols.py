@@ -4,11 +4,23 @@ compliance_checker/tests/test_protocols.py
 
 Unit tests that ensure the compliance checker can successfully identify protocol endpoints
 """
-from unittest import TestCase
+import glob
+import io
+import os
 
+from unittest import TestCase, mock
+
+import httpretty
+import numpy as np
 import pytest
 
+from netCDF4 import Dataset
+from pkg_resources import resource_filename
+
+from compliance_checker import MemoizedDataset
+from compliance_checker.protocols import cdl, netcdf, remote
 from compliance_checker.suite import CheckSuite
+from compliance_checker.tests.resources import STATIC_FILES
 
 
 @pytest.mark.integration
@@ -61,3 +73,337 @@ class TestProtocols(TestCase):
         cs = CheckSuite()
         ds = cs.load_dataset(url)
         assert ds is not None
+
+
+class TestRemoteNetCDF(TestCase):
+    url = "http://example.com/data/ncei_gold_point_1.nc"
+
+    def setUp(self):
+        with open(STATIC_FILES["ncei_gold_point_1"], "rb") as f:
+            self.body = f.read()
+        remote.clear_classifications()
+        self.addCleanup(remote.clear_classifications)
+
+    def register(self, body):
+        httpretty.register_uri(
+            httpretty.GET, self.url, body=body, content_type="application/x-netcdf"
+        )
+
+    @httpretty.activate
+    def test_download_netcdf(self):
+        """
+        Remote netCDF files are streamed in chunks and their signature is
+        checked before the rest of the body is read
+        """
+        self.assertTrue(netcdf.has_netcdf_signature(b"CDF\x02"))
+        self.assertTrue(netcdf.has_netcdf_signature(self.body))
+        self.assertFalse(netcdf.has_netcdf_signature(b"<htm"))
+
+        self.register(self.body)
+        cs = CheckSuite()
+        for limit in (0, len(self.body)):
+            cs.remote_in_memory_limit = limit
+            ds = cs.load_dataset(self.url)
+            path = ds.filepath()
+            self.assertIn("temp", ds.variables)
+            self.assertEqual(os.path.exists(path), not limit)
+            ds.close()
+            # temporary files are removed along with the dataset
+            self.assertFalse(os.path.exists(path))
+        # the file is detected and downloaded with a single request
+        self.assertEqual(len(httpretty.latest_requests()), 2)
+
+    @httpretty.activate
+    def test_not_netcdf(self):
+        """
+        Responses which claim to be netCDF but aren't are rejected
+        """
+        self.register(b"<html>Not found</html>")
+        cs = CheckSuite()
+        cs.remote_in_memory_limit = 0
+        with self.assertRaises(ValueError):
+            cs.load_dataset(self.url)
+
+    def test_chunked_write(self):
+        """
+        Bodies are written chunk by chunk, however they are split
+        """
+
+        class Response(object):
+            url = "http://example.com/x.nc"
+
+            def iter_content(self, chunk_size):
+                yield b"C"
+                yield b"DF"
+                yield b"\x01rest"
+
+        buf = io.BytesIO()
+        self.assertEqual(netcdf.download_netcdf(Response(), buf), 8)
+        self.assertEqual(buf.getvalue(), b"CDF\x01rest")
+
+
+class TestRemoteProbe(TestCase):
+    url = "http://example.com/thredds/dodsC/model.nc"
+
+    def setUp(self):
+        remote.clear_classifications()
+        self.addCleanup(remote.clear_classifications)
+
+    @httpretty.activate
+    def test_single_probe(self):
+        """
+        Servers which identify themselves are classified with one request,
+        and the classification is reused for the same host and path
+        """
+        httpretty.register_uri(
+            httpretty.GET,
+            self.url,
+            body="Error: Unrecognized request",
+            status=400,
+            adding_headers={"XDODS-Server": "opendap/3.7"},
+        )
+        with remote.probe(self.url) as probe:
+            self.assertEqual(probe.kind, remote.OPENDAP)
+            self.assertIsNone(probe.response)
+        self.assertEqual(len(httpretty.latest_requests()), 1)
+
+        self.assertEqual(remote.probe(self.url + "?time").kind, remote.OPENDAP)
+        self.assertEqual(len(httpretty.latest_requests()), 1)
+
+    @httpretty.activate
+    def test_failed_probe(self):
+        """
+        URLs which fail to respond are probed again, and the kinds of others
+        are only remembered for CLASSIFICATION_TTL seconds
+        """
+        httpretty.register_uri(
+            httpretty.GET,
+            self.url,
+            responses=[
+                httpretty.Response(body="Service Unavailable", status=503),
+                httpretty.Response(
+                    body="Error: Unrecognized request",
+                    status=400,
+                    adding_headers={"XDODS-Server": "opendap/3.7"},
+                ),
+            ],
+        )
+        httpretty.register_uri(httpretty.GET, self.url + ".das", status=503)
+        self.assertEqual(remote.probe(self.url).kind, remote.UNKNOWN)
+        self.assertEqual(remote.probe(self.url).kind, remote.OPENDAP)
+        self.assertEqual(len(httpretty.latest_requests()), 3)
+
+        remote.probe(self.url)
+        self.assertEqual(len(httpretty.latest_requests()), 3)
+        with mock.patch.object(remote, "CLASSIFICATION_TTL", 0):
+            remote.clear_classifications()
+            remote.probe(self.url)
+            remote.probe(self.url)
+        self.assertEqual(len(httpretty.latest_requests()), 5)
+
+    @httpretty.activate
+    def test_inconclusive_probe(self):
+        """
+        The DAS is only requested when the first response is inconclusive
+        """
+        httpretty.register_uri(
+            httpretty.GET, self.url, body="<html></html>", content_type="text/html"
+        )
+        httpretty.register_uri(
+            httpretty.GET,
+            self.url + ".das",
+            body="Attributes {}",
+            adding_headers={"XDODS-Server": "opendap/3.7"},
+        )
+        self.assertEqual(remote.probe(self.url).kind, remote.OPENDAP)
+        self.assertEqual(
+            [r.path for r in httpretty.latest_requests()],
+            ["/thredds/dodsC/model.nc", "/thredds/dodsC/model.nc.das"],
+        )
+
+        other = "http://example.com/index.html"
+        httpretty.register_uri(
+            httpretty.GET, other, body="<html></html>", content_type="text/html"
+        )
+        httpretty.register_uri(httpretty.GET, other + ".das", status=404)
+        with self.assertRaises(ValueError):
+            CheckSuite().load_dataset(other)
+
+    @httpretty.activate
+    def test_xml(self):
+        """
+        XML documents are parsed from the response to the probe
+        """
+        with open(
+            os.path.join(
+                os.path.dirname(__file__), "data/http_mocks/ncsos_getcapabilities.xml"
+            ),
+            "rb",
+        ) as f:
+            body = f.read()
+        url = "http://example.com/thredds/sos/station.ncml"
+        httpretty.register_uri(httpretty.GET, url, body=body, content_type="text/xml")
+        ds = CheckSuite().load_dataset(url)
+        self.assertIsNotNone(ds)
+        self.assertEqual(len(httpretty.latest_requests()), 1)
+
+
+SAMPLE_CDL = """
+netcdf sample {
+dimensions:
+    time = UNLIMITED ; // (3 currently)
+    name_strlen = 5 ;
+variables:
+    double time(time) ;
+        time:units = "seconds since 1970-01-01" ;
+        time:valid_range = 0., 1.e9 ;
+    short depth(time) ;
+        depth:_FillValue = -999s ;
+        depth:flag_values = 1b, 2b ;
+    char name(name_strlen) ;
+    uint64 count ;
+        string count:labels = "a", "b" ;
+
+// global attributes:
+    :title = "Sample \\"quoted\\"" ;
+    :version = 2 ;
+data:
+
+ time = 0, 60, 120 ;
+
+ depth = 10, _, 30 ;
+
+ name = "abc" ;
+}
+"""
+
+
+def _attributes(obj):
+    """Attribute name -> (dtype, value) of a dataset or variable"""
+    attributes = {}
+    for name in obj.ncattrs():
+        value = obj.getncattr(name)
+        if isinstance(value, str):
+            attributes[name] = ("str", value)
+        else:
+            value = np.asarray(value)
+            attributes[name] = (value.dtype.str, value.tolist())
+    return attributes
+
+
+class TestCDL(TestCase):
+    # fixtures generated by an older ncgen, which wrote constants with the L
+    # suffix as int rather than int64 in netCDF-4 files
+    old_ncgen_fixtures = {"bad_data_type.nc"}
+
+    def test_parse_cdl(self):
+        """
+        CDL is written to a dataset with the declared types, attributes and
+        data, sizing unlimited dimensions from the data
+        """
+        doc = cdl.parse_cdl(SAMPLE_CDL)
+        self.assertEqual(doc.name, "sample")
+        self.assertTrue(doc.requires_netcdf4)
+        self.assertEqual(cdl.netcdf_format(doc), "NETCDF4")
+        with self.assertRaises(ValueError):
+            cdl.netcdf_format(doc, "NETCDF3_CLASSIC")
+
+        with Dataset("sample.nc", "w", diskless=True, format="NETCDF4") as ds:
+            cdl.write_dataset(doc, ds)
+            self.assertTrue(ds.dimensions["time"].isunlimited())
+            self.assertEqual(len(ds.dimensions["time"]), 3)
+            self.assertEqual(ds.title, 'Sample "quoted"')
+            self.assertEqual(ds.version, 2)
+            self.assertEqual(ds.variables["depth"].dtype, np.int16)
+            self.assertEqual(ds.variables["depth"]._FillValue, -999)
+            self.assertEqual(ds.variables["depth"].flag_values.dtype, np.int8)
+            self.assertTrue(ds.variables["depth"][1] is np.ma.masked)
+            self.assertEqual(ds.variables["count"].dtype, np.uint64)
+            self.assertEqual(ds.variables["count"].labels, ["a", "b"])
+            np.testing.assert_array_equal(
+                ds.variables["time"].valid_range, [0.0, 1.0e9]
+            )
+            np.testing.assert_array_equal(ds.variables["time"][:], [0, 60, 120])
+            self.assertEqual(ds.variables["name"][:].tobytes(), b"abc\x00\x00")
+
+    def test_syntax_error(self):
+        """
+        Malformed CDL raises a ValueError naming the line
+        """
+        with self.assertRaises(cdl.CDLSyntaxError) as ctx:
+            cdl.parse_cdl("netcdf bad {\ndimensions:\n  time = ;\n}")
+        self.assertIsInstance(ctx.exception, ValueError)
+        self.assertIn("line 3", str(ctx.exception))
+
+    def test_from_cdl(self):
+        """
+        A dataset built in memory from CDL matches the file ncgen generates,
+        and a header only dataset keeps the dimensions but no data
+        """
+        cdl_path = resource_filename(
+            "compliance_checker", "tests/data/test_cdl_nc_file.cdl"
+        )
+        nc_path = cdl_path.replace(".cdl", ".nc")
+        with Dataset(nc_path) as expected:
+            with MemoizedDataset.from_cdl(cdl_path) as ds:
+                self.assertEqual(ds.filepath(), cdl_path)
+                self.assertEqual(ds.data_model, expected.data_model)
+                self.assertEqual(list(ds.variables), list(expected.variables))
+                for name, var in expected.variables.items():
+                    self.assertEqual(ds.variables[name].dimensions, var.dimensions)
+                    self.assertEqual(ds.variables[name].dtype, var.dtype)
+                    self.assertEqual(
+                        ds.variables[name].__dict__, var.__dict__, msg=name
+                    )
+
+        doc = cdl.parse_cdl(SAMPLE_CDL)
+        with Dataset("sample.nc", "w", diskless=True, format="NETCDF4") as ds:
+            cdl.write_dataset(doc, ds, data=False)
+            self.assertEqual(len(ds.dimensions["time"]), 3)
+            self.assertTrue(ds.variables["time"][:].mask.all())
+            self.assertTrue(ds.variables["depth"][:].mask.all())
+
+    def test_ncgen_fixtures(self):
+        """
+        Datasets built from the test CDL files match the netCDF files ncgen
+        generated from them in the same format
+        """
+        data_dir = resource_filename("compliance_checker", "tests/data")
+        cdl_paths = sorted(glob.glob(os.path.join(data_dir, "*.cdl")))
+        fixtures = [
+            (cdl_path, cdl_path[:-4] + ".nc")
+            for cdl_path in cdl_paths
+            if os.path.exists(cdl_path[:-4] + ".nc")
+        ]
+        self.assertTrue(fixtures)
+        for cdl_path, nc_path in fixtures:
+            with Dataset(nc_path) as expected, MemoizedDataset.from_cdl(
+                cdl_path, format=expected.data_model
+            ) as ds:
+                name = os.path.basename(nc_path)
+                self.assertEqual(
+                    [
+                        (d, len(dim), dim.isunlimited())
+                        for d, dim in ds.dimensions.items()
+                    ],
+                    [
+                        (d, len(dim), dim.isunlimited())
+                        for d, dim in expected.dimensions.items()
+                    ],
+                    msg=name,
+                )
+                self.assertEqual(_attributes(ds), _attributes(expected), msg=name)
+                self.assertEqual(list(ds.variables), list(expected.variables))
+                for var_name, var in expected.variables.items():
+                    msg = "{} {}".format(name, var_name)
+                    ncvar = ds.variables[var_name]
+                    self.assertEqual(ncvar.dimensions, var.dimensions, msg=msg)
+                    self.assertEqual(ncvar.shape, var.shape, msg=msg)
+                    self.assertEqual(ncvar.dtype, var.dtype, msg=msg)
+                    attributes = _attributes(ncvar)
+                    expected_attributes = _attributes(var)
+                    if name in self.old_ncgen_fixtures:
+                        for att_name, (dtype, value) in expected_attributes.items():
+                            if dtype == "<i4" and attributes[att_name][0] == "<i8":
+                                expected_attributes[att_name] = ("<i8", value)
+                    self.assertEqual(attributes, expected_attributes, msg=msg)
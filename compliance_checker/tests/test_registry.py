@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the snapshot of the installed checkers
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compliance_checker import registry
+from compliance_checker.acdd import ACDD1_3Check
+from compliance_checker.entrypoints import EntryPoint
+from compliance_checker.registry import (
+    CheckerDict,
+    LazyChecker,
+    RegistrySnapshot,
+    latest_version,
+)
+from compliance_checker.suite import CheckSuite
+
+
+class TestRegistry(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.snapshot = RegistrySnapshot(os.path.join(self.tmpdir, "registry.json"))
+        self.entry_point = EntryPoint(
+            "acdd", "compliance_checker.acdd", "ACDD1_3Check", "compliance-checker"
+        )
+
+    def test_latest_version(self):
+        """
+        Dotted version numbers are compared numerically, and any others as
+        strings
+        """
+        self.assertEqual(latest_version(["1.9", "1.10", "1.2"]), "1.10")
+        self.assertEqual(latest_version(["1.0.0", "1"]), "1.0.0")
+        self.assertEqual(latest_version(["1.1", "1.1b"]), "1.1b")
+
+    def test_checker_dict(self):
+        """
+        Lazy checkers are imported when looked up, but not when listed
+        """
+        checkers = CheckerDict()
+        lazy = LazyChecker("compliance_checker.acdd", "ACDD1_3Check", "1.0")
+        checkers["acdd:1.3"] = lazy
+        self.assertEqual(list(checkers), ["acdd:1.3"])
+        self.assertEqual(checkers.checker_version("acdd:1.3"), "1.0")
+        self.assertIsNone(lazy._checker)
+
+        self.assertIs(checkers["acdd:1.3"], ACDD1_3Check)
+        self.assertIs(checkers.get("acdd:1.3"), ACDD1_3Check)
+        self.assertEqual(checkers.items(), [("acdd:1.3", ACDD1_3Check)])
+        self.assertIsNone(checkers.get("acdd:1.1"))
+
+    def test_snapshot(self):
+        """
+        Snapshots are read back until the distributions or checker modules
+        they were taken from change
+        """
+        self.assertIsNone(self.snapshot.load())
+        self.assertTrue(
+            self.snapshot.save([("acdd:1.3", ACDD1_3Check, self.entry_point)])
+        )
+        checkers = self.snapshot.load()
+        self.assertEqual(list(checkers), ["acdd:1.3"])
+        self.assertIs(checkers["acdd:1.3"].resolve(), ACDD1_3Check)
+
+        with mock.patch.object(
+            registry, "distributions_fingerprint", return_value="changed"
+        ):
+            self.assertIsNone(self.snapshot.load())
+
+        with open(self.snapshot.path) as f:
+            snapshot = json.load(f)
+        snapshot["files"][0][1] -= 1
+        with open(self.snapshot.path, "w") as f:
+            json.dump(snapshot, f)
+        self.assertIsNone(self.snapshot.load())
+
+        self.snapshot.clear()
+        self.assertFalse(os.path.exists(self.snapshot.path))
+
+    def test_load_checkers(self):
+        """
+        Checkers are registered from the snapshot taken when they were first
+        loaded, with the same latest versions
+        """
+        with mock.patch.object(CheckSuite, "checkers", CheckerDict()), mock.patch(
+            "compliance_checker.suite.RegistrySnapshot", return_value=self.snapshot
+        ):
+            CheckSuite.load_all_available_checkers()
+            loaded = dict(CheckSuite.checkers.items())
+            self.assertIsNotNone(self.snapshot.load())
+
+            CheckSuite.checkers.clear()
+            CheckSuite.load_all_available_checkers()
+            self.assertIsInstance(dict.get(CheckSuite.checkers, "cf"), LazyChecker)
+            self.assertEqual(dict(CheckSuite.checkers.items()), loaded)
+            self.assertIs(CheckSuite.checkers["acdd"], ACDD1_3Check)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the compliance checking service
+"""
+import http.client
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from unittest import TestCase, mock, skipUnless
+
+from compliance_checker.server import (
+    CheckRequestHandler,
+    CheckService,
+    RequestError,
+    ServiceBusy,
+    make_server,
+    parse_address,
+)
+from compliance_checker.tests.resources import STATIC_FILES
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super(UnixHTTPConnection, self).__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestCheckService(TestCase):
+    def setUp(self):
+        self.service = CheckService(checker_names=["acdd"], workers=0, timeout=30)
+        self.service.start()
+        self.addCleanup(self.service.close)
+        self.location = STATIC_FILES["ncei_gold_point_1"]
+
+    def serve(self, address):
+        server = make_server(self.service, address)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return server
+
+    def request(self, conn, method, path, body=None):
+        conn.request(method, path, body=None if body is None else json.dumps(body))
+        response = conn.getresponse()
+        return response.status, json.loads(response.read().decode("utf-8"))
+
+    def test_check(self):
+        """
+        Requests are checked with the default checkers and criteria unless
+        they name others
+        """
+        result = self.service.check({"location": self.location})
+        self.assertEqual(result["location"], self.location)
+        self.assertEqual(list(result["results"]), ["acdd"])
+        self.assertEqual(result["errors"], {"acdd": {}})
+        self.assertIn(result["passed"], (True, False))
+
+        result = self.service.check(
+            {
+                "location": self.location,
+                "checkers": ["acdd:1.1"],
+                "criteria": "lenient",
+                "format": "json_new",
+            }
+        )
+        self.assertEqual(list(result["results"][self.location]), ["acdd:1.1"])
+
+        for request in (
+            [self.location],
+            {},
+            {"location": self.location, "checkers": ["unknown"]},
+            {"location": self.location, "criteria": "unknown"},
+            {"location": self.location, "format": "html"},
+        ):
+            with self.assertRaises(RequestError):
+                self.service.check(request)
+
+    def test_timeout(self):
+        """
+        Requests time out while being checked, and while waiting for a slot
+        held by a check still running
+        """
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.service.timeout = 0.2
+
+        def slow_run(*args):
+            release.wait()
+            return {}, []
+
+        with mock.patch.object(self.service, "_run_local", slow_run):
+            with self.assertRaises(FutureTimeoutError):
+                self.service.check({"location": self.location})
+            with self.assertRaises(ServiceBusy):
+                self.service.check({"location": self.location})
+
+    def test_http(self):
+        """
+        Checks are served over HTTP on TCP ports
+        """
+        server = self.serve(("localhost", 0))
+        conn = http.client.HTTPConnection(*server.server_address)
+        self.addCleanup(conn.close)
+        status, body = self.request(conn, "GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertIn("acdd", body["checkers"])
+
+        # several requests over one connection
+        status, body = self.request(conn, "POST", "/check", {"location": self.location})
+        self.assertEqual(status, 200)
+        self.assertEqual(list(body["results"]), ["acdd"])
+        status, body = self.request(conn, "POST", "/check", {"checkers": "acdd"})
+        self.assertEqual(status, 400)
+        status, body = self.request(
+            conn, "POST", "/check", {"location": self.location + ".missing"}
+        )
+        self.assertEqual(status, 422)
+        status, body = self.request(conn, "GET", "/check")
+        self.assertEqual(status, 404)
+
+    def test_invalid_length(self):
+        """
+        Requests with a negative or too large Content-Length are rejected
+        without reading their body, and their connection is closed
+        """
+        server = self.serve(("localhost", 0))
+        for length in ("-1", "abc", str(CheckRequestHandler.max_body + 1)):
+            conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+            self.addCleanup(conn.close)
+            conn.request(
+                "POST", "/check", body=b"{}", headers={"Content-Length": length}
+            )
+            response = conn.getresponse()
+            response.read()
+            self.assertEqual(response.status, 400)
+            self.assertTrue(response.will_close)
+
+    @skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets are unavailable")
+    def test_unix_socket(self):
+        """
+        Checks are served over Unix domain sockets
+        """
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "cchecker.sock")
+        self.serve(path)
+        conn = UnixHTTPConnection(path)
+        self.addCleanup(conn.close)
+        status, body = self.request(conn, "POST", "/check", {"location": self.location})
+        self.assertEqual(status, 200)
+
+    def test_workers(self):
+        """
+        Worker processes give the same results as checking in process
+        """
+        request = {"location": self.location, "checkers": ["acdd", "cf"]}
+        expected = self.service.check(request)
+        with CheckService(workers=1) as service:
+            result = service.check(request)
+        # the reports are made at different times
+        for report in (result, expected):
+            for checker_result in report["results"].values():
+                del checker_result["report_timestamp"]
+        for key in ("results", "passed", "errors"):
+            self.assertEqual(result[key], expected[key])
+
+    def test_dead_worker(self):
+        """
+        Worker processes which die are replaced, whether they died between
+        requests or while checking a dataset
+        """
+        request = {"location": self.location}
+        with CheckService(workers=1) as service:
+            executor = service._executor
+            for process in list(executor._processes.values()):
+                process.terminate()
+            # wait for the pool to notice
+            with self.assertRaises(BrokenProcessPool):
+                executor.submit(int).result(30)
+            self.assertEqual(list(service.check(request)["results"]), ["acdd"])
+            self.assertIsNot(service._executor, executor)
+
+            executor = service._executor
+            with mock.patch.object(
+                service,
+                "_submit",
+                lambda executor, *args: executor.submit(os._exit, 1),
+            ):
+                with self.assertRaises(BrokenProcessPool):
+                    service.check(request)
+            self.assertIsNot(service._executor, executor)
+            self.assertEqual(list(service.check(request)["results"]), ["acdd"])
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("0.0.0.0:8080"), ("0.0.0.0", 8080))
+        self.assertEqual(parse_address(":8080"), ("localhost", 8080))
+        self.assertEqual(parse_address("8080"), ("localhost", 8080))
+        if hasattr(socket, "AF_UNIX"):
+            self.assertEqual(parse_address("/run/cc.sock"), "/run/cc.sock")
+        with mock.patch("compliance_checker.server.socket") as mock_socket:
+            del mock_socket.AF_UNIX
+            with self.assertRaises(ValueError):
+                parse_address("/run/cc.sock")
+            with self.assertRaises(ValueError):
+                make_server(self.service, "/run/cc.sock")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the chunked variable statistics
+"""
+from unittest import TestCase
+
+import numpy as np
+
+from netCDF4 import Dataset
+
+from compliance_checker import MemoizedDataset, cfutil
+from compliance_checker.stats import iter_slabs, variable_stats
+from compliance_checker.tests import resources
+
+
+class TestStats(TestCase):
+    def setUp(self):
+        self.ds = Dataset("stats.nc", "w", diskless=True)
+        self.ds.createDimension("time", None)
+        self.ds.createDimension("y", 30)
+        self.ds.createDimension("x", 20)
+        var = self.ds.createVariable(
+            "temp",
+            "f4",
+            ("time", "y", "x"),
+            fill_value=np.float32(-999),
+            chunksizes=(1, 8, 20),
+        )
+        data = np.arange(6 * 30 * 20, dtype="f4").reshape(6, 30, 20) - 100
+        data[0, 0, :5] = -999
+        data[2, 3, 4] = np.nan
+        var[:] = data
+        self.addCleanup(self.ds.close)
+
+    def test_iter_slabs(self):
+        """
+        Slabs cover every element exactly once and are aligned to chunks
+        """
+        shape = (6, 30, 20)
+        for chunks, max_elements in (
+            ((1, 8, 20), 500),
+            ((1, 8, 20), 2 ** 20),
+            (None, 7),
+            ((4, 4, 4), 1),
+        ):
+            covered = np.zeros(shape, dtype=int)
+            for index in iter_slabs(shape, chunks, max_elements):
+                covered[index] += 1
+                if chunks is not None:
+                    for sl, chunk in zip(index, chunks):
+                        self.assertEqual(sl.start % chunk, 0)
+            self.assertTrue((covered == 1).all())
+
+        self.assertEqual(list(iter_slabs(())), [()])
+        self.assertEqual(list(iter_slabs((0, 5))), [])
+
+    def test_variable_stats(self):
+        """
+        A single chunked pass gives the same results as reading the data
+        """
+        var = self.ds.variables["temp"]
+        data = var[:]
+        for max_elements in (1, 100, 2 ** 22):
+            stats = variable_stats(var, max_elements=max_elements)
+            self.assertEqual(stats.size, data.size)
+            self.assertEqual(stats.fill_count, 5)
+            self.assertEqual(stats.nan_count, 1)
+            self.assertEqual(stats.min, np.nanmin(data))
+            self.assertEqual(stats.max, np.nanmax(data))
+
+        unmasked = variable_stats(var, masked=False)
+        self.assertEqual(unmasked.fill_count, 0)
+        self.assertEqual(unmasked.min, -999)
+        # the variable's auto mask setting is left as it was
+        self.assertTrue(var.mask)
+
+        var[:] = np.ma.masked
+        stats = variable_stats(var)
+        self.assertIsNone(stats.min)
+        self.assertIsNone(stats.max)
+        self.assertEqual(stats.fill_count, stats.size)
+
+        self.ds.createVariable("label", str, ("x",))
+        with self.assertRaises(TypeError):
+            variable_stats(self.ds.variables["label"])
+
+    def test_cached_stats(self):
+        """
+        Statistics are computed once per read only dataset and variable
+        """
+        path = resources.STATIC_FILES["ncei_gold_point_1"]
+        ds = MemoizedDataset(path)
+        self.addCleanup(ds.close)
+        first = cfutil.get_variable_stats(ds, "temp")
+        analysis = cfutil.get_dataset_analysis(ds)
+        self.assertIn(("_get_cached_variable_stats", "temp", True), analysis._results)
+        self.assertEqual(cfutil.get_variable_stats(ds, "temp"), first)
+
+        # writable datasets are not cached, as their data may change
+        cfutil.get_variable_stats(self.ds, "temp")
+        self.assertNotIn(self.ds, cfutil._DATASET_ANALYSES)
+
+        writable = MemoizedDataset("writable_stats.nc", "w", diskless=True)
+        self.addCleanup(writable.close)
+        writable.createDimension("x", 3)
+        var = writable.createVariable("temp", "f4", ("x",))
+        var[:] = [1, 2, 3]
+        self.assertFalse(writable.read_only)
+        self.assertEqual(cfutil.get_variable_stats(writable, "temp").max, 3)
+        var[:] = [1, 2, 5]
+        self.assertEqual(cfutil.get_variable_stats(writable, "temp").max, 5)
+        self.assertNotIn(writable, cfutil._DATASET_ANALYSES)
@@ -2,16 +2,26 @@
 import os
 import unittest
 
+from collections import defaultdict
+from unittest import mock
+
 import numpy as np
 
 from pkg_resources import resource_filename
 
-from compliance_checker.base import BaseCheck, GenericFile, Result
+from compliance_checker import MemoizedDataset
+from compliance_checker.acdd import ACDD1_3Check, ACDDBaseCheck
+from compliance_checker.base import BaseCheck, BaseNCCheck, GenericFile, Result
+from compliance_checker.benchmarks.scoring import (
+    recursive_group_raw,
+    synthetic_results,
+)
 from compliance_checker.suite import CheckSuite
+from compliance_checker.tests.resources import get_filename
 
 
 static_files = {
-    "2dim": resource_filename("compliance_checker", "tests/data/2dim-grid.nc"),
+    "2dim": get_filename("tests/data/2dim-grid.cdl"),
     "bad_region": resource_filename("compliance_checker", "tests/data/bad_region.nc"),
     "bad_data_type": resource_filename(
         "compliance_checker", "tests/data/bad_data_type.nc"
@@ -21,9 +31,7 @@ static_files = {
         "compliance_checker", "tests/data/test_cdl_nc_file.nc"
     ),
     "empty": resource_filename("compliance_checker", "tests/data/non-comp/empty.file"),
-    "ru07": resource_filename(
-        "compliance_checker", "tests/data/ru07-20130824T170228_rt0.nc"
-    ),
+    "ru07": get_filename("tests/data/ru07-20130824T170228_rt0.cdl"),
     "netCDF4": resource_filename(
         "compliance_checker", "tests/data/test_cdl_nc4_file.cdl"
     ),
@@ -164,6 +172,32 @@ class TestSuite(unittest.TestCase):
         self.assertEqual(score[1].name, "two")
         self.assertEqual(score[1].value, (1, 2))
 
+    def test_group_raw(self):
+        """
+        Grouping results in a single pass gives the same trees as the
+        recursive grouping it replaced
+        """
+
+        def tree(groups):
+            return [
+                (g.name, g.weight, g.value, g.msgs, tree(g.children)) for g in groups
+            ]
+
+        edge_cases = [
+            [],
+            [Result(BaseCheck.HIGH, True, ""), Result(BaseCheck.LOW, False, ())],
+            [
+                Result(BaseCheck.HIGH, False, "a", ["a1"]),
+                Result(BaseCheck.HIGH, (1, 2), ("a", "b"), ["ab"]),
+                Result(BaseCheck.HIGH, None, ("a", "", "c"), ["ac"]),
+                Result(BaseCheck.LOW, True, ["a", "b"]),
+                Result(BaseCheck.HIGH, False, ("a",), ["a2"]),
+                Result(BaseCheck.MEDIUM, True, ""),
+            ],
+        ]
+        for raw in edge_cases + [synthetic_results(500, n_variables=7)]:
+            self.assertEqual(tree(self.cs.scores(raw)), tree(recursive_group_raw(raw)))
+
     def test_cdl_file(self):
         # Testing whether you can run compliance checker on a .cdl file
         # Load the cdl file
@@ -198,8 +232,9 @@ class TestSuite(unittest.TestCase):
             )
         ds.close()
 
+        # the CDL is checked in memory without generating a netCDF file
         nc_file_path = static_files["test_cdl"].replace(".cdl", ".nc")
-        self.addCleanup(os.remove, nc_file_path)
+        self.assertFalse(os.path.exists(nc_file_path))
 
         # Ok the scores should be equal!
         self.assertEqual(nc_points, cdl_points)
@@ -237,3 +272,255 @@ class TestSuite(unittest.TestCase):
         assert ds["tas"].dtype is np.dtype("float32")
         # check if netCDF4 type of variable is correct
         assert ds["mask"].dtype is np.dtype("int64")
+
+    def test_metadata_only(self):
+        """
+        In metadata only mode datasets are replaced by an in-memory copy of
+        their header and checks which read variable data are skipped
+        """
+        cs = CheckSuite(metadata_only=True)
+        ds = cs.load_dataset(static_files["ru07"])
+        reference = self.cs.load_dataset(static_files["ru07"])
+        self.addCleanup(reference.close)
+        self.addCleanup(ds.close)
+
+        self.assertIsInstance(ds, MemoizedDataset)
+        self.assertEqual(list(ds.dimensions), list(reference.dimensions))
+        for name, dim in reference.dimensions.items():
+            self.assertEqual(len(ds.dimensions[name]), len(dim))
+            self.assertEqual(ds.dimensions[name].isunlimited(), dim.isunlimited())
+        for name, var in reference.variables.items():
+            self.assertEqual(ds.variables[name].shape, var.shape)
+            self.assertEqual(ds.variables[name].dtype, var.dtype)
+            self.assertEqual(ds.variables[name].ncattrs(), var.ncattrs())
+        self.assertEqual(ds.ncattrs(), reference.ncattrs())
+
+        acdd = cs.checkers["acdd"]()
+        check_names = {
+            c.__name__ for c, _ in cs._get_checks(acdd, defaultdict(lambda: None))
+        }
+        self.assertNotIn("check_lat_extents", check_names)
+        self.assertIn("check_high", check_names)
+
+        # header-only checks score the same as against the full dataset
+        metadata_groups, _ = cs.run(ds, [], "cf")["cf"]
+        full_groups, _ = self.cs.run(reference, [], "cf")["cf"]
+        self.assertEqual(
+            {g.name: g.value for g in metadata_groups},
+            {g.name: g.value for g in full_groups},
+        )
+
+    def test_metadata_only_cdl(self):
+        """
+        CDL is parsed straight into a header only dataset in metadata only
+        mode
+        """
+        cs = CheckSuite(metadata_only=True)
+        ds = cs.load_dataset(static_files["test_cdl"])
+        self.addCleanup(ds.close)
+        reference = self.cs.load_dataset(static_files["test_cdl"])
+        self.addCleanup(reference.close)
+
+        self.assertTrue(ds.header_only)
+        self.assertFalse(reference.header_only)
+        for name, var in reference.variables.items():
+            self.assertEqual(ds.variables[name].shape, var.shape)
+            self.assertEqual(ds.variables[name].ncattrs(), var.ncattrs())
+
+    def test_checker_registry(self):
+        """
+        Check methods and supported dataset types are found once per class
+        when checkers are loaded, and reused for every dataset
+        """
+        info = CheckSuite.checker_registry[ACDD1_3Check]
+        checks = {check.name: check for check in info.checks}
+        self.assertEqual(checks["check_high"].defining_class, ACDDBaseCheck)
+        self.assertEqual(checks["check_metadata_link"].defining_class, ACDD1_3Check)
+        self.assertTrue(checks["check_lat_extents"].data_dependent)
+        self.assertFalse(checks["check_high"].data_dependent)
+        self.assertIn(MemoizedDataset, info.supported_ds)
+
+        class UninstantiableCheck(BaseNCCheck):
+            def __init__(self):
+                raise AssertionError("checker instantiated")
+
+            def check_nothing(self, ds):
+                pass
+
+        ds = self.cs.load_dataset(static_files["2dim"])
+        self.addCleanup(ds.close)
+        acdd = ACDD1_3Check()
+        with mock.patch.dict(CheckSuite.checkers, {"none": UninstantiableCheck}):
+            with mock.patch("inspect.getmembers") as getmembers:
+                checks = self.cs._get_checks(acdd, defaultdict(lambda: None))
+                getmembers.assert_not_called()
+            self.assertEqual(
+                self.cs._get_valid_checkers(ds, ["none"]),
+                [("none", UninstantiableCheck)],
+            )
+        names = [c.__name__ for c, _ in checks]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), len(info.checks))
+        self.assertIs(checks[0][0].__self__, acdd)
+
+    def test_check_threads(self):
+        """
+        Checks run on several threads give the same results, in the same
+        order, as checks run one at a time, and errors are still captured
+        per check
+        """
+
+        class FailingCheck(BaseNCCheck):
+            def setup(self, ds):
+                pass
+
+            def check_a(self, ds):
+                return Result(BaseCheck.HIGH, True, "a")
+
+            def check_b(self, ds):
+                raise ValueError(ds.variables["temperature"].units)
+
+            def check_c(self, ds):
+                return [
+                    Result(BaseCheck.MEDIUM, True, name)
+                    for name in sorted(ds.variables)[:3]
+                ]
+
+        threaded = CheckSuite(check_threads=4)
+        ds = self.cs.load_dataset(static_files["ru07"])
+        self.addCleanup(ds.close)
+
+        serial_results = self.cs.run(ds, [], "cf", "acdd")
+        threaded_results = threaded.run(ds, [], "cf", "acdd")
+        for checker in ("cf", "acdd"):
+            serial_groups, serial_errs = serial_results[checker]
+            threaded_groups, threaded_errs = threaded_results[checker]
+            self.assertEqual(
+                [(g.name, g.value, g.msgs) for g in threaded_groups],
+                [(g.name, g.value, g.msgs) for g in serial_groups],
+            )
+            self.assertEqual(list(threaded_errs), list(serial_errs))
+
+        with mock.patch.dict(CheckSuite.checkers, {"failing": FailingCheck}):
+            groups, errs = threaded.run(ds, [], "failing")["failing"]
+        self.assertEqual([g.name for g in groups], ["a"] + sorted(ds.variables)[:3])
+        self.assertEqual(list(errs), ["check_b"])
+        exc, tb = errs["check_b"]
+        self.assertIsInstance(exc, ValueError)
+        self.assertEqual(str(exc), ds.variables["temperature"].units)
+        # the traceback leads from the suite into the check itself
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        self.assertEqual(tb.tb_frame.f_code.co_name, "check_b")
+
+    def test_checker_reuse(self):
+        """
+        Reusable checkers are created once per suite and reset when torn
+        down after each dataset, giving the same results as new instances
+        """
+
+        created, reset = [], []
+
+        class CountingCheck(BaseNCCheck, BaseCheck):
+            _cc_reusable = True
+
+            def __init__(self):
+                super(CountingCheck, self).__init__()
+                created.append(type(self))
+
+            def reset(self):
+                super(CountingCheck, self).reset()
+                reset.append(type(self))
+
+            def check_grid(self, ds):
+                ctx = self.get_test_ctx(BaseCheck.HIGH, "grid")
+                for name in ds.variables:
+                    ctx.assert_true(name.startswith("t"), "{} is not t", name)
+                return ctx.to_result()
+
+        class NewCountingCheck(CountingCheck):
+            _cc_reusable = False
+
+        datasets = [
+            self.cs.load_dataset(static_files[name]) for name in ("ru07", "2dim")
+        ]
+        for ds in datasets:
+            self.addCleanup(ds.close)
+
+        cs = CheckSuite()
+        checkers = {"counting": CountingCheck, "new": NewCountingCheck}
+        with mock.patch.dict(CheckSuite.checkers, checkers):
+            for ds in datasets + datasets:
+                reused = cs.run(ds, [], "cf", "ioos:1.2", "counting")
+                fresh = CheckSuite().run(ds, [], "cf", "ioos:1.2", "counting")
+                for checker in reused:
+                    self.assertEqual(reused[checker][0], fresh[checker][0])
+            # every run tears its checker down
+            self.assertEqual(reset, [CountingCheck] * 8)
+            # one instance for the reusing suite, one per fresh suite
+            self.assertEqual(created, [CountingCheck] * (1 + 4))
+
+            cs.run(datasets[0], [], "new")
+            cs.run(datasets[0], [], "new")
+        self.assertEqual(created[5:], [NewCountingCheck] * 2)
+        self.assertEqual(reset[8:], [NewCountingCheck] * 2)
+
+    def test_checker_pool(self):
+        """
+        Checkers are torn down after each dataset, even when a check fails,
+        and the suite's pool keeps warm instances of reusable ones.  Checkers
+        whose teardown fails are reported and dropped from the pool.
+        """
+
+        events = []
+
+        class LifecycleCheck(BaseNCCheck, BaseCheck):
+            _cc_reusable = True
+
+            def __init__(self):
+                super(LifecycleCheck, self).__init__()
+                events.append("init")
+
+            def setup(self, ds):
+                events.append("setup")
+
+            def teardown(self, ds):
+                super(LifecycleCheck, self).teardown(ds)
+                events.append("teardown")
+
+            def check_fails(self, ds):
+                raise ValueError("check failed")
+
+        ds = self.cs.load_dataset(static_files["2dim"])
+        self.addCleanup(ds.close)
+
+        cs = CheckSuite()
+        with mock.patch.dict(CheckSuite.checkers, {"lifecycle": LifecycleCheck}):
+            cs.warm_up(["lifecycle", "unknown"], count=2)
+            self.assertEqual(events, ["init", "init"])
+            self.assertEqual(len(cs.checker_pool), 2)
+            for _ in range(3):
+                errs = cs.run(ds, [], "lifecycle")["lifecycle"][1]
+                self.assertIn("check_fails", errs)
+        self.assertEqual(events[2:], ["setup", "teardown"] * 3)
+        self.assertEqual(len(cs.checker_pool), 2)
+
+        # suites may share a pool
+        other = CheckSuite(checker_pool=cs.checker_pool)
+        self.assertIs(
+            other.checker_pool.acquire(LifecycleCheck, set()).__class__, LifecycleCheck,
+        )
+        self.assertEqual(events.count("init"), 2)
+
+        class BrokenTeardownCheck(LifecycleCheck):
+            def teardown(self, ds):
+                raise RuntimeError("teardown failed")
+
+        with mock.patch.dict(CheckSuite.checkers, {"broken": BrokenTeardownCheck}):
+            cs.warm_up(["broken"])
+            idle = len(cs.checker_pool)
+            groups, errs = cs.run(ds, [], "broken")["broken"]
+        self.assertEqual(sorted(errs), ["check_fails", "teardown"])
+        self.assertIsInstance(errs["teardown"][0], RuntimeError)
+        self.assertIsNotNone(errs["teardown"][1])
+        self.assertEqual(len(cs.checker_pool), idle - 1)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the memoized unit parsing helpers
+"""
+from unittest import TestCase
+
+import numpy as np
+
+from compliance_checker import units
+from compliance_checker.units import LRUCache
+
+
+class TestUnits(TestCase):
+    def setUp(self):
+        units.clear_caches()
+
+    def tearDown(self):
+        units.clear_caches()
+
+    def test_parse_unit(self):
+        """
+        Parsed units are reused and parse failures are remembered
+        """
+        first = units.parse_unit("m s-1")
+        self.assertIs(units.parse_unit("m s-1"), first)
+        self.assertEqual(first, units.parse_unit("m/s"))
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                units.parse_unit("not a unit")
+
+        info = units.cache_info()["parse"]
+        self.assertEqual(info.misses, 3)
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.currsize, 3)
+
+    def test_queries(self):
+        """
+        Convertibility and time reference queries match cf_units
+        """
+        self.assertTrue(units.units_known("degrees_north"))
+        self.assertFalse(units.units_known("not a unit"))
+        self.assertTrue(units.units_convertible("hours", "seconds"))
+        self.assertFalse(units.units_convertible("hours", "hours since 2000-01-01"))
+        self.assertFalse(units.units_convertible("hours", "not a unit"))
+        self.assertTrue(units.units_temporal("hours since 2000-01-01"))
+        self.assertFalse(units.units_temporal("hours"))
+        self.assertFalse(units.units_temporal("days since the big bang"))
+
+        units.units_convertible("hours", "seconds")
+        self.assertEqual(units.cache_info()["convertible"].hits, 1)
+
+        # unhashable values are passed through without being cached
+        self.assertFalse(units.units_known(np.array(["m", "s"])))
+
+    def test_lru_eviction(self):
+        """
+        The least recently used entry is dropped when the cache is full
+        """
+        cache = LRUCache(maxsize=2)
+        cache.get_or_compute("a", lambda: 1)
+        cache.get_or_compute("b", lambda: 2)
+        cache.get_or_compute("a", lambda: None)
+        cache.get_or_compute("c", lambda: 3)
+        self.assertEqual(cache.get_or_compute("a", lambda: None), 1)
+        self.assertIsNone(cache.get_or_compute("b", lambda: None))
+        self.assertEqual(cache.info(), (2, 4, 2, 2))
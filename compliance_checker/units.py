@@ -0,0 +1,191 @@
+"""
+Memoized parsing of UDUNITS unit strings
+
+Parsing a unit string with cf_units goes through udunits each time, and the
+same handful of unit strings are parsed over and over again while checking
+a dataset with many variables.  Parsed units, and the results of the
+convertibility and time reference queries made on them, are kept in bounded
+least recently used caches shared by all of the checkers.
+"""
+
+import threading
+
+from collections import OrderedDict, namedtuple
+
+from cf_units import Unit
+
+
+# default number of entries kept in each cache
+DEFAULT_MAXSIZE = 1024
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class LRUCache(object):
+    """
+    Thread safe, size bounded mapping which discards the least recently used
+    entries and counts cache hits and misses
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        """
+        :param int maxsize: Maximum number of entries to keep
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, func):
+        """
+        Returns the cached value for `key`, calling `func()` to compute and
+        store it on a miss.  Unhashable keys are computed without caching.
+
+        :param key: Cache key
+        :param func: Callable taking no arguments which computes the value
+        """
+        try:
+            with self._lock:
+                value = self._data[key]
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+        except KeyError:
+            pass
+        except TypeError:
+            return func()
+
+        value = func()
+        with self._lock:
+            self.misses += 1
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def info(self):
+        """
+        Returns the hit and miss counts and size of the cache
+
+        :rtype: CacheInfo
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_parsed_units = LRUCache()
+_convertible = LRUCache()
+_time_reference = LRUCache()
+
+
+def _parse(units):
+    # failures are cached too, so unknown units aren't handed to udunits
+    # again for every variable which uses them
+    try:
+        return Unit(units)
+    except ValueError as e:
+        return e
+
+
+def parse_unit(units):
+    """
+    Returns the cf_units Unit for a unit string, reusing previously parsed
+    units.
+
+    :param str units: A string representing the units
+    :raises ValueError: If the units can't be parsed by UDUNITS
+    :rtype: cf_units.Unit
+    """
+    unit = _parsed_units.get_or_compute(units, lambda: _parse(units))
+    if isinstance(unit, ValueError):
+        raise ValueError(*unit.args)
+    return unit
+
+
+def units_known(units):
+    """
+    Returns True if the units can be parsed by UDUNITS
+
+    :param str units: A string representing the units
+    :rtype: bool
+    """
+    try:
+        parse_unit(units)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_convertible(units1, units2):
+    try:
+        u1 = parse_unit(units1)
+        u2 = parse_unit(units2)
+    except ValueError:
+        return False
+    return u1.is_convertible(u2)
+
+
+def units_convertible(units1, units2):
+    """
+    Return True if a Unit representing the string units1 can be converted
+    to a Unit representing the string units2, else False.
+
+    :param str units1: A string representing the units
+    :param str units2: A string representing the units
+    :rtype: bool
+    """
+    return _convertible.get_or_compute(
+        (units1, units2), lambda: _is_convertible(units1, units2)
+    )
+
+
+def _is_time_reference(units):
+    try:
+        return parse_unit(units).is_time_reference()
+    except ValueError:
+        return False
+
+
+def units_temporal(units):
+    """
+    Returns True if the units are a time reference, e.g. "days since
+    1970-01-01"
+
+    :param str units: A string representing the units
+    :rtype: bool
+    """
+    return _time_reference.get_or_compute(units, lambda: _is_time_reference(units))
+
+
+def cache_info():
+    """
+    Returns the hit and miss counts of the unit caches
+
+    :rtype: dict
+    :returns: Mapping of cache name to CacheInfo
+    """
+    return {
+        "parse": _parsed_units.info(),
+        "convertible": _convertible.info(),
+        "temporal": _time_reference.info(),
+    }
+
+
+def clear_caches():
+    """
+    Empties the unit caches and resets their counters
+    """
+    for cache in (_parsed_units, _convertible, _time_reference):
+        cache.clear()
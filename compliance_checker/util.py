@@ -3,12 +3,11 @@ General purpose utility functions to aid in compliance checking tasks
 """
 from collections import OrderedDict
 
-import isodate
-import pendulum
-
 
 def datetime_is_iso(date_str):
     """Attempts to parse a date formatted in ISO 8601 format"""
+    import isodate
+
     try:
         if len(date_str) > 10:
             dt = isodate.parse_datetime(date_str)
@@ -25,6 +24,7 @@ def dateparse(date_str):
 
     :param str date_str: An ISO-8601 string
     """
+    import pendulum
 
     return pendulum.parse(date_str)
 